@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 from pathlib import Path
 
@@ -35,6 +36,18 @@ SESSION_COOKIE_AGE = 3600  # Таймаут сессии — 1 час
 
 SESSION_SAVE_EVERY_REQUEST = True
 
+# Продление сессии пишется в кэш не чаще, чем раз в
+# SESSION_REFRESH_INTERVAL секунд, а в PostgreSQL - не чаще, чем раз в
+# SESSION_DB_REFRESH_INTERVAL (должен быть меньше SESSION_COOKIE_AGE).
+# Кэш сессий - CACHES['sessions'], не DatabaseCache: иначе продление в
+# кэш тоже было бы записью в PostgreSQL.
+SESSION_ENGINE = 'core.sessions'
+SESSION_CACHE_ALIAS = 'sessions'
+SESSION_REFRESH_INTERVAL = int(os.getenv('SESSION_REFRESH_INTERVAL', 60))
+SESSION_DB_REFRESH_INTERVAL = int(
+    os.getenv('SESSION_DB_REFRESH_INTERVAL', 600)
+)
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -53,12 +66,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Первым, чтобы учитывать и ответы остальных middleware (429,
+    # редиректы на вход)
+    'core.middleware.metrics_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'axes.middleware.AxesMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -110,15 +126,97 @@ DATABASES = {
         'CLIENT': {
             'host': os.getenv('MONGO_HOST', 'localhost'),
             'port': int(os.getenv('MONGO_PORT', 27017)),
-            'serverSelectionTimeoutMS': 5000,  # Таймаут отв. первого подкл.
+            # Таймаут выбора сервера (первого подключения):
+            'serverSelectionTimeoutMS': int(
+                os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)
+            ),
             'connectTimeoutMS': 3000,          # Таймаут подключения
-            'socketTimeoutMS': 3000            # Таймаут на чтение/запись
+            'socketTimeoutMS': 3000,           # Таймаут на чтение/запись
+            # Пул соединений (на каждый процесс воркера):
+            'maxPoolSize': int(os.getenv('MONGO_MAX_POOL_SIZE', 20)),
+            'minPoolSize': int(os.getenv('MONGO_MIN_POOL_SIZE', 2)),
+            'maxIdleTimeMS': int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 60000)),
+            'waitQueueTimeoutMS': int(
+                os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 2000)
+            ),
         }
     },
 }
 
 DATABASE_ROUTERS = ['core.routers.DatabaseRouter']
 
+# Общий для всех воркеров кэш (нужен для сброса по change stream): файлы
+# в общей памяти хоста (tmpfs /dev/shm), не PostgreSQL - иначе каждое
+# чтение кэша было бы запросом к базе. Для нескольких хостов - memcached
+# (CACHE_BACKEND).
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache',
+        ),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            os.path.join(
+                '/dev/shm' if os.path.isdir('/dev/shm')
+                else tempfile.gettempdir(),
+                'ts_core_cache',
+            ),
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000)),
+        },
+    },
+    # Сессии: файлы в общей памяти воркеров хоста (tmpfs /dev/shm). Для
+    # нескольких хостов - memcached (SESSION_CACHE_BACKEND).
+    'sessions': {
+        'BACKEND': os.getenv(
+            'SESSION_CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache',
+        ),
+        'LOCATION': os.getenv(
+            'SESSION_CACHE_LOCATION',
+            os.path.join(
+                '/dev/shm' if os.path.isdir('/dev/shm')
+                else tempfile.gettempdir(),
+                'ts_core_sessions',
+            ),
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('SESSION_CACHE_MAX_ENTRIES', 10000)),
+        },
+    },
+    # Счетчики django_ratelimit: таблица в общей памяти воркеров хоста.
+    # Для нескольких хостов - memcached (RATELIMIT_CACHE_BACKEND).
+    'ratelimit': {
+        'BACKEND': os.getenv(
+            'RATELIMIT_CACHE_BACKEND', 'core.ratelimit.SharedCounterCache'
+        ),
+        'LOCATION': os.getenv(
+            'RATELIMIT_CACHE_LOCATION',
+            os.path.join(
+                '/dev/shm' if os.path.isdir('/dev/shm')
+                else tempfile.gettempdir(),
+                'ts_core_ratelimit',
+            ),
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('RATELIMIT_MAX_ENTRIES', 65536)),
+        },
+    },
+}
+
+# Время жизни кэша списков и карточек абонентов (секунды). Долгий TTL
+# безопасен, пока запущена команда watch_subscribers; 0 - без кэша.
+SUBSCRIBER_LIST_CACHE_TTL = int(os.getenv('SUBSCRIBER_LIST_CACHE_TTL', 3600))
+SUBSCRIBER_DETAIL_CACHE_TTL = int(
+    os.getenv('SUBSCRIBER_DETAIL_CACHE_TTL', 3600)
+)
+
+# Async-версии списка, карточки и удаления абонентов (motor). Имеет
+# смысл только под ASGI: gunicorn -k uvicorn.workers.UvicornWorker
+ASYNC_SUBSCRIBER_VIEWS = os.getenv('ASYNC_SUBSCRIBER_VIEWS', 'False') == 'True'
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': (
@@ -167,6 +265,47 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REGISTRATION_ACCESS_TOKEN_LIFETIME = timedelta(seconds=86400)
 
+# Каталог, через который воркеры gunicorn объединяют метрики /metrics
+# (у каждого свой файл). Пусто - только метрики ответившего процесса.
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+# Доступ к /metrics: адреса и сети клиента (REMOTE_ADDR) через запятую
+# и/или токен заголовка "Authorization: Bearer <токен>". Пусто - закрыто.
+METRICS_ALLOWED_IPS = [
+    address.strip()
+    for address in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+    if address.strip()
+]
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Журналы log/*.log: сжимать ротированные файлы в .gz; размер очереди
+# записей (при переполнении записи отбрасываются, запрос не ждет диска)
+LOG_COMPRESS_ROTATED = os.getenv('LOG_COMPRESS_ROTATED', 'False') == 'True'
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+
+# Команды MongoDB дольше порога (мс) пишутся в mongo_logger и в таблицу
+# SlowMongoCommand (0 - отключено). Для доли MONGO_EXPLAIN_SAMPLE_RATE
+# из них сохраняется explain() (0 - никогда, 1 - всегда). Очередь записи
+# в таблицу ограничена, при переполнении команды только журналируются.
+MONGO_SLOW_COMMAND_MS = int(os.getenv('MONGO_SLOW_COMMAND_MS', 100))
+MONGO_EXPLAIN_SAMPLE_RATE = float(os.getenv('MONGO_EXPLAIN_SAMPLE_RATE', 0))
+MONGO_SLOW_COMMAND_QUEUE_SIZE = int(
+    os.getenv('MONGO_SLOW_COMMAND_QUEUE_SIZE', 1000)
+)
+
+# Лимиты django_ratelimit. Отключаются только для нагрузочных замеров
+# (команда benchmark_http), где все операторы приходят с одного IP.
+RATELIMIT_ENABLE = os.getenv('RATELIMIT_ENABLE', 'True') == 'True'
+RATELIMIT_USE_CACHE = 'ratelimit'
+
+# Множитель лимитов представлений по роли (core.ratelimit.role_rate),
+# None - без лимита. Роль без множителя ограничивается как указано.
+RATELIMIT_ROLE_MULTIPLIERS = {
+    'anonymous': 1,
+    'guest': 1,
+    'user': int(os.getenv('RATELIMIT_USER_MULTIPLIER', 5)),
+    'superuser': None,
+}
+
 AXES_FAILURE_LIMIT = 3
 
 AXES_COOLOFF_TIME = timedelta(seconds=60)
@@ -179,6 +318,15 @@ AXES_LOCK_OUT_BY_COMBINATION_USER_AND_IP = True
 
 AXES_RESET_ON_SUCCESS = True
 
+# Счетчики неудачных входов - в общей таблице счетчиков (как у
+# django_ratelimit), в PostgreSQL - только записи о блокировках
+AXES_HANDLER = 'users.lockout.AuditedAxesCacheHandler'
+AXES_CACHE = RATELIMIT_USE_CACHE
+
+# Версии пользователей для снимков в сессии (users.middleware): тоже
+# счетчики, поэтому в той же таблице
+USER_VERSION_CACHE = RATELIMIT_USE_CACHE
+
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.yandex.ru')
 EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))
@@ -8,6 +8,7 @@ from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 
+from core.views import metrics
 from users.forms import AuthForm
 from users.views import CustomLoginView, CustomPasswordResetView
 
@@ -95,6 +96,7 @@ app_urls = [
     path('users/', include('users.urls')),
     path('admin/', admin.site.urls),
     path('pages/', include('pages.urls')),
+    path('metrics', metrics, name='metrics'),
 ]
 
 urlpatterns = swagger_urls + auth_urlpatterns + app_urls
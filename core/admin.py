@@ -0,0 +1,74 @@
+import json
+
+from django.contrib import admin
+from django.utils.html import format_html
+
+from .models import SlowMongoCommand
+
+
+@admin.register(SlowMongoCommand)
+class SlowMongoCommandAdmin(admin.ModelAdmin):
+    list_display = (
+        'command',
+        'collection',
+        'count',
+        'total_ms_display',
+        'average_ms_display',
+        'max_ms_display',
+        'last_view',
+        'last_seen',
+    )
+    list_filter = ('command', 'collection')
+    search_fields = ('shape', 'last_view')
+    ordering = ('-total_ms',)
+    fields = (
+        'command',
+        'collection',
+        'count',
+        'total_ms',
+        'max_ms',
+        'last_view',
+        'last_seen',
+        'shape_display',
+        'explain_display',
+        'explained_at',
+    )
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def total_ms_display(self, obj):
+        return f'{obj.total_ms:.0f}'
+
+    total_ms_display.short_description = 'Всего, мс'
+    total_ms_display.admin_order_field = 'total_ms'
+
+    def average_ms_display(self, obj):
+        return f'{obj.average_ms:.1f}'
+
+    average_ms_display.short_description = 'Среднее, мс'
+
+    def max_ms_display(self, obj):
+        return f'{obj.max_ms:.1f}'
+
+    max_ms_display.short_description = 'Максимум, мс'
+    max_ms_display.admin_order_field = 'max_ms'
+
+    def shape_display(self, obj):
+        return pretty_json(json.loads(obj.shape))
+
+    shape_display.short_description = 'Форма команды'
+
+    def explain_display(self, obj):
+        return pretty_json(obj.explain) if obj.explain else None
+
+    explain_display.short_description = 'explain()'
+
+
+def pretty_json(value) -> str:
+    return format_html(
+        '<pre>{}</pre>', json.dumps(value, ensure_ascii=False, indent=2))
@@ -1,56 +1,155 @@
+"""Журналы каналов через очередь и один поток записи на процесс"""
+import atexit
+import gzip
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import shutil
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
 
 from django.conf import settings
 
+from . import metrics
+
+FILE_FORMAT = (
+    '%(asctime)s - %(levelname)s - %(message)s - %(name)s - [%(pathname)s]'
+)
+CONSOLE_FORMAT = '[%(levelname)s] %(message)s'
+
+MAX_LOG_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+LOG_RECORDS_DROPPED = metrics.Counter(
+    'log_records_dropped_total',
+    'Записи журнала, отброшенные из-за переполнения очереди',
+    ('logger',),
+)
+
+
+def gzip_namer(name: str) -> str:
+    return f'{name}.gz'
+
+
+def gzip_rotator(source: str, dest: str) -> None:
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler, который не ждет места в очереди"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Очередь в памяти процесса, pickle не нужен: подставляются только
+        # аргументы (они могут измениться позже), а трассировку
+        # исключения форматирует поток записи.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Например, поток исключений при недоступном MongoDB: запрос
+            # не ждет диска, потеря видна в метрике
+            LOG_RECORDS_DROPPED.inc(record.name)
+
+
+class QueueLogging:
+    """Логгеры каналов и общий для них поток записи"""
 
-class FileRotatingLogger:
     def __init__(
         self,
         log_dir: str,
-        filename: str = 'app.log',
-        max_bytes: int = 5 * 1024 * 1024,
-        backup_count: int = 5,
-        debug: bool = False
+        debug: bool = False,
+        compress: bool = False,
+        queue_size: int = 10000,
+        max_bytes: int = MAX_LOG_BYTES,
+        backup_count: int = LOG_BACKUP_COUNT,
     ) -> None:
-        self.logger = logging.getLogger(__name__)
-        self.logger.setLevel(logging.DEBUG if debug else logging.INFO)
-        self.logger.propagate = False
+        self.log_dir = log_dir
+        self.level = logging.DEBUG if debug else logging.INFO
+        self.debug = debug
+        self.compress = compress
+        self.queue_size = queue_size
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.queue: queue.Queue = queue.Queue(queue_size)
+        self.queue_handlers: list[QueueHandler] = []
+        self.handlers: list[logging.Handler] = []
+        self.listener: Optional[QueueListener] = None
 
-        os.makedirs(log_dir, exist_ok=True)
-        log_path = os.path.join(log_dir, filename)
+        if debug:
+            console_handler = logging.StreamHandler()
+            console_handler.setLevel(logging.DEBUG)
+            console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+            self.handlers.append(console_handler)
 
-        file_formatter = logging.Formatter(
-            '%(asctime)s - %(levelname)s - %(message)s'
-            ' - %(name)s - [%(pathname)s]'
-        )
-        console_formatter = logging.Formatter('[%(levelname)s] %(message)s')
+    def get_logger(self, channel: str, filename: str) -> logging.Logger:
+        name = f'{__name__}.{channel}'
+        logger = logging.getLogger(name)
+        logger.setLevel(self.level)
+        logger.propagate = False
 
+        os.makedirs(self.log_dir, exist_ok=True)
         file_handler = RotatingFileHandler(
-            log_path,
-            maxBytes=max_bytes,
-            backupCount=backup_count,
+            os.path.join(self.log_dir, filename),
+            maxBytes=self.max_bytes,
+            backupCount=self.backup_count,
             encoding='utf-8',
+            delay=True,
         )
-        file_handler.setLevel(logging.DEBUG if debug else logging.INFO)
-        file_handler.setFormatter(file_formatter)
-        self.logger.addHandler(file_handler)
+        if self.compress:
+            file_handler.namer = gzip_namer
+            file_handler.rotator = gzip_rotator
+        file_handler.setLevel(self.level)
+        file_handler.setFormatter(logging.Formatter(FILE_FORMAT))
+        # Поток записи получает записи всех каналов, в файл - только свои:
+        file_handler.addFilter(logging.Filter(name))
+        self.handlers.append(file_handler)
 
-        if debug:
-            console_handler = logging.StreamHandler()
-            console_handler.setLevel(logging.DEBUG)
-            console_handler.setFormatter(console_formatter)
-            self.logger.addHandler(console_handler)
+        queue_handler = NonBlockingQueueHandler(self.queue)
+        self.queue_handlers.append(queue_handler)
+        logger.addHandler(queue_handler)
+        self.start()
+        return logger
+
+    def start(self) -> None:
+        """Перезапускает поток записи с текущим набором обработчиков"""
+        self.stop()
+        self.listener = QueueListener(
+            self.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self) -> None:
+        """Дописывает очередь и останавливает поток записи"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def after_fork(self) -> None:
+        # В воркере gunicorn - своя очередь и свой поток: поток родителя
+        # в дочерний процесс не переходит, а его очередь могла остаться
+        # с захваченной блокировкой.
+        self.listener = None
+        self.queue = queue.Queue(self.queue_size)
+        for queue_handler in self.queue_handlers:
+            queue_handler.queue = self.queue
+        if self.queue_handlers:
+            self.start()
 
-    def get_logger(self: 'FileRotatingLogger') -> logging.Logger:
-        return self.logger
 
+queue_logging = QueueLogging(
+    os.path.join(settings.BASE_DIR, 'log'),
+    debug=settings.DEBUG,
+    compress=settings.LOG_COMPRESS_ROTATED,
+    queue_size=settings.LOG_QUEUE_SIZE,
+)
+os.register_at_fork(after_in_child=queue_logging.after_fork)
+atexit.register(queue_logging.stop)
 
-email_logger = FileRotatingLogger(
-    os.path.join(settings.BASE_DIR, 'log'), 'email.log', debug=settings.DEBUG
-).get_logger()
+email_logger = queue_logging.get_logger('email', 'email.log')
 
-mongo_logger = FileRotatingLogger(
-    os.path.join(settings.BASE_DIR, 'log'), 'mongo.log', debug=settings.DEBUG
-).get_logger()
+mongo_logger = queue_logging.get_logger('mongo', 'mongo.log')
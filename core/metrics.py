@@ -0,0 +1,298 @@
+"""Метрики в формате Prometheus без блокировок на горячем пути"""
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Iterable, Optional
+
+from django.conf import settings
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Период сброса снимка процесса в METRICS_DIR, секунды
+FLUSH_INTERVAL = 5
+
+REGISTRY: dict[str, 'Metric'] = {}
+
+
+class Metric:
+    kind = ''
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Iterable[str] = ()
+    ) -> None:
+        if name in REGISTRY:
+            raise ValueError(f'Метрика {name} уже зарегистрирована')
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: list[dict] = []
+        REGISTRY[name] = self
+
+    def _shard(self) -> dict:
+        # Каждый поток пишет в свой шард, который читает только он сам;
+        # snapshot складывает шарды всех потоков.
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            # list.append атомарен, блокировка не нужна:
+            self._shards.append(shard)
+            return shard
+
+    def snapshot(self) -> dict:
+        """Значения по всем потокам процесса: {labels: value}"""
+        values = {}
+        for shard in list(self._shards):
+            # dict() копирует шард целиком под GIL:
+            for labels, value in dict(shard).items():
+                values[labels] = merge_values(values.get(labels), value)
+        return values
+
+
+class Counter(Metric):
+    kind = COUNTER
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+
+class Gauge(Counter):
+    kind = GAUGE
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    kind = HISTOGRAM
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        """
+        Значение шарда - [количество в каждом бакете..., в +Inf, сумма];
+        накопительные le-счетчики считаются только при выдаче.
+        """
+        shard = self._shard()
+        counts = shard.get(labels)
+        if counts is None:
+            counts = shard[labels] = [0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+
+HTTP_REQUESTS = Counter(
+    'http_requests_total',
+    'Ответы по представлению, методу и статусу',
+    ('view', 'method', 'status'),
+)
+HTTP_REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'Время обработки запроса представлением',
+    ('view',),
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    'http_requests_in_flight',
+    'Запросы, которые обрабатываются сейчас',
+)
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries',
+    'SQL-запросов к PostgreSQL за один HTTP-запрос',
+    ('view',),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+
+# Счетчик SQL-запросов текущего HTTP-запроса. ContextVar, а не
+# threading.local: sync_to_async переносит контекст в свой поток, и
+# запросы async-представлений тоже попадают в счетчик.
+db_query_counter: ContextVar[Optional[list]] = ContextVar(
+    'db_query_counter', default=None)
+
+
+def count_db_query(execute, sql, params, many, context):
+    """execute_wrapper соединения default: +1 к счетчику запроса"""
+    counter = db_query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def install_db_query_counter(sender, connection, **kwargs) -> None:
+    """Обработчик connection_created"""
+    if (
+        connection.alias == 'default'
+        and count_db_query not in connection.execute_wrappers
+    ):
+        connection.execute_wrappers.append(count_db_query)
+
+
+def merge_values(left, right):
+    if left is None:
+        return list(right) if isinstance(right, list) else right
+    if isinstance(right, list):
+        return [a + b for a, b in zip(left, right)]
+    return left + right
+
+
+def process_snapshot() -> dict:
+    """Снимок метрик процесса в JSON-совместимом виде"""
+    return {
+        name: [
+            [list(labels), value]
+            for labels, value in metric.snapshot().items()
+        ]
+        for name, metric in REGISTRY.items()
+    }
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def collect() -> dict[str, dict]:
+    """
+    Значения всех метрик {имя: {labels: value}}: текущий процесс плюс
+    снимки остальных процессов из METRICS_DIR.
+    """
+    # Снимки завершившихся воркеров учитываются в счетчиках и
+    # гистограммах, а в gauge - только живых процессов.
+    snapshots = [(os.getpid(), process_snapshot())]
+    metrics_dir = settings.METRICS_DIR
+    if metrics_dir and os.path.isdir(metrics_dir):
+        for filename in os.listdir(metrics_dir):
+            pid, extension = os.path.splitext(filename)
+            if extension != '.json' or pid == str(os.getpid()):
+                continue
+            try:
+                with open(os.path.join(metrics_dir, filename)) as file:
+                    snapshots.append((int(pid), json.load(file)))
+            except (OSError, ValueError):
+                continue
+
+    values = {name: {} for name in REGISTRY}
+    for pid, snapshot in snapshots:
+        alive = None
+        for name, items in snapshot.items():
+            metric = REGISTRY.get(name)
+            if metric is None:
+                continue
+            if metric.kind == GAUGE:
+                if alive is None:
+                    alive = pid_alive(pid)
+                if not alive:
+                    continue
+            for labels, value in items:
+                labels = tuple(labels)
+                values[name][labels] = merge_values(
+                    values[name].get(labels), value)
+    return values
+
+
+def escape_label(value: str) -> str:
+    return (
+        str(value).replace('\\', r'\\').replace('\n', r'\n')
+        .replace('"', r'\"')
+    )
+
+
+def format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = ','.join(
+        f'{name}="{escape_label(value)}"' for name, value in zip(names, values)
+    )
+    return f'{{{pairs}}}' if pairs else ''
+
+
+def format_number(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render() -> str:
+    """Все метрики в текстовом формате Prometheus 0.0.4"""
+    lines = []
+    for name, values in collect().items():
+        metric = REGISTRY[name]
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        if metric.kind != HISTOGRAM:
+            if not values and not metric.labelnames:
+                values = {(): 0}
+            for labels, value in sorted(values.items()):
+                labels = format_labels(metric.labelnames, labels)
+                lines.append(f'{name}{labels} {format_number(value)}')
+            continue
+
+        le_names = metric.labelnames + ('le',)
+        for labels, counts in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (math.inf,), counts):
+                cumulative += count
+                bucket_labels = format_labels(
+                    le_names, labels + (format_number(bound),))
+                lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+            labels = format_labels(metric.labelnames, labels)
+            lines.append(f'{name}_sum{labels} {format_number(counts[-1])}')
+            lines.append(f'{name}_count{labels} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def flush() -> None:
+    """Сбрасывает снимок процесса в METRICS_DIR/<pid>.json"""
+    metrics_dir = settings.METRICS_DIR
+    if not metrics_dir:
+        return
+    os.makedirs(metrics_dir, exist_ok=True)
+    path = os.path.join(metrics_dir, f'{os.getpid()}.json')
+    with open(f'{path}.tmp', 'w') as file:
+        json.dump(process_snapshot(), file)
+    os.replace(f'{path}.tmp', path)
+
+
+_flusher_pid: Optional[int] = None
+
+
+def start_flusher() -> None:
+    """Фоновый сброс снимка раз в FLUSH_INTERVAL (один поток на процесс)"""
+    global _flusher_pid
+    if not settings.METRICS_DIR or _flusher_pid == os.getpid():
+        return
+    _flusher_pid = os.getpid()
+
+    def run() -> None:
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            try:
+                flush()
+            except OSError:
+                pass
+
+    threading.Thread(target=run, name='metrics-flush', daemon=True).start()
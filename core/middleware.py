@@ -0,0 +1,74 @@
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from django.http import HttpRequest, HttpResponse
+from django.utils.decorators import sync_and_async_middleware
+
+from . import metrics
+
+# Запрос, который обрабатывается в текущем контексте (для журналов
+# команд Mongo, вызванных из представления)
+current_request: ContextVar[Optional[HttpRequest]] = ContextVar(
+    'current_request', default=None)
+
+
+def view_name(request: Optional[HttpRequest]) -> str:
+    """Имя URL представления, а не путь: не растет с числом IMSI"""
+    if request is None:
+        return ''
+    match = request.resolver_match
+    return match.view_name if match is not None else 'unresolved'
+
+
+def start_request(request: HttpRequest) -> tuple[float, object, object]:
+    metrics.HTTP_REQUESTS_IN_FLIGHT.inc()
+    counter_token = metrics.db_query_counter.set([0])
+    request_token = current_request.set(request)
+    return time.perf_counter(), counter_token, request_token
+
+
+def finish_request(
+    request: HttpRequest,
+    response: Optional[HttpResponse],
+    started: tuple[float, object, object],
+) -> None:
+    start, counter_token, request_token = started
+    duration = time.perf_counter() - start
+    queries = metrics.db_query_counter.get()[0]
+    metrics.db_query_counter.reset(counter_token)
+    current_request.reset(request_token)
+    metrics.HTTP_REQUESTS_IN_FLIGHT.dec()
+
+    view = view_name(request)
+    status = str(response.status_code) if response is not None else '500'
+    metrics.HTTP_REQUESTS.inc(view, request.method, status)
+    metrics.HTTP_REQUEST_DURATION.observe(duration, view)
+    metrics.HTTP_REQUEST_DB_QUERIES.observe(queries, view)
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response: Callable) -> Callable:
+    """Время, статус и число SQL-запросов по каждому представлению"""
+    metrics.start_flusher()
+
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request: HttpRequest) -> HttpResponse:
+            started = start_request(request)
+            response = None
+            try:
+                response = await get_response(request)
+                return response
+            finally:
+                finish_request(request, response, started)
+    else:
+        def middleware(request: HttpRequest) -> HttpResponse:
+            started = start_request(request)
+            response = None
+            try:
+                response = get_response(request)
+                return response
+            finally:
+                finish_request(request, response, started)
+    return middleware
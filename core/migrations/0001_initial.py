@@ -0,0 +1,36 @@
+# Generated by Django 3.1.12 on 2026-10-18 15:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowMongoCommand',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=40, unique=True, verbose_name='Отпечаток формы')),
+                ('command', models.CharField(max_length=64, verbose_name='Команда')),
+                ('collection', models.CharField(blank=True, max_length=128, verbose_name='Коллекция')),
+                ('shape', models.TextField(verbose_name='Форма команды')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Количество')),
+                ('total_ms', models.FloatField(default=0, verbose_name='Всего, мс')),
+                ('max_ms', models.FloatField(default=0, verbose_name='Максимум, мс')),
+                ('last_view', models.CharField(blank=True, max_length=200, verbose_name='Последнее представление')),
+                ('last_seen', models.DateTimeField(verbose_name='Последний раз')),
+                ('explain', models.JSONField(blank=True, null=True, verbose_name='explain()')),
+                ('explained_at', models.DateTimeField(null=True, verbose_name='Время explain()')),
+            ],
+            options={
+                'verbose_name': 'медленная команда MongoDB',
+                'verbose_name_plural': 'Медленные команды MongoDB',
+                'ordering': ('-total_ms',),
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import models
+
+MAX_COMMAND_NAME_LEN = 64
+MAX_COLLECTION_NAME_LEN = 128
+MAX_VIEW_NAME_LEN = 200
+FINGERPRINT_LEN = 40
+
+
+class SlowMongoCommand(models.Model):
+    """
+    Медленные команды MongoDB, сгруппированные по форме (команда без
+    значений): сколько раз встречалась и сколько времени заняла.
+    """
+
+    fingerprint = models.CharField(
+        'Отпечаток формы', max_length=FINGERPRINT_LEN, unique=True)
+    command = models.CharField('Команда', max_length=MAX_COMMAND_NAME_LEN)
+    collection = models.CharField(
+        'Коллекция', max_length=MAX_COLLECTION_NAME_LEN, blank=True)
+    shape = models.TextField('Форма команды')
+    count = models.PositiveIntegerField('Количество', default=0)
+    total_ms = models.FloatField('Всего, мс', default=0)
+    max_ms = models.FloatField('Максимум, мс', default=0)
+    last_view = models.CharField(
+        'Последнее представление', max_length=MAX_VIEW_NAME_LEN, blank=True)
+    last_seen = models.DateTimeField('Последний раз')
+    explain = models.JSONField('explain()', null=True, blank=True)
+    explained_at = models.DateTimeField('Время explain()', null=True)
+
+    class Meta:
+        verbose_name = 'медленная команда MongoDB'
+        verbose_name_plural = 'Медленные команды MongoDB'
+        ordering = ('-total_ms',)
+
+    def __str__(self) -> str:
+        return f'{self.command} {self.collection}'
+
+    @property
+    def average_ms(self) -> float:
+        return self.total_ms / self.count if self.count else 0
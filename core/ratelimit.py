@@ -0,0 +1,218 @@
+"""
+Общее для всех воркеров хранилище счетчиков django_ratelimit и лимиты
+по ролям.
+
+SharedCounterCache - кэш-бэкенд только для целых счетчиков: таблица
+фиксированного размера в файле, отображенном в память (mmap) всеми
+процессами хоста. Каждая операция выполняется под flock файла, поэтому
+add/incr атомарны между воркерами gunicorn, а размер таблицы не растет:
+при нехватке места вытесняется счетчик, истекающий раньше других.
+
+role_rate масштабирует лимит представления множителем роли из
+RATELIMIT_ROLE_MULTIPLIERS (None - без лимита).
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from django.conf import settings
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.http import HttpRequest
+
+# Ячейка: 16 байт хеша ключа, время истечения (0 - свободна), значение
+SLOT = struct.Struct('<16sdq')
+DEFAULT_SLOT_COUNT = 65536
+# Сколько соседних ячеек просматривается при поиске ключа
+PROBE_LIMIT = 16
+
+ANONYMOUS_ROLE = 'anonymous'
+SUPERUSER_ROLE = 'superuser'
+
+
+class CounterTable:
+    """Файл таблицы, отображенный в память текущего процесса"""
+
+    def __init__(self, path: str, size: int) -> None:
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self.locked():
+            if os.fstat(self.fd).st_size < size:
+                os.ftruncate(self.fd, size)
+        self.map = mmap.mmap(self.fd, size)
+        self.pid = os.getpid()
+        # flock не исключает потоки с общим дескриптором:
+        self.thread_lock = threading.Lock()
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+
+# Таблицы процесса по пути. Экземпляры кэша у Django свои в каждом
+# потоке, а файл открывается один раз на процесс: дескриптор, унаследованный
+# через fork, делил бы flock между родителем и воркером.
+_tables: dict[str, CounterTable] = {}
+_tables_lock = threading.Lock()
+
+
+def get_table(path: str, size: int) -> CounterTable:
+    table = _tables.get(path)
+    if table is None or table.pid != os.getpid():
+        with _tables_lock:
+            table = _tables.get(path)
+            if table is None or table.pid != os.getpid():
+                table = _tables[path] = CounterTable(path, size)
+    return table
+
+
+class SharedCounterCache(BaseCache):
+    """
+    LOCATION - путь к файлу таблицы (лучше в /dev/shm), OPTIONS
+    MAX_ENTRIES - число ячеек по SLOT.size байт.
+    """
+
+    def __init__(self, location: str, params: dict) -> None:
+        super().__init__(params)
+        self.path = location
+        self.slot_count = params.get('OPTIONS', {}).get(
+            'MAX_ENTRIES', DEFAULT_SLOT_COUNT)
+
+    def _locked(self, operation: Callable):
+        table = get_table(self.path, self.slot_count * SLOT.size)
+        with table.thread_lock, table.locked():
+            return operation(table.map)
+
+    def _digest(self, key, version) -> bytes:
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return hashlib.blake2b(key.encode(), digest_size=16).digest()
+
+    def _find(
+        self, table: mmap.mmap, digest: bytes, now: float
+    ) -> tuple[int, bool]:
+        """
+        (смещение ячейки, найден ли ключ). Если ключа нет - свободная
+        или истекшая ячейка, а без них - истекающая раньше остальных.
+        """
+        start = int.from_bytes(digest[:8], 'little') % self.slot_count
+        candidate, candidate_expires = None, None
+        for probe in range(PROBE_LIMIT):
+            offset = (start + probe) % self.slot_count * SLOT.size
+            slot_digest, expires, _ = SLOT.unpack_from(table, offset)
+            alive = expires > now
+            if alive and slot_digest == digest:
+                return offset, True
+            if not alive:
+                expires = 0
+            if candidate is None or expires < candidate_expires:
+                candidate, candidate_expires = offset, expires
+        return candidate, False
+
+    @staticmethod
+    def _expires(timeout) -> float:
+        return float('inf') if timeout is None else timeout
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        digest = self._digest(key, version)
+        expires = self._expires(self.get_backend_timeout(timeout))
+
+        def operation(table):
+            offset, found = self._find(table, digest, time.time())
+            if found:
+                return False
+            SLOT.pack_into(table, offset, digest, expires, int(value))
+            return True
+        return self._locked(operation)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        digest = self._digest(key, version)
+        expires = self._expires(self.get_backend_timeout(timeout))
+
+        def operation(table):
+            offset, _ = self._find(table, digest, time.time())
+            SLOT.pack_into(table, offset, digest, expires, int(value))
+        self._locked(operation)
+
+    def get(self, key, default=None, version=None):
+        digest = self._digest(key, version)
+
+        def operation(table):
+            offset, found = self._find(table, digest, time.time())
+            if not found:
+                return default
+            return SLOT.unpack_from(table, offset)[2]
+        return self._locked(operation)
+
+    def incr(self, key, delta=1, version=None):
+        digest = self._digest(key, version)
+
+        def operation(table):
+            offset, found = self._find(table, digest, time.time())
+            if not found:
+                raise ValueError(f'Ключ {key!r} не найден')
+            _, expires, value = SLOT.unpack_from(table, offset)
+            SLOT.pack_into(
+                table, offset, digest, expires, value + delta)
+            return value + delta
+        return self._locked(operation)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        digest = self._digest(key, version)
+        expires = self._expires(self.get_backend_timeout(timeout))
+
+        def operation(table):
+            offset, found = self._find(table, digest, time.time())
+            if found:
+                value = SLOT.unpack_from(table, offset)[2]
+                SLOT.pack_into(table, offset, digest, expires, value)
+            return found
+        return self._locked(operation)
+
+    def delete(self, key, version=None):
+        digest = self._digest(key, version)
+
+        def operation(table):
+            offset, found = self._find(table, digest, time.time())
+            if found:
+                SLOT.pack_into(table, offset, bytes(16), 0, 0)
+            return found
+        return self._locked(operation)
+
+    def clear(self):
+        def operation(table):
+            table[:] = bytes(len(table))
+        self._locked(operation)
+
+
+def request_role(request: HttpRequest) -> str:
+    user = request.user
+    if not user.is_authenticated:
+        return ANONYMOUS_ROLE
+    if user.is_superuser:
+        return SUPERUSER_ROLE
+    return user.role
+
+
+def role_rate(rate: str) -> Callable:
+    """
+    rate для ratelimit: лимит '20/m', умноженный на множитель роли
+    пользователя. Роль без множителя ограничивается как указано.
+    """
+    count, period = rate.split('/', 1)
+
+    def get_rate(group: str, request: HttpRequest) -> Optional[str]:
+        multiplier = settings.RATELIMIT_ROLE_MULTIPLIERS.get(
+            request_role(request), 1)
+        if multiplier is None:
+            return None
+        return f'{int(count) * multiplier}/{period}'
+    return get_rate
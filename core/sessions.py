@@ -0,0 +1,69 @@
+"""
+Сессии с редкой записью в PostgreSQL (SESSION_ENGINE = 'core.sessions').
+
+При SESSION_SAVE_EVERY_REQUEST каждый запрос продлевает сессию, и
+штатный движок делает UPDATE django_session на каждый клик. Здесь
+продление без изменения данных выполняется не чаще, чем раз в
+SESSION_REFRESH_INTERVAL, и только в кэше (SESSION_CACHE_ALIAS), а в
+PostgreSQL - не чаще, чем раз в SESSION_DB_REFRESH_INTERVAL. Изменения
+данных (вход, выход, смена ключа) записываются сразу в обе базы.
+
+Цена: истечение сессии смещается раньше не больше чем на интервал
+продления, а если сессию вытеснили из кэша - на интервал записи в БД.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db
+from django.contrib.sessions.backends.base import UpdateError
+
+from . import metrics
+
+# Когда сессия последний раз записывалась в кэш и в PostgreSQL (unix time)
+CACHE_SAVED_AT_KEY = '_cache_saved_at'
+DB_SAVED_AT_KEY = '_db_saved_at'
+
+SESSION_SAVES = metrics.Counter(
+    'session_saves_total',
+    'Сохранения сессии: skipped - без записи, cache - только в кэш, '
+    'db - в кэш и PostgreSQL',
+    ('target',),
+)
+
+
+class SessionStore(cached_db.SessionStore):
+    # Источник времени, подменяется в бенчмарке benchmark_sessions
+    clock = staticmethod(time.time)
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        now = self.clock()
+        if must_create or self.modified:
+            self.save_to_db(now, must_create)
+            return
+
+        session = self._session
+        if now - session.get(DB_SAVED_AT_KEY, 0) >= (
+            settings.SESSION_DB_REFRESH_INTERVAL
+        ):
+            try:
+                self.save_to_db(now)
+            except UpdateError:
+                # Строку уже удалила clearsessions, а в кэше сессия жива:
+                self.save_to_db(now, must_create=True)
+        elif now - session.get(CACHE_SAVED_AT_KEY, 0) >= (
+            settings.SESSION_REFRESH_INTERVAL
+        ):
+            session[CACHE_SAVED_AT_KEY] = now
+            self._cache.set(
+                self.cache_key, session, self.get_expiry_age())
+            SESSION_SAVES.inc('cache')
+        else:
+            SESSION_SAVES.inc('skipped')
+
+    def save_to_db(self, now: float, must_create: bool = False) -> None:
+        session = self._get_session(no_load=must_create)
+        session[CACHE_SAVED_AT_KEY] = session[DB_SAVED_AT_KEY] = now
+        super().save(must_create)
+        SESSION_SAVES.inc('db')
@@ -0,0 +1,172 @@
+import json
+import os
+import tempfile
+import threading
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import PermissionDenied
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from users.models import Roles, User
+
+from . import metrics, sessions, views
+from .logger import QueueLogging
+from .ratelimit import SharedCounterCache, role_rate
+
+
+class MetricsTests(SimpleTestCase):
+    def test_thread_shards_sum_up(self):
+        def work():
+            for _ in range(1000):
+                metrics.HTTP_REQUESTS.inc('test:shards', 'GET', '200')
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertIn(
+            'http_requests_total{view="test:shards",method="GET",'
+            'status="200"} 4000',
+            metrics.render(),
+        )
+
+    def test_snapshots_of_other_processes_are_merged(self):
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            # PID завершившегося воркера: больше любого возможного pid
+            with open(os.path.join(metrics_dir, '99999999.json'), 'w') as f:
+                json.dump({
+                    'http_requests_total': [
+                        [['test:merge', 'GET', '200'], 5]],
+                    'http_requests_in_flight': [[[], 7]],
+                }, f)
+            with override_settings(METRICS_DIR=metrics_dir):
+                metrics.HTTP_REQUESTS.inc('test:merge', 'GET', '200')
+                output = metrics.render()
+
+        self.assertIn(
+            'http_requests_total{view="test:merge",method="GET",'
+            'status="200"} 6',
+            output,
+        )
+        # gauge завершившегося процесса не учитывается:
+        self.assertNotIn('http_requests_in_flight 7', output)
+
+    @override_settings(
+        METRICS_ALLOWED_IPS=['10.0.0.0/8'], METRICS_TOKEN='scrape-token')
+    def test_view_allows_only_listed_networks_or_token(self):
+        factory = RequestFactory()
+        response = views.metrics(
+            factory.get('/metrics', REMOTE_ADDR='10.1.2.3'))
+        self.assertEqual(response.status_code, 200)
+        for request in (
+            factory.get('/metrics'),
+            factory.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong'),
+        ):
+            with self.assertRaises(PermissionDenied):
+                views.metrics(request)
+        response = views.metrics(factory.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer scrape-token'))
+        self.assertEqual(response.status_code, 200)
+
+
+class QueueLoggingTests(SimpleTestCase):
+
+    def test_channels_write_own_files_and_gzip_rotated(self):
+        with tempfile.TemporaryDirectory() as log_dir:
+            logging = QueueLogging(log_dir, compress=True, max_bytes=200)
+            first = logging.get_logger('test_first', 'first.log')
+            second = logging.get_logger('test_second', 'second.log')
+            for number in range(5):
+                first.info('первый канал %d', number)
+            second.info('второй канал')
+            logging.stop()
+
+            with open(os.path.join(log_dir, 'second.log')) as file:
+                self.assertNotIn('первый', file.read())
+            self.assertIn('first.log.1.gz', os.listdir(log_dir))
+
+
+@override_settings(
+    CACHES={'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    SESSION_CACHE_ALIAS='sessions',
+    SESSION_REFRESH_INTERVAL=60,
+    SESSION_DB_REFRESH_INTERVAL=600,
+)
+class LowWriteSessionTests(SimpleTestCase):
+
+    def make_store(self, db_saved_at: float) -> sessions.SessionStore:
+        store = sessions.SessionStore('a' * 32)
+        store._session_cache = {
+            '_auth_user_id': '1',
+            sessions.CACHE_SAVED_AT_KEY: db_saved_at,
+            sessions.DB_SAVED_AT_KEY: db_saved_at,
+        }
+        store.clock = lambda: 1000
+        return store
+
+    def test_refresh_without_changes_skips_database(self):
+        # SimpleTestCase упадет на любом SQL-запросе:
+        store = self.make_store(db_saved_at=990)
+        store.save()
+        self.assertIsNone(store._cache.get(store.cache_key))
+
+        store = self.make_store(db_saved_at=900)
+        store.save()
+        self.assertEqual(
+            store._cache.get(store.cache_key)[sessions.CACHE_SAVED_AT_KEY],
+            1000,
+        )
+
+
+class SharedCounterCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'ratelimit')
+
+    def make_cache(self) -> SharedCounterCache:
+        return SharedCounterCache(self.path, {'OPTIONS': {'MAX_ENTRIES': 8}})
+
+    def test_counters_are_shared_between_instances(self):
+        first, second = self.make_cache(), self.make_cache()
+        self.assertTrue(first.add('rl:key', 0, 60))
+        self.assertFalse(second.add('rl:key', 0, 60))
+        self.assertEqual(first.incr('rl:key'), 1)
+        self.assertEqual(second.incr('rl:key'), 2)
+        self.assertEqual(first.get('rl:key'), 2)
+        with self.assertRaises(ValueError):
+            first.incr('rl:missing')
+
+    def test_table_size_is_fixed(self):
+        cache = self.make_cache()
+        for number in range(100):
+            cache.add(f'rl:{number}', number, 60)
+        self.assertEqual(cache.get('rl:99'), 99)
+        self.assertEqual(os.path.getsize(self.path), 8 * 32)
+
+    def test_expired_counter_is_gone(self):
+        cache = self.make_cache()
+        cache.add('rl:key', 5, 0)
+        self.assertIsNone(cache.get('rl:key'))
+        self.assertTrue(cache.add('rl:key', 0, 60))
+
+
+@override_settings(RATELIMIT_ROLE_MULTIPLIERS={
+    'anonymous': 1, 'user': 5, 'superuser': None})
+class RoleRateTests(SimpleTestCase):
+
+    def test_rate_is_scaled_by_role(self):
+        get_rate = role_rate('20/m')
+        request = RequestFactory().get('/')
+
+        request.user = AnonymousUser()
+        self.assertEqual(get_rate('group', request), '20/m')
+        request.user = User(role=Roles.USER)
+        self.assertEqual(get_rate('group', request), '100/m')
+        request.user = User(role=Roles.GUEST)
+        self.assertEqual(get_rate('group', request), '20/m')
+        request.user = User(role=Roles.USER, is_superuser=True)
+        self.assertIsNone(get_rate('group', request))
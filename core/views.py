@@ -1,10 +1,16 @@
+import ipaddress
 from http import HTTPStatus
 from typing import Optional
 
+from django.conf import settings
 from django.contrib.sites.shortcuts import get_current_site
+from django.core.exceptions import PermissionDenied
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import render
 from django.urls.exceptions import Resolver404
+from django.utils.crypto import constant_time_compare
+
+from . import metrics as app_metrics
 
 
 def bad_request(
@@ -49,3 +55,30 @@ def too_many_requests(
     return render(
         request, 'core/429.html', status=HTTPStatus.TOO_MANY_REQUESTS
     )
+
+
+def metrics_allowed(request: HttpRequest) -> bool:
+    """Токен METRICS_TOKEN или адрес клиента из METRICS_ALLOWED_IPS"""
+    token = settings.METRICS_TOKEN
+    if token and constant_time_compare(
+        request.headers.get('Authorization', ''), f'Bearer {token}'
+    ):
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network, strict=False)
+        for network in settings.METRICS_ALLOWED_IPS
+    )
+
+
+def metrics(request: HttpRequest) -> HttpResponse:
+    """Метрики для Prometheus"""
+    if not metrics_allowed(request):
+        raise PermissionDenied
+    return HttpResponse(
+        app_metrics.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,41 @@
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+workers = int(os.getenv('GUNICORN_WORKERS', 2))
+
+# gthread: heartbeat воркера идет из основного потока, поэтому длинные
+# потоковые ответы (выгрузка абонентов) не убиваются по timeout.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+
+
+def on_starting(server):
+    """Снимки метрик прошлого запуска в METRICS_DIR больше не нужны"""
+    metrics_dir = os.getenv('METRICS_DIR')
+    if not metrics_dir or not os.path.isdir(metrics_dir):
+        return
+    for filename in os.listdir(metrics_dir):
+        if filename.endswith(('.json', '.tmp')):
+            os.remove(os.path.join(metrics_dir, filename))
+
+
+def post_worker_init(worker):
+    """Свой пул MongoClient в каждом воркере, прогретый до первых запросов"""
+    from open5gs.mongo import mongo_client_manager
+
+    mongo_client_manager.warm_up()
+
+
+def worker_exit(server, worker):
+    from core import metrics
+    from core.logger import queue_logging
+    from open5gs.mongo import mongo_client_manager
+
+    mongo_client_manager.close()
+    # Последний снимок, чтобы счетчики воркера не потерялись:
+    metrics.flush()
+    queue_logging.stop()
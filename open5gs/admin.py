@@ -1,19 +1,50 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.http import HttpResponseRedirect
+from django.template.response import TemplateResponse
+from django.utils.functional import cached_property
+from pymongo.errors import PyMongoError
 
+from core.logger import mongo_logger
+
+from .cache import invalidate_subscribers
 from .constants import MAX_SUBSCRIBER_PER_PAGE
-from .forms import SubscriberForm
+from .counts import cached_count, count_subscribers
+from .forms import ProvisioningForm, SubscriberForm
 from .models import Subscriber
+from .pipeline import error_text
+from .provisioning import provision_subscribers
+from .repository import SubscriberConflictError, subscriber_repository
+
+
+class SubscriberAdminPaginator(Paginator):
+    """
+    Для полного списка берет оценку количества по метаданным коллекции,
+    для отфильтрованного - кэширует count() запроса djongo.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        queryset = self.object_list
+        if not queryset.query.where:
+            return count_subscribers()
+        return cached_count(str(queryset.query), queryset.count)
 
 
 @admin.register(Subscriber)
 class SubscriberAdmin(admin.ModelAdmin):
     list_display = ('imsi', 'subscriber_status', 'operator_determined_barring')
     list_per_page = MAX_SUBSCRIBER_PER_PAGE
+    paginator = SubscriberAdminPaginator
+    show_full_result_count = False
     search_fields = ('imsi',)
     list_filter = ('subscriber_status', 'operator_determined_barring',)
     ordering = ('-pk',)
     list_editable = ('subscriber_status', 'operator_determined_barring')
     form = SubscriberForm
+    actions = ('provision_from_template',)
 
     fieldsets = (
         ('Subscriber Configuration', {
@@ -33,3 +64,129 @@ class SubscriberAdmin(admin.ModelAdmin):
 
     class Media:
         js = ('js/subscriber_form/unit_mapping_admin.js',)
+
+    def save_model(self, request, obj, form, change):
+        """
+        Запись через репозиторий, а не полным документом djongo: иначе
+        затирается security.sqn, который HSS/UDR меняет при каждой
+        аутентификации. Кэш сбрасывает сам репозиторий.
+        """
+        try:
+            if isinstance(form, SubscriberForm):
+                form.save_to_repository(obj)
+            else:
+                # Форма list_editable: только измененные колонки
+                self.update_columns(obj, form.changed_data)
+        except SubscriberConflictError:
+            obj.save_failed = True
+            self.message_user(
+                request,
+                f'Абонент {obj.imsi} был изменен или удален другим '
+                'пользователем. Изменения не сохранены',
+                messages.ERROR,
+            )
+        except ValidationError as e:
+            obj.save_failed = True
+            self.message_user(request, error_text(e), messages.ERROR)
+
+    @staticmethod
+    def update_columns(obj: Subscriber, fields: list[str]) -> None:
+        if not fields:
+            return
+        updated = subscriber_repository.update(
+            obj.imsi, {field: getattr(obj, field) for field in fields})
+        if updated is None:
+            raise SubscriberConflictError(obj.imsi)
+
+    def log_addition(self, request, object, message):
+        if not getattr(object, 'save_failed', False):
+            return super().log_addition(request, object, message)
+
+    def log_change(self, request, object, message):
+        if not getattr(object, 'save_failed', False):
+            return super().log_change(request, object, message)
+
+    def response_add(self, request, obj, post_url_continue=None):
+        # Форма открывается снова, сообщение об ошибке уже добавлено:
+        if getattr(obj, 'save_failed', False):
+            return HttpResponseRedirect(request.get_full_path())
+        return super().response_add(request, obj, post_url_continue)
+
+    def response_change(self, request, obj):
+        if getattr(obj, 'save_failed', False):
+            return HttpResponseRedirect(request.get_full_path())
+        return super().response_change(request, obj)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_subscribers(obj.imsi)
+
+    def delete_queryset(self, request, queryset):
+        imsis = list(queryset.values_list('imsi', flat=True))
+        super().delete_queryset(request, queryset)
+        invalidate_subscribers(*imsis)
+
+    def provision_from_template(self, request, queryset):
+        imsis = list(queryset.values_list('imsi', flat=True)[:2])
+        if len(imsis) != 1:
+            self.message_user(
+                request, 'Выберите одного абонента-шаблон', messages.WARNING)
+            return None
+
+        template_imsi = imsis[0]
+        form = ProvisioningForm(
+            request.POST if 'apply' in request.POST else None)
+        if form.is_valid():
+            try:
+                self.provision(request, template_imsi, form.cleaned_data)
+            except ValidationError as e:
+                form.add_error(None, e)
+            else:
+                return None
+
+        context = {
+            **self.admin_site.each_context(request),
+            'title': f'Создание абонентов по шаблону {template_imsi}',
+            'opts': self.model._meta,
+            'form': form,
+            'template_imsi': template_imsi,
+            'queryset': queryset,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        }
+        return TemplateResponse(
+            request, 'admin/open5gs/subscriber/provision.html', context)
+
+    provision_from_template.short_description = (
+        'Создать диапазон абонентов по шаблону')
+
+    def provision(self, request, template_imsi: str, data: dict) -> None:
+        try:
+            template = subscriber_repository.get_by_imsi(template_imsi)
+            if template is None:
+                raise ValidationError(f'Абонент {template_imsi} не найден')
+            inserted = existing = failed = 0
+            for chunk_inserted, chunk_existing, errors in (
+                provision_subscribers(
+                    template,
+                    data['start'],
+                    data['count'],
+                    random_k=data['random_k'],
+                    random_opc=data['random_opc'],
+                )
+            ):
+                inserted += chunk_inserted
+                existing += len(chunk_existing)
+                failed += len(errors)
+        except PyMongoError as e:
+            mongo_logger.exception(e)
+            raise ValidationError(f'Ошибка MongoDB: {e}')
+        except ValidationError as e:
+            raise ValidationError(error_text(e))
+
+        self.message_user(
+            request,
+            f'Добавлено абонентов: {inserted}, IMSI заняты: {existing}, '
+            f'ошибок: {failed}',
+            messages.SUCCESS if not existing and not failed
+            else messages.WARNING,
+        )
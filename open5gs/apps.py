@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class Open5gsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'open5gs'
+
+    def ready(self):
+        from pymongo import monitoring
+
+        from .mongo import command_metrics_listener
+        from .slow_commands import slow_command_listener
+
+        # До создания первого клиента, чтобы слушатели попали во все:
+        monitoring.register(command_metrics_listener)
+        monitoring.register(slow_command_listener)
@@ -0,0 +1,61 @@
+import asyncio
+import os
+from typing import Optional
+
+from django.conf import settings
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+
+from . import mongo
+
+
+class AsyncMongoClientManager:
+    """
+    Клиент motor для async-представлений: один на процесс и цикл событий.
+    Под ASGI (uvicorn) цикл в воркере один, поэтому пул живет весь срок
+    воркера. Параметры пула те же, что у синхронного MongoClient.
+    """
+
+    def __init__(self) -> None:
+        self._client: Optional[AsyncIOMotorClient] = None
+        self._pid: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.pool_listener = mongo.PoolStatsListener()
+
+    def get_client(self) -> AsyncIOMotorClient:
+        pid, loop = os.getpid(), asyncio.get_running_loop()
+        if (
+            self._client is not None
+            and self._pid == pid
+            and self._loop is loop
+        ):
+            return self._client
+
+        if self._client is not None and self._pid == pid:
+            # Цикл сменился (async-представление под WSGI): старый клиент
+            # привязан к закрытому циклу и больше не нужен.
+            self._client.close()
+        client_settings = settings.DATABASES[
+            mongo.MONGO_DATABASE_ALIAS]['CLIENT']
+        self.pool_listener.reset()
+        self._client = AsyncIOMotorClient(
+            connect=False,
+            event_listeners=[self.pool_listener],
+            io_loop=loop,
+            **client_settings,
+        )
+        self._pid, self._loop = pid, loop
+        return self._client
+
+    def close(self) -> None:
+        if self._client is not None and self._pid == os.getpid():
+            self._client.close()
+        self._client = self._pid = self._loop = None
+
+
+async_mongo_client_manager = AsyncMongoClientManager()
+
+
+def get_async_subscribers_collection() -> AsyncIOMotorCollection:
+    name = settings.DATABASES[mongo.MONGO_DATABASE_ALIAS]['NAME']
+    client = async_mongo_client_manager.get_client()
+    return client[name][mongo.SUBSCRIBERS_COLLECTION]
@@ -0,0 +1,131 @@
+import json
+from typing import Any, Iterable, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReturnDocument
+
+from .async_mongo import get_async_subscribers_collection
+from .cache import (
+    COUNT_NAMESPACE,
+    acached,
+    detail_key,
+    invalidate_subscribers,
+    remember_imsi,
+    versioned_key
+)
+from .constants import SUBSCRIBER_COUNT_CACHE_TTL
+from .repository import protect_sqn
+from .utils import MongoJSONEncoder
+
+
+class AsyncSubscriberRepository:
+    """
+    Асинхронный вариант SubscriberRepository поверх motor для
+    async-представлений: запрос к Mongo не занимает поток воркера.
+    Кэш и его сброс те же, что у синхронного репозитория.
+    """
+
+    def __init__(
+        self, collection: Optional[AsyncIOMotorCollection] = None
+    ) -> None:
+        self._collection = collection
+
+    @property
+    def collection(self) -> AsyncIOMotorCollection:
+        if self._collection is not None:
+            return self._collection
+        return get_async_subscribers_collection()
+
+    async def find(
+        self,
+        filter: Optional[dict] = None,
+        projection: Optional[Iterable[str]] = None,
+        sort: Optional[list[tuple[str, int]]] = None,
+        limit: int = 0,
+    ) -> list[dict]:
+        cursor = self.collection.find(
+            filter or {}, projection=projection, sort=sort, limit=limit)
+        return await cursor.to_list(length=None)
+
+    async def count(
+        self, filter: Optional[dict] = None, exact: bool = False
+    ) -> int:
+        """Как counts.count_subscribers"""
+        if exact:
+            return await self.collection.count_documents(filter or {})
+        if not filter:
+            return await self.collection.estimated_document_count()
+
+        source = json.dumps(filter, cls=MongoJSONEncoder, sort_keys=True)
+        return await acached(
+            lambda: versioned_key(COUNT_NAMESPACE, source),
+            lambda: self.collection.count_documents(filter),
+            SUBSCRIBER_COUNT_CACHE_TTL,
+        )
+
+    async def get_by_imsi(
+        self, imsi: str, projection: Optional[Iterable[str]] = None
+    ) -> Optional[dict]:
+        return await self.collection.find_one(
+            {'imsi': imsi}, projection=projection)
+
+    async def get_cached_by_imsi(self, imsi: str) -> Optional[dict]:
+        async def load() -> Optional[dict]:
+            document = await self.get_by_imsi(imsi)
+            if document is not None:
+                await sync_to_async(remember_imsi)(document['_id'], imsi)
+            return document
+
+        return await acached(
+            lambda: detail_key(imsi),
+            load,
+            settings.SUBSCRIBER_DETAIL_CACHE_TTL,
+        )
+
+    async def exists(self, imsi: str) -> bool:
+        return await self.get_by_imsi(imsi, projection=['_id']) is not None
+
+    async def create(self, document: dict) -> Any:
+        result = await self.collection.insert_one(document)
+        await sync_to_async(invalidate_subscribers)()
+        return result.inserted_id
+
+    async def update(
+        self,
+        imsi: str,
+        set_fields: Optional[dict] = None,
+        unset_fields: Optional[Iterable[str]] = None,
+        expected: Optional[dict] = None,
+    ) -> Optional[dict]:
+        """Как SubscriberRepository.update (security.sqn не трогается)"""
+        set_fields, unset_fields = protect_sqn(
+            set_fields or {}, list(unset_fields or []))
+
+        update = {}
+        if set_fields:
+            update['$set'] = set_fields
+        if unset_fields:
+            update['$unset'] = {field: '' for field in unset_fields}
+        if not update:
+            return await self.get_by_imsi(imsi)
+
+        document = await self.collection.find_one_and_update(
+            {**(expected or {}), 'imsi': imsi},
+            update,
+            return_document=ReturnDocument.AFTER,
+        )
+        if document is not None:
+            await sync_to_async(invalidate_subscribers)(
+                imsi, document.get('imsi'))
+        return document
+
+    async def delete(self, imsi: str) -> bool:
+        result = await self.collection.delete_one({'imsi': imsi})
+        if result.deleted_count:
+            await sync_to_async(invalidate_subscribers)(imsi)
+        return result.deleted_count > 0
+
+
+async_subscriber_repository = AsyncSubscriberRepository()
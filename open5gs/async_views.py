@@ -0,0 +1,186 @@
+"""
+Async-версии index, subscriber и delete_subscriber для запуска под ASGI
+(ASYNC_SUBSCRIBER_VIEWS=True). Mongo опрашивается через motor и не
+занимает поток, а сессия, пользователь, кэш и шаблоны, которые в Django
+синхронные, вызываются через sync_to_async.
+"""
+from functools import wraps
+from typing import Callable, Optional
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.core.exceptions import ValidationError
+from django.http import HttpRequest, HttpResponse
+from django.http.response import Http404
+from django.shortcuts import redirect, render
+from django_ratelimit.core import is_ratelimited
+from django_ratelimit.exceptions import Ratelimited
+from pymongo.errors import PyMongoError
+
+from core.logger import mongo_logger
+from core.ratelimit import role_rate
+from users.utils import async_role_required
+
+from .async_repository import async_subscriber_repository
+from .constants import MAX_SUBSCRIBER_PER_PAGE
+from .forms import SubscriberForm
+from .models import Subscriber
+from .pagination import SORT_BY_ID, AsyncCursorPaginator
+from .repository import SubscriberConflictError, subscriber_repository
+from .search import build_imsi_filter
+
+arender = sync_to_async(render)
+
+
+def async_ratelimit(rate: str, key: str = 'user_or_ip'):
+    """
+    ratelimit(block=True) для async-представлений. Группа та же, что у
+    синхронного представления с тем же именем, поэтому лимит общий.
+    """
+    def decorator(view_func: Callable):
+        group = f'open5gs.views.{view_func.__name__}'
+        view_rate = role_rate(rate)
+
+        @wraps(view_func)
+        async def wrapped_view(request: HttpRequest, *args, **kwargs):
+            limited = await sync_to_async(is_ratelimited)(
+                request, group=group, key=key, rate=view_rate,
+                increment=True)
+            if limited:
+                raise Ratelimited()
+            return await view_func(request, *args, **kwargs)
+        return wrapped_view
+    return decorator
+
+
+async def get_subscriber_or_404(
+    imsi: int, cached: bool = True
+) -> Subscriber:
+    """get_subscriber_or_404 из views: cached=False - мимо кэша карточек"""
+    try:
+        if cached:
+            document = await async_subscriber_repository.get_cached_by_imsi(
+                str(imsi))
+        else:
+            document = await async_subscriber_repository.get_by_imsi(
+                str(imsi))
+    except PyMongoError as e:
+        mongo_logger.exception(e)
+        raise
+    if document is None:
+        raise Http404('Абонент не найден')
+    return subscriber_repository.to_model(document)
+
+
+class AsyncSubscriberForm(SubscriberForm):
+    """
+    Уникальность IMSI ModelForm проверяет запросом через djongo, поэтому
+    здесь она отключена и проверяется в представлении через motor.
+    """
+
+    def validate_unique(self):
+        pass
+
+
+@async_role_required()
+@async_ratelimit('20/m')
+async def index(request: HttpRequest) -> HttpResponse:
+    template_name = 'open5gs/index.html'
+
+    query = request.GET.get('q', '').strip()
+    sort = request.GET.get('sort', SORT_BY_ID)
+    exact_count = request.GET.get('count') == 'exact'
+    try:
+        search_filter = build_imsi_filter(query)
+        count = await async_subscriber_repository.count(
+            search_filter, exact=exact_count)
+        paginator = AsyncCursorPaginator(
+            async_subscriber_repository,
+            search_filter,
+            MAX_SUBSCRIBER_PER_PAGE,
+            sort=sort,
+        )
+        page_obj = await paginator.aget_page(
+            request.GET.get('cursor'), count=count)
+    except PyMongoError as e:
+        mongo_logger.exception(e)
+        raise
+
+    query_params = request.GET.copy()
+    query_params.pop('cursor', None)
+    query_params.pop('page', None)
+    page_url_base = f'?{query_params.urlencode()}&' if query_params else '?'
+
+    context = {
+        'page_obj': page_obj,
+        'search_query': query,
+        'sort': paginator.sort,
+        'exact_count': exact_count,
+        'page_url_base': page_url_base,
+    }
+    return await arender(request, template_name, context)
+
+
+@async_role_required()
+@async_ratelimit('20/m')
+async def subscriber(
+    request: HttpRequest, imsi: Optional[int] = None
+) -> HttpResponse:
+    template_name = 'open5gs/subscriber_form.html'
+    instance = (
+        await get_subscriber_or_404(imsi, cached=False) if imsi else None
+    )
+
+    if request.method == 'POST':
+        form = AsyncSubscriberForm(request.POST, instance=instance)
+        if form.is_valid() and instance is None:
+            exists = await async_subscriber_repository.exists(
+                form.cleaned_data['imsi'])
+            if exists:
+                form.add_error('imsi', 'Абонент с таким IMSI уже существует')
+        if form.is_valid():
+            saved = form.save(commit=False)
+            try:
+                await form.asave_to_repository(
+                    saved, async_subscriber_repository)
+            except SubscriberConflictError:
+                messages.error(
+                    request,
+                    'Абонент был изменен или удален другим пользователем. '
+                    'Обновите страницу'
+                )
+            except ValidationError:
+                messages.error(request, 'Проверьте данные')
+            except PyMongoError as e:
+                mongo_logger.exception(e)
+                raise
+            else:
+                messages.success(
+                    request,
+                    f'Абонент ({form.cleaned_data["imsi"]}) сохранен'
+                )
+                if instance is not None:
+                    # Новый ETag для следующего сохранения с этой страницы:
+                    form = AsyncSubscriberForm(instance=saved)
+        else:
+            messages.error(request, 'Проверьте данные')
+    else:
+        form = AsyncSubscriberForm(instance=instance)
+
+    context = {'form': form}
+    return await arender(request, template_name, context)
+
+
+@async_role_required()
+@async_ratelimit('20/m')
+async def delete_subscriber(request: HttpRequest, imsi: int) -> HttpResponse:
+    instance = await get_subscriber_or_404(imsi)
+    if request.method == 'POST':
+        try:
+            await async_subscriber_repository.delete(instance.imsi)
+        except PyMongoError as e:
+            mongo_logger.exception(e)
+            raise
+        return redirect('open5gs:index')
+    context = {'subscriber': instance}
+    return await arender(request, 'open5gs/subscriber_delete.html', context)
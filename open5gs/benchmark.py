@@ -0,0 +1,120 @@
+import statistics
+import time
+from typing import Callable
+
+from . import validators
+from .constants import MAX_SUBSCRIBER_HEX_LEN
+
+
+def measure(call: Callable, iterations: int) -> dict:
+    """Время вызова call в мс: mean, median и p95 по iterations повторам"""
+    call()  # прогрев соединения и кэшей
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+    return latency_stats(timings)
+
+
+def percentile(sorted_timings: list[float], fraction: float) -> float:
+    """Перцентиль (nearest-rank) отсортированного списка задержек"""
+    return sorted_timings[max(int(len(sorted_timings) * fraction) - 1, 0)]
+
+
+def latency_stats(timings: list[float]) -> dict:
+    """mean, median, p95 и p99 списка задержек (мс)"""
+    timings = sorted(timings)
+    return {
+        'mean': statistics.mean(timings),
+        'median': statistics.median(timings),
+        'p95': percentile(timings, 0.95),
+        'p99': percentile(timings, 0.99),
+    }
+
+
+def format_stats(stats: dict) -> str:
+    return (
+        f'mean={stats["mean"]:.3f} мс, median={stats["median"]:.3f} мс, '
+        f'p95={stats["p95"]:.3f} мс'
+    )
+
+
+def make_subscriber_document(
+    imsi: str = '001010000000001',
+    slices: int = 1,
+    sessions: int = 1,
+    pcc_rules: int = 1,
+) -> dict:
+    """Корректный документ абонента заданного размера для замеров"""
+    def bitrate() -> dict:
+        return {
+            'downlink': {'value': 1, 'unit': 3},
+            'uplink': {'value': 1, 'unit': 3},
+        }
+
+    def arp() -> dict:
+        return {
+            'priority_level': 8,
+            'pre_emption_capability': 1,
+            'pre_emption_vulnerability': 1,
+        }
+
+    def session(name: str) -> dict:
+        return {
+            'name': name,
+            'type': 3,
+            'qos': {'index': 9, 'arp': arp()},
+            'ambr': bitrate(),
+            'ue': {'ipv4': '10.45.0.2', 'ipv6': ''},
+            'smf': {},
+            'pcc_rule': [
+                {
+                    'qos': {
+                        'index': 1,
+                        'arp': arp(),
+                        'mbr': bitrate(),
+                        'gbr': bitrate(),
+                    },
+                    'flow': [],
+                }
+                for _ in range(pcc_rules)
+            ],
+        }
+
+    return {
+        'imsi': imsi,
+        'msisdn': ['79000000001'],
+        'security': {
+            'k': '465B5CE8B199B49FAA5F0A2EE238A6BC',
+            'amf': '8000',
+            'op': None,
+            'opc': 'E8ED289DEBA952E4283B54E88E6183CA',
+        },
+        'ambr': bitrate(),
+        'subscriber_status': 0,
+        'operator_determined_barring': 0,
+        'slice': [
+            {
+                'sst': 1,
+                'sd': '000001',
+                'default_indicator': index == 0,
+                'session': [
+                    session(f'internet{number}') for number in range(sessions)
+                ],
+            }
+            for index in range(slices)
+        ],
+    }
+
+
+def validate_legacy(document: dict) -> None:
+    """Прежняя проверка: рекурсивные функции из validators.py"""
+    for field in ('k', 'amf', 'op', 'opc'):
+        value = document['security'].get(field)
+        if value:
+            validators.validate_hex_value(value, field, MAX_SUBSCRIBER_HEX_LEN)
+    validators.validate_br(document['ambr'], 'UE-AMBR')
+    for slice_item in document['slice']:
+        for session in slice_item['session']:
+            validators.validate_session(session)
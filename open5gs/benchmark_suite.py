@@ -0,0 +1,206 @@
+"""
+Микробенчмарки горячих путей сохранения и импорта абонента: очистка
+полей SubscriberForm, нормализаторы и проверки validators.py на
+документах от минимального до предельного размера. Результаты
+сохраняются в JSON и сравниваются с прошлым запуском (baseline).
+"""
+import json
+import platform
+import time
+from copy import deepcopy
+from itertools import product
+from typing import Callable, Optional
+
+from . import normalizers
+from .benchmark import make_subscriber_document, measure, validate_legacy
+from .constants import MAX_PCC_RULE_COUNT, MAX_SLICE_COUNT, MAX_SST_VALUE
+from .document_validator import validate_subscriber_document
+from .forms import SubscriberForm
+from .utils import MongoJSONEncoder
+
+# (слайсов, сессий в слайсе, PCC Rules в сессии): от минимального
+# документа до предельного MAX_SLICE_COUNT x MAX_SST_VALUE x
+# MAX_PCC_RULE_COUNT
+DOCUMENT_SIZES = list(product(
+    (1, MAX_SLICE_COUNT), (1, MAX_SST_VALUE), (1, MAX_PCC_RULE_COUNT)))
+
+DEFAULT_REGRESSION_THRESHOLD = 0.2
+
+# Быстрые вызовы замеряются пачками не короче этого времени, иначе
+# результат в микросекундах определяется погрешностью таймера
+MIN_SAMPLE_MS = 1.0
+
+
+class BenchmarkSubscriberForm(SubscriberForm):
+    """SubscriberForm без запроса уникальности IMSI в Mongo"""
+
+    def validate_unique(self):
+        pass
+
+
+def form_data(document: dict) -> dict:
+    """POST-данные формы абонента, как их отправляет браузер"""
+    data = {
+        'imsi': document['imsi'],
+        'subscriber_status': document['subscriber_status'],
+        'operator_determined_barring': (
+            document['operator_determined_barring']),
+    }
+    for field in ('msisdn', 'security', 'ambr', 'slice'):
+        data[field] = json.dumps(document[field], cls=MongoJSONEncoder)
+    return data
+
+
+def clean_form_field(name: str, raw_value: str) -> Callable:
+    """Очистка одного поля формы: field.clean и clean_<name> формы"""
+    form = BenchmarkSubscriberForm()
+    field = form.fields[name]
+    clean_method = getattr(form, f'clean_{name}')
+
+    def call():
+        form.cleaned_data = {name: field.clean(raw_value)}
+        return clean_method()
+    return call
+
+
+def form_is_valid(document: dict) -> Callable:
+    data = form_data(document)
+
+    def call():
+        form = BenchmarkSubscriberForm(data)
+        if not form.is_valid():
+            raise ValueError(f'Форма не прошла проверку: {form.errors}')
+    return call
+
+
+def fresh_copies(
+    function: Callable, document: dict, iterations: int
+) -> Callable:
+    """
+    function изменяет документ на месте, поэтому каждый вызов получает
+    свою копию, подготовленную заранее (копирование не попадает в замер).
+    measure делает iterations + 1 вызовов.
+    """
+    copies = [deepcopy(document) for _ in range(iterations + 1)]
+    return lambda: function(copies.pop())
+
+
+def measure_batched(call: Callable, iterations: int) -> dict:
+    """
+    measure для быстрых вызовов без побочных эффектов: один замер -
+    пачка из стольких вызовов, чтобы она шла не меньше MIN_SAMPLE_MS.
+    Результат - время одного вызова.
+    """
+    start = time.perf_counter()
+    call()
+    single = (time.perf_counter() - start) * 1000
+    number = max(1, int(MIN_SAMPLE_MS / max(single, 1e-6)))
+    if number == 1:
+        return measure(call, iterations)
+
+    def batch():
+        for _ in range(number):
+            call()
+
+    stats = measure(batch, iterations)
+    return {key: value / number for key, value in stats.items()}
+
+
+# Имя -> (фабрика вызова по документу и числу повторов, зависит ли
+# время от размера документа, можно ли повторять вызов на том же
+# документе и замерять пачками)
+BENCHMARKS: dict[str, tuple[Callable, bool, bool]] = {
+    'SubscriberForm.is_valid': (
+        lambda document, iterations: form_is_valid(document), True, True),
+    'SubscriberForm.clean_security': (
+        lambda document, iterations: clean_form_field(
+            'security', form_data(document)['security']),
+        False,
+        True,
+    ),
+    'SubscriberForm.clean_msisdn': (
+        lambda document, iterations: clean_form_field(
+            'msisdn', form_data(document)['msisdn']),
+        False,
+        True,
+    ),
+    'normalizers.clean_security': (
+        lambda document, iterations: (
+            lambda: normalizers.clean_security(document['security'])),
+        False,
+        True,
+    ),
+    'normalizers.add_hide_objects_to_slice': (
+        lambda document, iterations: fresh_copies(
+            normalizers.add_hide_objects_to_slice, document['slice'],
+            iterations,
+        ),
+        True,
+        False,
+    ),
+    'normalizers.normalize_subscriber': (
+        lambda document, iterations: fresh_copies(
+            normalizers.normalize_subscriber, document, iterations),
+        True,
+        False,
+    ),
+    'validators.py': (
+        lambda document, iterations: lambda: validate_legacy(document),
+        True,
+        True,
+    ),
+    'validate_subscriber_document': (
+        lambda document, iterations: (
+            lambda: validate_subscriber_document(document)),
+        True,
+        True,
+    ),
+}
+
+
+def benchmark_key(name: str, size: tuple[int, int, int]) -> str:
+    return f'{name} [{"x".join(map(str, size))}]'
+
+
+def run_suite(iterations: int, pattern: Optional[str] = None) -> dict:
+    """
+    Замеры всех бенчмарков, имя которых содержит pattern. Зависящие от
+    размера документа прогоняются на каждом из DOCUMENT_SIZES, остальные -
+    на минимальном.
+    """
+    results = {}
+    for name, (factory, sized, repeatable) in BENCHMARKS.items():
+        if pattern and pattern not in name:
+            continue
+        for size in DOCUMENT_SIZES if sized else DOCUMENT_SIZES[:1]:
+            slices, sessions, pcc_rules = size
+            document = make_subscriber_document(
+                slices=slices, sessions=sessions, pcc_rules=pcc_rules)
+            measure_call = measure_batched if repeatable else measure
+            results[benchmark_key(name, size)] = measure_call(
+                factory(document, iterations), iterations)
+    return {
+        'python': platform.python_version(),
+        'iterations': iterations,
+        'results': results,
+    }
+
+
+def compare_results(
+    baseline: dict,
+    current: dict,
+    threshold: float = DEFAULT_REGRESSION_THRESHOLD,
+) -> dict[str, tuple[float, bool]]:
+    """
+    Изменение медианы относительно baseline по каждому общему бенчмарку:
+    {ключ: (доля изменения, регрессия ли это)}. Регрессия - медиана
+    выросла больше чем на threshold.
+    """
+    changes = {}
+    for key, stats in current['results'].items():
+        base = baseline.get('results', {}).get(key)
+        if not base or not base.get('median'):
+            continue
+        change = stats['median'] / base['median'] - 1
+        changes[key] = (change, change > threshold)
+    return changes
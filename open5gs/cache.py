@@ -0,0 +1,128 @@
+import hashlib
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+CACHE_PREFIX = 'open5gs:subscribers'
+
+COUNT_NAMESPACE = 'count'
+LIST_NAMESPACE = 'list'
+DETAIL_NAMESPACE = 'detail'
+
+
+def version_key(namespace: str) -> str:
+    return f'{CACHE_PREFIX}:{namespace}:version'
+
+
+def new_version() -> int:
+    # Версия уникальна во времени: если ключ версии вытеснен из кэша,
+    # новая версия не совпадет со старой и устаревшие значения не вернутся.
+    return time.time_ns()
+
+
+def get_version(namespace: str, timeout: Optional[int] = None) -> int:
+    return cache.get_or_set(version_key(namespace), new_version, timeout)
+
+
+def bump_version(namespace: str, timeout: Optional[int] = None) -> None:
+    """Инвалидирует все ключи пространства имен сменой его версии"""
+    cache.set(version_key(namespace), new_version(), timeout)
+
+
+def versioned_key(namespace: str, source: str) -> str:
+    digest = hashlib.md5(source.encode()).hexdigest()
+    return f'{CACHE_PREFIX}:{namespace}:v{get_version(namespace)}:{digest}'
+
+
+def cached(key: str, compute: Callable[[], Any], timeout: int) -> Any:
+    """Значение из кэша по key или посчитанное compute() и сохраненное"""
+    if timeout == 0:
+        return compute()
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
+
+
+def lookup(make_key: Callable[[], str]) -> tuple[str, Any]:
+    key = make_key()
+    return key, cache.get(key)
+
+
+async def acached(
+    make_key: Callable[[], str],
+    compute: Callable[[], Awaitable[Any]],
+    timeout: int,
+) -> Any:
+    """
+    cached для async-представлений: compute - корутина, а обращения к
+    кэшу (включая чтение версий для ключа) выполняются в потоке через
+    sync_to_async, так как бэкенды кэша синхронные.
+    """
+    if timeout == 0:
+        return await compute()
+    key, value = await sync_to_async(lookup)(make_key)
+    if value is None:
+        value = await compute()
+        await sync_to_async(cache.set)(key, value, timeout)
+    return value
+
+
+def subscriber_namespace(imsi: str) -> str:
+    return f'{DETAIL_NAMESPACE}:{imsi}'
+
+
+def detail_key(imsi: str) -> str:
+    """
+    Ключ карточки абонента. Версий две: общая для всех карточек
+    (полный сброс) и своя у каждого IMSI.
+    """
+    timeout = settings.SUBSCRIBER_DETAIL_CACHE_TTL
+    return (
+        f'{CACHE_PREFIX}:{DETAIL_NAMESPACE}'
+        f':v{get_version(DETAIL_NAMESPACE)}'
+        f':{imsi}:v{get_version(subscriber_namespace(imsi), timeout)}'
+    )
+
+
+def id_key(object_id: Any) -> str:
+    return f'{CACHE_PREFIX}:id:{object_id}'
+
+
+def remember_imsi(object_id: Any, imsi: str) -> None:
+    """
+    Событие удаления в change stream содержит только _id, поэтому
+    для закэшированных карточек запоминается соответствие _id -> IMSI.
+    """
+    cache.set(id_key(object_id), imsi, settings.SUBSCRIBER_DETAIL_CACHE_TTL)
+
+
+def lookup_subscriber_imsi(object_id: Any) -> Optional[str]:
+    return cache.get(id_key(object_id))
+
+
+def invalidate_subscribers(*imsis: str) -> None:
+    """Сбрасывает списки, количества и карточки переданных IMSI"""
+    bump_version(LIST_NAMESPACE)
+    bump_version(COUNT_NAMESPACE)
+    invalidate_details(*imsis)
+
+
+def invalidate_details(*imsis: str) -> None:
+    """
+    Сбрасывает только карточки: списки содержат лишь IMSI и от
+    остальных полей документа не зависят.
+    """
+    timeout = settings.SUBSCRIBER_DETAIL_CACHE_TTL
+    for imsi in set(imsis):
+        if imsi and timeout != 0:
+            bump_version(subscriber_namespace(imsi), timeout)
+
+
+def invalidate_all() -> None:
+    for namespace in (LIST_NAMESPACE, COUNT_NAMESPACE, DETAIL_NAMESPACE):
+        bump_version(namespace)
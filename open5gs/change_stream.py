@@ -0,0 +1,131 @@
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from . import mongo
+from .cache import (
+    invalidate_all,
+    invalidate_details,
+    invalidate_subscribers,
+    lookup_subscriber_imsi
+)
+from .updates import SQN_PATH
+
+# Коды ошибок MongoDB, после которых продолжить поток по токену нельзя:
+CHANGE_STREAM_NOT_SUPPORTED_CODE = 40573
+CHANGE_STREAM_HISTORY_LOST_CODES = (136, 260, 280, 286)
+
+# _id документа с resume token в CHANGE_STREAM_TOKENS_COLLECTION
+RESUME_TOKEN_ID = 'subscribers'
+
+# Поля, которые HSS/UDR меняет при каждой аутентификации. Кэш от них не
+# зависит: SQN не входит в ETag и не пишется формой, а списки содержат
+# только IMSI.
+IGNORED_UPDATE_PATHS = frozenset((SQN_PATH,))
+
+
+def load_resume_token() -> Optional[dict]:
+    document = mongo.get_change_stream_tokens_collection().find_one(
+        {'_id': RESUME_TOKEN_ID})
+    return document['token'] if document else None
+
+
+def save_resume_token(token: Optional[dict]) -> None:
+    """
+    Токен хранится в MongoDB, а не в кэше: вытеснение из кэша молча
+    перезапускало бы поток с текущего момента, теряя события.
+    """
+    if token is not None:
+        mongo.get_change_stream_tokens_collection().update_one(
+            {'_id': RESUME_TOKEN_ID},
+            {'$set': {'token': token, 'saved_at': datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+
+
+def reset_resume_token() -> None:
+    mongo.get_change_stream_tokens_collection().delete_one(
+        {'_id': RESUME_TOKEN_ID})
+
+
+def updated_paths(change: dict) -> set[str]:
+    description = change.get('updateDescription') or {}
+    return set(description.get('updatedFields') or {}).union(
+        description.get('removedFields') or [])
+
+
+def previous_imsi(change: dict) -> Optional[str]:
+    """IMSI документа из события по _id среди закэшированных карточек"""
+    object_id = (change.get('documentKey') or {}).get('_id')
+    if object_id is None:
+        return None
+    return lookup_subscriber_imsi(object_id)
+
+
+def fetch_imsi(object_id: Any) -> Optional[str]:
+    document = mongo.get_subscribers_collection().find_one(
+        {'_id': object_id}, projection={'_id': False, 'imsi': True})
+    return document.get('imsi') if document else None
+
+
+def changed_imsis(change: dict) -> set[str]:
+    """
+    IMSI, затронутые событием. fullDocument есть только у insert и
+    replace; для delete и update IMSI ищется по _id среди закэшированных
+    карточек, а новый IMSI update берется из updatedFields.
+    """
+    imsis = set()
+    full_document = change.get('fullDocument') or {}
+    if full_document.get('imsi'):
+        imsis.add(full_document['imsi'])
+
+    updated_fields = (change.get('updateDescription') or {}).get(
+        'updatedFields') or {}
+    if updated_fields.get('imsi'):
+        imsis.add(updated_fields['imsi'])
+
+    imsi = previous_imsi(change)
+    if imsi:
+        imsis.add(imsi)
+    return imsis
+
+
+def handle_update(change: dict) -> None:
+    paths = updated_paths(change)
+    if paths <= IGNORED_UPDATE_PATHS:
+        return
+
+    imsis = changed_imsis(change)
+    if 'imsi' in paths:
+        invalidate_subscribers(*imsis)
+        return
+    if not imsis:
+        # Соответствие _id -> IMSI вытеснено раньше карточки: документ
+        # читается только в этом случае, а не для каждого события.
+        object_id = (change.get('documentKey') or {}).get('_id')
+        imsis = {fetch_imsi(object_id)} if object_id is not None else set()
+    invalidate_details(*imsis)
+
+
+def handle_change(change: dict) -> bool:
+    """
+    Сбрасывает кэши по событию change stream. Списки и количества
+    сбрасываются только при insert, delete и смене IMSI. Возвращает
+    False, если поток закрыт (drop/rename коллекции) и его нужно открыть
+    заново.
+    """
+    operation = change.get('operationType')
+    if operation == 'update':
+        handle_update(change)
+        return True
+    if operation == 'replace':
+        imsi = (change.get('fullDocument') or {}).get('imsi')
+        if imsi and imsi == previous_imsi(change):
+            invalidate_details(imsi)
+        else:
+            invalidate_subscribers(*changed_imsis(change))
+        return True
+    if operation in ('insert', 'delete'):
+        invalidate_subscribers(*changed_imsis(change))
+        return True
+    invalidate_all()
+    return operation != 'invalidate'
@@ -80,3 +80,6 @@ QOS_INDEX_CHOICES = [
 UNIT_CHOICES = [(0, 'bps'), (1, 'Kbps'), (2, 'Mbps'), (3, 'Gbps'), (4, 'Tbps')]
 EMPTION_CHOICES = [(0, 'Disabled'), (1, 'Enabled')]
 SESSION_TYPE_CHOICES = [(1, 'IPv4'), (2, 'IPv6'), (3, 'IPv4v6')]
+
+# Время жизни закэшированного количества абонентов по фильтру (секунды):
+SUBSCRIBER_COUNT_CACHE_TTL = 30
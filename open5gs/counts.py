@@ -0,0 +1,31 @@
+import json
+from typing import Callable, Optional
+
+from .cache import COUNT_NAMESPACE, cached, versioned_key
+from .constants import SUBSCRIBER_COUNT_CACHE_TTL
+from .mongo import get_subscribers_collection
+from .utils import MongoJSONEncoder
+
+
+def cached_count(source: str, compute: Callable[[], int]) -> int:
+    """Количество из кэша по ключу source или посчитанное compute()"""
+    key = versioned_key(COUNT_NAMESPACE, source)
+    return cached(key, compute, SUBSCRIBER_COUNT_CACHE_TTL)
+
+
+def count_subscribers(
+    filter: Optional[dict] = None, exact: bool = False
+) -> int:
+    """
+    Количество абонентов. Без exact для полного списка берется оценка по
+    метаданным коллекции (estimated_document_count), а по фильтру -
+    значение из кэша с коротким TTL. exact всегда считает по базе.
+    """
+    collection = get_subscribers_collection()
+    if exact:
+        return collection.count_documents(filter or {})
+    if not filter:
+        return collection.estimated_document_count()
+
+    source = json.dumps(filter, cls=MongoJSONEncoder, sort_keys=True)
+    return cached_count(source, lambda: collection.count_documents(filter))
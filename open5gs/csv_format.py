@@ -0,0 +1,82 @@
+import json
+from typing import Any
+
+from .utils import MongoJSONEncoder
+
+# Плоское CSV-представление абонента: вложенные словари раскладываются в
+# колонки через точку, списки (msisdn, slice) хранятся как JSON.
+CSV_COLUMNS = (
+    'imsi',
+    'msisdn',
+    'security.k',
+    'security.amf',
+    'security.op',
+    'security.opc',
+    'security.sqn',
+    'ambr.downlink.value',
+    'ambr.downlink.unit',
+    'ambr.uplink.value',
+    'ambr.uplink.unit',
+    'subscriber_status',
+    'operator_determined_barring',
+    'slice',
+)
+CSV_INT_COLUMNS = frozenset((
+    'security.sqn',
+    'ambr.downlink.value',
+    'ambr.downlink.unit',
+    'ambr.uplink.value',
+    'ambr.uplink.unit',
+    'subscriber_status',
+    'operator_determined_barring',
+))
+CSV_JSON_COLUMNS = frozenset(('msisdn', 'slice', 'security', 'ambr'))
+
+
+def flatten_document(document: dict) -> dict:
+    row = {}
+    for column in CSV_COLUMNS:
+        value: Any = document
+        for key in column.split('.'):
+            value = value.get(key) if isinstance(value, dict) else None
+        if value is None:
+            row[column] = ''
+        elif column in CSV_JSON_COLUMNS:
+            row[column] = json.dumps(
+                value, cls=MongoJSONEncoder, ensure_ascii=False)
+        else:
+            row[column] = str(value)
+    return row
+
+
+def unflatten_row(row: dict) -> dict:
+    """
+    Собирает документ абонента из строки CSV. Пустые ячейки пропускаются,
+    колонки msisdn/slice (а также security/ambr целиком) разбираются как
+    JSON.
+    """
+    document: dict = {}
+    for column, value in row.items():
+        if column is None or value is None:
+            continue
+        value = value.strip()
+        if not value:
+            continue
+
+        if column in CSV_JSON_COLUMNS:
+            try:
+                value = json.loads(value)
+            except json.JSONDecodeError:
+                raise ValueError(f'Колонка "{column}" должна содержать JSON')
+        elif column in CSV_INT_COLUMNS:
+            try:
+                value = int(value)
+            except ValueError:
+                raise ValueError(f'Колонка "{column}" должна быть числом')
+
+        *path, last = column.split('.')
+        target = document
+        for key in path:
+            target = target.setdefault(key, {})
+        target[last] = value
+    return document
@@ -0,0 +1,274 @@
+import ipaddress
+import re
+from typing import Any, Callable
+
+from django.core.exceptions import ValidationError
+
+from .schemas import SUBSCRIBER_SCHEMA
+
+Validator = Callable[[Any], None]
+# Проверка узла схемы: значение и номера элементов объемлющих списков
+# для подписи поля в сообщении об ошибке
+NodeCheck = Callable[[Any, tuple], None]
+
+LABEL_SEPARATOR = ' → '
+
+IP_FORMATS = {
+    'ipv4': (ipaddress.IPv4Address, 'IPv4'),
+    'ipv6': (ipaddress.IPv6Address, 'IPv6'),
+}
+
+
+def is_empty(value: Any) -> bool:
+    return value is None or value == ''
+
+
+def missing_titles(value: dict, required: tuple[tuple[str, str], ...]) -> str:
+    return ', '.join(
+        title for key, title in required if value.get(key) is None)
+
+
+class SchemaCompiler:
+    """
+    Компилирует JSON-схему из schemas.py во вложенные замыкания: каждый
+    узел схемы разбирается один раз, и при проверке не нужно обходить
+    словари схемы. Регулярные выражения скомпилированы, значения enum
+    собраны во frozenset, подписи полей для ошибок - шаблоны, в которые
+    номера элементов списков подставляются только при ошибке. Поля с
+    readOnly (скрытые _id и flow) не проверяются.
+    """
+
+    @staticmethod
+    def escape(text: str) -> str:
+        return str(text).replace('{', '{{').replace('}', '}}')
+
+    def compile(self, schema: dict, label: str) -> Validator:
+        check = self.node(schema, self.escape(label))
+
+        def validate(value: Any) -> None:
+            check(value, ())
+        return validate
+
+    def node(self, schema: dict, label: str) -> NodeCheck:
+        handlers = {
+            'object': self.object_node,
+            'array': self.array_node,
+            'string': self.string_node,
+            'integer': self.integer_node,
+            'boolean': self.boolean_node,
+        }
+        schema_type = schema.get('type')
+        if schema_type not in handlers:
+            raise ValueError(f'Неподдерживаемый тип схемы: {schema_type}')
+        return handlers[schema_type](schema, label)
+
+    def object_node(self, schema: dict, label: str) -> NodeCheck:
+        properties = schema.get('properties', {})
+        required = tuple(schema.get('required', ()))
+        titles = tuple(
+            (key, properties.get(key, {}).get('title') or key)
+            for key in required
+        )
+        allowed = (
+            None if schema.get('additionalProperties', True)
+            else frozenset(properties)
+        )
+        children = tuple(
+            (
+                key,
+                key in required,
+                self.node(
+                    sub_schema,
+                    f'{label}{LABEL_SEPARATOR}'
+                    f'{self.escape(sub_schema.get("title") or key)}',
+                ),
+            )
+            for key, sub_schema in properties.items()
+            if not sub_schema.get('readOnly')
+        )
+
+        def check(value: Any, indexes: tuple) -> None:
+            if not isinstance(value, dict):
+                raise ValidationError(
+                    f'{label.format(*indexes)} должен быть объектом')
+            for key in required:
+                if value.get(key) is None:
+                    raise ValidationError(
+                        f'{label.format(*indexes)} должен содержать: '
+                        f'{missing_titles(value, titles)}'
+                    )
+            if allowed is not None and not value.keys() <= allowed:
+                raise ValidationError(
+                    f'{label.format(*indexes)}: недопустимые поля '
+                    f'{", ".join(sorted(value.keys() - allowed))}'
+                )
+            for key, is_required, child in children:
+                item = value.get(key)
+                # Необязательные пустые поля форма присылает как "" или null:
+                if item is None or (item == '' and not is_required):
+                    continue
+                child(item, indexes)
+        return check
+
+    def array_node(self, schema: dict, label: str) -> NodeCheck:
+        min_items = schema.get('minItems')
+        max_items = schema.get('maxItems')
+        item_check = (
+            self.node(schema['items'], f'{label} №{{}}')
+            if schema.get('items') else None
+        )
+        unique = schema.get('uniqueItems', False)
+
+        def check(value: Any, indexes: tuple) -> None:
+            if not isinstance(value, list):
+                raise ValidationError(
+                    f'{label.format(*indexes)} должен быть списком')
+            if min_items is not None and len(value) < min_items:
+                raise ValidationError(
+                    f'{label.format(*indexes)}: требуется не менее '
+                    f'{min_items} элементов'
+                )
+            if max_items is not None and len(value) > max_items:
+                raise ValidationError(
+                    f'{label.format(*indexes)}: допускается не более '
+                    f'{max_items} элементов'
+                )
+            if item_check is not None:
+                for index, item in enumerate(value, 1):
+                    item_check(item, (*indexes, index))
+            # Элементы уже проверены, поэтому для uniqueItems они хешируемы:
+            if unique and len(value) != len(set(value)):
+                raise ValidationError(
+                    f'{label.format(*indexes)}: значения должны быть '
+                    'уникальными'
+                )
+        return check
+
+    def string_node(self, schema: dict, label: str) -> NodeCheck:
+        max_length = schema.get('maxLength')
+        min_length = schema.get('minLength')
+        pattern = (
+            re.compile(schema['pattern']) if 'pattern' in schema else None
+        )
+        address_class, address_name = IP_FORMATS.get(
+            schema.get('format'), (None, None))
+
+        def check(value: Any, indexes: tuple) -> None:
+            if not isinstance(value, str):
+                raise ValidationError(
+                    f'{label.format(*indexes)} должен быть строкой')
+            if max_length is not None and len(value) > max_length:
+                raise ValidationError(
+                    f'{label.format(*indexes)} должен быть не более '
+                    f'{max_length} символов'
+                )
+            if min_length is not None and len(value) < min_length:
+                raise ValidationError(
+                    f'{label.format(*indexes)} должен быть не менее '
+                    f'{min_length} символов'
+                )
+            if pattern is not None and not pattern.match(value):
+                raise ValidationError(
+                    f'{label.format(*indexes)} содержит недопустимые '
+                    f'символы: {value}'
+                )
+            if address_class is not None:
+                try:
+                    address_class(value)
+                except ValueError:
+                    raise ValidationError(
+                        f'{label.format(*indexes)} содержит невалидный '
+                        f'{address_name}-адрес: {value}'
+                    )
+        return check
+
+    def integer_node(self, schema: dict, label: str) -> NodeCheck:
+        enum = frozenset(schema['enum']) if 'enum' in schema else None
+        enum_text = ', '.join(map(str, schema.get('enum', ())))
+        minimum = schema.get('minimum')
+        maximum = schema.get('maximum')
+
+        def check(value: Any, indexes: tuple) -> None:
+            if not isinstance(value, int) or isinstance(value, bool):
+                raise ValidationError(
+                    f'{label.format(*indexes)} должен быть целым числом')
+            if enum is not None and value not in enum:
+                raise ValidationError(
+                    f'{label.format(*indexes)} должен принимать одно из '
+                    f'следующих значений: {enum_text}'
+                )
+            if minimum is not None and value < minimum:
+                raise ValidationError(
+                    f'{label.format(*indexes)} должен быть >= {minimum}')
+            if maximum is not None and value > maximum:
+                raise ValidationError(
+                    f'{label.format(*indexes)} должен быть <= {maximum}')
+        return check
+
+    def boolean_node(self, schema: dict, label: str) -> NodeCheck:
+        def check(value: Any, indexes: tuple) -> None:
+            if value is not True and value is not False:
+                raise ValidationError(
+                    f'{label.format(*indexes)} должен быть булевым значением')
+        return check
+
+
+def compile_schema(schema: dict, label: str) -> Validator:
+    """Функция проверки значения по схеме (ошибка - ValidationError)"""
+    return SchemaCompiler().compile(schema, label)
+
+
+SUBSCRIBER_REQUIRED_FIELDS = frozenset(SUBSCRIBER_SCHEMA['required'])
+
+SUBSCRIBER_FIELD_VALIDATORS = {
+    field: compile_schema(schema, schema.get('title') or field)
+    for field, schema in SUBSCRIBER_SCHEMA['properties'].items()
+}
+
+
+def validate_security_keys(security: dict) -> None:
+    if security.get('op') and security.get('opc'):
+        raise ValidationError('Укажите только OP или OPc')
+
+
+def validate_default_slice(slices: list[dict]) -> None:
+    if not any(item.get('default_indicator') is True for item in slices):
+        raise ValidationError('Требуется как минимум 1 Default S-NSSAI')
+
+
+# Правила, которые не выражаются схемой; выполняются после нее:
+SUBSCRIBER_FIELD_RULES = {
+    'security': validate_security_keys,
+    'slice': validate_default_slice,
+}
+
+
+def validate_subscriber_document(
+    document: Any, partial: bool = False
+) -> None:
+    """
+    Проверяет документ абонента. Ошибки собираются по полям и
+    выбрасываются одним ValidationError со словарем {поле: сообщение}.
+    partial=True проверяет только переданные поля (форма, где часть
+    полей уже отклонена своими проверками).
+    """
+    if not isinstance(document, dict):
+        raise ValidationError('Абонент должен быть объектом')
+
+    errors = {}
+    for field, check in SUBSCRIBER_FIELD_VALIDATORS.items():
+        value = document.get(field)
+        if is_empty(value):
+            if field in SUBSCRIBER_REQUIRED_FIELDS and not partial:
+                errors[field] = f'Поле "{field}" обязательно'
+            continue
+        try:
+            check(value)
+            rule = SUBSCRIBER_FIELD_RULES.get(field)
+            if rule is not None:
+                rule(value)
+        except ValidationError as e:
+            errors[field] = e.message
+
+    if errors:
+        raise ValidationError(errors)
@@ -0,0 +1,76 @@
+import csv
+from typing import Iterable, Iterator
+
+from pymongo import ASCENDING
+
+from .csv_format import CSV_COLUMNS, flatten_document
+from .repository import SUBSCRIBER_FIELDS, subscriber_repository
+from .utils import MongoJSONEncoder
+
+EXPORT_FORMAT_NDJSON = 'ndjson'
+EXPORT_FORMAT_CSV = 'csv'
+EXPORT_FORMATS = {
+    EXPORT_FORMAT_NDJSON: 'application/x-ndjson',
+    EXPORT_FORMAT_CSV: 'text/csv',
+}
+EXPORT_PROJECTION = SUBSCRIBER_FIELDS
+# Обход всей коллекции по уникальному индексу imsi:
+EXPORT_SORT = [('imsi', ASCENDING)]
+# Сколько документов склеивается в один кусок ответа:
+EXPORT_CHUNK_SIZE = 500
+EXPORT_BATCH_SIZE = 1000
+
+
+class Echo:
+    """Псевдо-файл для csv.writer: возвращает строку вместо записи"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_ndjson(documents: Iterable[dict]) -> Iterator[str]:
+    encoder = MongoJSONEncoder(ensure_ascii=False)
+    chunk = []
+    for document in documents:
+        chunk.append(encoder.encode(document))
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield '\n'.join(chunk) + '\n'
+            chunk = []
+    if chunk:
+        yield '\n'.join(chunk) + '\n'
+
+
+def iter_csv(documents: Iterable[dict]) -> Iterator[str]:
+    writer = csv.DictWriter(Echo(), fieldnames=CSV_COLUMNS)
+    yield writer.writeheader()
+    chunk = []
+    for document in documents:
+        chunk.append(writer.writerow(flatten_document(document)))
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def iter_export(
+    documents: Iterable[dict], export_format: str
+) -> Iterator[str]:
+    if export_format == EXPORT_FORMAT_CSV:
+        return iter_csv(documents)
+    return iter_ndjson(documents)
+
+
+def stream_subscribers(
+    search_filter: dict,
+    export_format: str,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[str]:
+    """Куски выгрузки абонентов в порядке IMSI для ответа или файла"""
+    documents = subscriber_repository.iter_documents(
+        search_filter,
+        projection=EXPORT_PROJECTION,
+        sort=EXPORT_SORT,
+        batch_size=batch_size,
+    )
+    return iter_export(documents, export_format)
@@ -1,49 +1,60 @@
-from bson import ObjectId
+from copy import deepcopy
+from typing import TYPE_CHECKING, Optional
+
 from django import forms
 from django.core.exceptions import ValidationError
-from django_jsonform.widgets import JSONFormWidget
-
-from .constants import (
-    MAX_SST_VALUE,
-    MAX_SUBSCRIBER_HEX_LEN,
-    MAX_SUBSCRIBER_MSISDN_LEN,
-    MIN_SST_VALUE,
-    SD_LEN
-)
+from pymongo.errors import DuplicateKeyError
+
+from .constants import MAX_SUBSCRIBER_IMSI_LEN
+from .document_validator import validate_subscriber_document
 from .models import Subscriber
-from .schemas import AMBR_SCHEMA, MSISDN_SCHEMA, SECURITY_SCHEMA, SLICE_SCHEMA
-from .utils import MongoJSONEncoder
-from .validators import (
-    is_valid_objectid,
-    validate_br,
-    validate_hex_value,
-    validate_session
+from .normalizers import (
+    add_hide_objects_to_slice,
+    clean_security,
+    clean_slice,
+    strip_security_hex
+)
+from .provisioning import MAX_PROVISION_COUNT, validate_imsi_range
+from .repository import (
+    SUBSCRIBER_FIELDS,
+    SubscriberConflictError,
+    subscriber_repository
 )
+from .updates import diff_documents, document_etag, expected_values
+from .utils import MongoJSONEncoder
+from .validators import digits_validator
+from .widgets import CachedSchemaJSONFormWidget
+
+if TYPE_CHECKING:
+    # motor нужен только async-представлениям:
+    from .async_repository import AsyncSubscriberRepository
 
 
 class SubscriberForm(forms.ModelForm):
     msisdn = forms.JSONField(
         required=False,
-        widget=JSONFormWidget(schema=MSISDN_SCHEMA),
+        widget=CachedSchemaJSONFormWidget('msisdn'),
         help_text='Список номеров MSISDN',
         encoder=MongoJSONEncoder,
     )
     security = forms.JSONField(
-        widget=JSONFormWidget(schema=SECURITY_SCHEMA),
+        widget=CachedSchemaJSONFormWidget(
+            'security', default_key_url='open5gs:default_security_key'),
         help_text='Настройка безопасности',
         encoder=MongoJSONEncoder,
     )
     ambr = forms.JSONField(
-        widget=JSONFormWidget(schema=AMBR_SCHEMA),
+        widget=CachedSchemaJSONFormWidget('ambr'),
         help_text='Настройки максимальной скорости передачи данных',
         encoder=MongoJSONEncoder,
     )
     slice = forms.JSONField(
-        widget=JSONFormWidget(schema=SLICE_SCHEMA),
+        widget=CachedSchemaJSONFormWidget('slice'),
         help_text='Список конфигураций сетевых срезов',
         initial=[],
         encoder=MongoJSONEncoder,
     )
+    etag = forms.CharField(required=False, widget=forms.HiddenInput)
 
     class Meta:
         model = Subscriber
@@ -51,123 +62,45 @@ class SubscriberForm(forms.ModelForm):
 
     def clean(self):
         cleaned_data: dict = super().clean()
-        slice_items: list[dict] = cleaned_data['slice']
-        default_indicator = None
-
-        for slice_item in slice_items:
-            if not MIN_SST_VALUE <= slice_item['sst'] <= MAX_SST_VALUE:
-                raise ValidationError(
-                    f'SST должен быть между {MIN_SST_VALUE} и '
-                    f'{MAX_SST_VALUE}'
-                )
-
-            if slice_item.get('sd'):
-                validate_hex_value(slice_item['sd'], 'SD', SD_LEN, SD_LEN)
-
-            if slice_item.get('default_indicator') is None:
-                raise ValidationError(
-                    'В каждом Slice необходимо указать Default S-NSSAI')
-
-            if not isinstance(slice_item['default_indicator'], bool):
-                raise ValidationError(
-                    'Default S-NSSAI должен принимать булево значение')
-
-            if slice_item['default_indicator'] is True:
-                default_indicator = True
-
-            for session in slice_item['session']:
-                validate_session(session)
-                # Оставляем только непустые значения:
-                for field in ['ue', 'smf']:
-                    ip_config = session.get(field)
-
-                    if ip_config:
-                        ip_config = {k: v for k, v in ip_config.items() if v}
-                        if ip_config:
-                            session[field] = ip_config
-                        else:
-                            session.pop(field, None)
-
-        if default_indicator is None:
+        etag = cleaned_data.get('etag')
+        if (
+            etag
+            and self.initial_document
+            and etag != document_etag(self.initial_document)
+        ):
             raise ValidationError(
-                'Требуется как минимум 1 Default S-NSSAI')
+                'Абонент был изменен другим пользователем. Обновите '
+                'страницу, чтобы не перезаписать чужие изменения'
+            )
+
+        document = {
+            field: cleaned_data[field]
+            for field in SUBSCRIBER_FIELDS if field in cleaned_data
+        }
+        # Ошибки возвращаются словарем и попадают к своим полям формы:
+        validate_subscriber_document(document, partial=True)
 
+        if 'slice' in cleaned_data:
+            clean_slice(cleaned_data['slice'])
         return cleaned_data
 
     def clean_msisdn(self):
-        msisdn = self.cleaned_data.get('msisdn')
-
-        if not isinstance(msisdn, list):
-            raise ValidationError('MSISDN должен быть списком')
-
-        for number in msisdn:
-            if not isinstance(number, str):
-                raise ValidationError('Каждый MSISDN должен быть строкой')
-            if not number.isdigit():
-                raise ValidationError(
-                    f'MSISDN {number} должен содержать только цифры')
-            if len(number) > MAX_SUBSCRIBER_MSISDN_LEN:
-                raise ValidationError(
-                    f'MSISDN {number} не должен превышать '
-                    f'{MAX_SUBSCRIBER_MSISDN_LEN} символов'
-                )
-
-        if len(msisdn) != len(set(msisdn)):
-            raise ValidationError('MSISDN должны быть уникальными')
-
-        return msisdn
+        return self.cleaned_data.get('msisdn') or []
 
     def clean_security(self):
-        security_data: dict = self.cleaned_data.get('security', {})
-
-        hex_fields = ['k', 'amf', 'op', 'opc']
-        cleaned_security = {}
-        for field, value in security_data.items():
-            if field in hex_fields and value and isinstance(value, str):
-                cleaned_security[field] = value.replace(' ', '')
-            else:
-                cleaned_security[field] = value
-
-        if not all(k in cleaned_security for k in ['k', 'amf']):
-            raise ValidationError(
-                'Поля "Subscriber Key (K)" и '
-                '"Authentication Management Field (AMF)" обязательны'
-            )
-
-        for field, name in [
-            ('k', 'Subscriber Key (K)'),
-            ('amf', 'Authentication Management Field (AMF)'),
-            ('op', 'Operator Key (OP)'),
-            ('opc', 'Operator Key (OPc)'),
-        ]:
-            if field in cleaned_security and cleaned_security[field]:
-                validate_hex_value(
-                    cleaned_security[field], name, MAX_SUBSCRIBER_HEX_LEN)
-
-        if cleaned_security.get('op') and cleaned_security.get('opc'):
-            raise ValidationError('Укажите только OP или OPc')
-
-        # Замена на None пустых значений
-        if not cleaned_security.get('op'):
-            cleaned_security['op'] = None
-        if not cleaned_security.get('opc'):
-            cleaned_security['opc'] = None
-
-        return cleaned_security
-
-    def clean_ambr(self):
-        ambr_data = self.cleaned_data.get('ambr', {})
-        if not isinstance(ambr_data, dict):
-            raise ValidationError('UE-AMBR это словарь')
-
-        validate_br(ambr_data, 'UE-AMBR')
-
-        return ambr_data
+        return clean_security(self.cleaned_data.get('security') or {})
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+        # Снимок загруженного документа для частичного обновления в save:
+        self.initial_document = None
+
         if self.instance and self.instance.pk:
+            self.initial_document = deepcopy(
+                subscriber_repository.to_document(self.instance))
+            self.fields['etag'].initial = document_etag(
+                self.initial_document)
             self.fields['imsi'].disabled = True
             self.fields['imsi'].help_text = 'Нельзя изменить после создания'
 
@@ -183,16 +116,7 @@ class SubscriberForm(forms.ModelForm):
         # Обработка security полей с удалением пробелов
         security_data = getattr(self.instance, 'security', {})
         if security_data:
-            cleaned_security = {}
-            hex_fields = ['k', 'amf', 'op', 'opc']
-
-            for field, value in security_data.items():
-                if field in hex_fields and value and isinstance(value, str):
-                    cleaned_security[field] = value.replace(' ', '')
-                else:
-                    cleaned_security[field] = value
-
-            self.fields['security'].initial = cleaned_security
+            self.fields['security'].initial = strip_security_hex(security_data)
         else:
             self.fields['security'].initial = {}
 
@@ -222,56 +146,124 @@ class SubscriberForm(forms.ModelForm):
         instance.security = security
 
         if commit:
-            instance.save()
+            self.save_to_repository(instance)
 
         return instance
 
+    def validate_unique(self):
+        """Проверка уникальности IMSI напрямую через pymongo"""
+        imsi = self.cleaned_data.get('imsi')
+        if not imsi or self.instance.pk:
+            return
+
+        if subscriber_repository.get_by_imsi(imsi, projection=['_id']):
+            self.add_duplicate_imsi_error()
+
+    def add_duplicate_imsi_error(self) -> None:
+        self.add_error(
+            'imsi', self.instance.unique_error_message(Subscriber, ('imsi',)))
+
+    def duplicate_imsi(self) -> ValidationError:
+        """
+        Абонента с тем же IMSI вставили между validate_unique и записью:
+        ошибка попадает к полю imsi, а вызывающий код получает
+        ValidationError вместо DuplicateKeyError.
+        """
+        self.add_duplicate_imsi_error()
+        return ValidationError(self.errors['imsi'])
+
+    def save_to_repository(self, instance: Subscriber) -> None:
+        """
+        Новый абонент вставляется целиком, для существующего отправляются
+        только изменившиеся пути ($set/$unset), а не весь документ.
+        Обновление атомарное и проходит, только если эти пути в базе не
+        менялись с момента загрузки формы. security.sqn не перезаписывается.
+        Занятый IMSI - ValidationError, изменение другим пользователем -
+        SubscriberConflictError.
+        """
+        document = subscriber_repository.to_document(instance)
+        if not instance.pk:
+            try:
+                instance._id = subscriber_repository.create(document)
+            except DuplicateKeyError:
+                raise self.duplicate_imsi()
+            instance._state.adding = False
+            return
+
+        changes = self.document_changes(document)
+        if changes is not None:
+            document = self.updated_document(
+                instance,
+                subscriber_repository.update(instance.imsi, *changes),
+            )
+        self.initial_document = deepcopy(document)
+
+    async def asave_to_repository(
+        self, instance: Subscriber, repository: 'AsyncSubscriberRepository'
+    ) -> None:
+        """save_to_repository для async-представлений"""
+        document = subscriber_repository.to_document(instance)
+        if not instance.pk:
+            try:
+                instance._id = await repository.create(document)
+            except DuplicateKeyError:
+                raise self.duplicate_imsi()
+            instance._state.adding = False
+            return
+
+        changes = self.document_changes(document)
+        if changes is not None:
+            document = self.updated_document(
+                instance, await repository.update(instance.imsi, *changes))
+        self.initial_document = deepcopy(document)
+
+    def document_changes(
+        self, document: dict
+    ) -> Optional[tuple[dict, list[str], dict]]:
+        """($set, $unset, условия на старые значения) или None"""
+        old_document = self.initial_document or {}
+        set_fields, unset_fields = diff_documents(old_document, document)
+        if not set_fields and not unset_fields:
+            return None
+        return (
+            set_fields,
+            unset_fields,
+            expected_values(old_document, set_fields, unset_fields),
+        )
+
     @staticmethod
-    def add_hide_objects_to_slice(slices: list[dict]) -> list[dict]:
-        """Добавлям скрытые поля, которые должны быть по умолчанию"""
-        for slice_item in slices:
-            used_ids = set()
-
-            def get_unique_objectid():
-                new_id = ObjectId()
-                while str(new_id) in used_ids:
-                    new_id = ObjectId()
-                used_ids.add(str(new_id))
-                return new_id
-
-            if not is_valid_objectid(slice_item.get('_id')):
-                slice_item['_id'] = get_unique_objectid()
-            else:
-                oid_str = str(slice_item['_id'])
-                if oid_str in used_ids:
-                    slice_item['_id'] = get_unique_objectid()
-                else:
-                    used_ids.add(oid_str)
-
-            for session in slice_item.get('session', []):
-                if not is_valid_objectid(session.get('_id')):
-                    session['_id'] = get_unique_objectid()
-                else:
-                    oid_str = str(session['_id'])
-                    if oid_str in used_ids:
-                        session['_id'] = get_unique_objectid()
-                    else:
-                        used_ids.add(oid_str)
-
-                for pcc_rule in session.get('pcc_rule', []):
-                    if not is_valid_objectid(pcc_rule.get('_id')):
-                        pcc_rule['_id'] = get_unique_objectid()
-                    else:
-                        oid_str = str(pcc_rule['_id'])
-                        if oid_str in used_ids:
-                            pcc_rule['_id'] = get_unique_objectid()
-                        else:
-                            used_ids.add(oid_str)
-
-                    if (
-                        'flow' not in pcc_rule
-                        or not isinstance(pcc_rule['flow'], list)
-                    ):
-                        pcc_rule['flow'] = []
-
-        return slices
+    def updated_document(
+        instance: Subscriber, updated: Optional[dict]
+    ) -> dict:
+        if updated is None:
+            raise SubscriberConflictError(instance.imsi)
+        return subscriber_repository.to_document(
+            subscriber_repository.to_model(updated))
+
+    add_hide_objects_to_slice = staticmethod(add_hide_objects_to_slice)
+
+
+class ProvisioningForm(forms.Form):
+    """Параметры массового создания абонентов по шаблону"""
+    start = forms.CharField(
+        label='Начальный IMSI',
+        max_length=MAX_SUBSCRIBER_IMSI_LEN,
+        validators=[digits_validator],
+        help_text='Ширина диапазона (и ведущие нули) берется отсюда',
+    )
+    count = forms.IntegerField(
+        label='Количество', min_value=1, max_value=MAX_PROVISION_COUNT)
+    random_k = forms.BooleanField(
+        label='Случайный K', required=False, initial=True,
+        help_text='Иначе всем абонентам копируется K шаблона',
+    )
+    random_opc = forms.BooleanField(
+        label='Случайный OPc', required=False,
+        help_text='Вместо OP/OPc шаблона',
+    )
+
+    def clean(self):
+        cleaned_data: dict = super().clean()
+        if 'start' in cleaned_data and 'count' in cleaned_data:
+            validate_imsi_range(cleaned_data['start'], cleaned_data['count'])
+        return cleaned_data
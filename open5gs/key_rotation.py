@@ -0,0 +1,158 @@
+import json
+import os
+from collections import deque
+from functools import partial
+from typing import Any, Iterable, Iterator, Optional
+
+from bson import ObjectId
+
+from .milenage import derive_opc
+from .normalizers import strip_security_hex
+from .pipeline import (
+    DEFAULT_CHUNK_SIZE,
+    PipelineResult,
+    RecordHandler,
+    error_text,
+    process_records
+)
+from .provisioning import generate_hex_keys
+from .updates import expected_values
+
+MODE_CONVERT = 'convert'
+MODE_ROTATE = 'rotate'
+KEY_ROTATION_MODES = (MODE_CONVERT, MODE_ROTATE)
+
+SECURITY_KEY_FIELDS = ('k', 'op', 'opc')
+
+# Абоненты, которым есть что менять (для rotate - все):
+MODE_FILTERS = {
+    MODE_CONVERT: {'security.op': {'$nin': [None, '']}},
+    MODE_ROTATE: {},
+}
+
+# (новые k/op/opc или None, если менять нечего; текст ошибки или None):
+KeyUpdate = tuple[Optional[dict], Optional[str]]
+
+
+def convert_op_to_opc(security: dict) -> KeyUpdate:
+    """OP -> OPc по K абонента, сам K не меняется"""
+    security = strip_security_hex(security)
+    if not security.get('op'):
+        return None, None
+    try:
+        opc = derive_opc(security['k'], security['op'])
+    except (KeyError, TypeError, ValueError) as e:
+        return None, error_text(e)
+    return {'k': security['k'], 'op': None, 'opc': opc}, None
+
+
+def rotate_k(security: dict, k: str, op: Optional[str] = None) -> KeyUpdate:
+    """
+    Новый K. Абонент с OP остается с OP; для абонента с OPc он
+    пересчитывается из нового K и OP оператора, который сначала
+    сверяется с текущими K и OPc, чтобы не записать OPc от чужого OP.
+    """
+    security = strip_security_hex(security)
+    if security.get('op') or not security.get('opc'):
+        keys = {field: security.get(field) for field in SECURITY_KEY_FIELDS}
+        return {**keys, 'k': k}, None
+    if op is None:
+        return None, 'Для абонента с OPc нужен OP оператора'
+    try:
+        if derive_opc(security['k'], op) != security['opc'].upper():
+            return None, 'OPc абонента не соответствует переданному OP'
+        return {'k': k, 'op': None, 'opc': derive_opc(k, op)}, None
+    except (KeyError, TypeError, ValueError) as e:
+        return None, error_text(e)
+
+
+def rotate_record(
+    record: tuple[dict, str], op: Optional[str] = None
+) -> KeyUpdate:
+    security, k = record
+    return rotate_k(security, k, op=op)
+
+
+def key_handler(mode: str, op: Optional[str] = None) -> RecordHandler:
+    """Обработчик для process_records (функция уровня модуля или partial)"""
+    if mode == MODE_CONVERT:
+        return convert_op_to_opc
+    return partial(rotate_record, op=op)
+
+
+def key_records(
+    documents: Iterable[dict], mode: str, chunk_size: int, pending: deque
+) -> Iterator[tuple[str, Any]]:
+    """
+    (IMSI, k/op/opc) для process_records, для rotate - вместе с новым K.
+    Документы остаются в pending: в процессы уходят только ключи, а новые
+    K берутся из одного generate_hex_keys на chunk_size абонентов.
+    """
+    new_keys: list[str] = []
+    for document in documents:
+        pending.append(document)
+        security = document.get('security') or {}
+        keys = {field: security.get(field) for field in SECURITY_KEY_FIELDS}
+        if mode == MODE_CONVERT:
+            yield document.get('imsi'), keys
+            continue
+        if not new_keys:
+            new_keys = generate_hex_keys(chunk_size)
+        yield document.get('imsi'), (keys, new_keys.pop())
+
+
+def key_updates(
+    documents: Iterable[dict],
+    mode: str,
+    op: Optional[str] = None,
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[PipelineResult]:
+    """
+    (документ, новые k/op/opc, ошибка) в порядке курсора. AES считается
+    в process_records, при workers > 1 - в пуле процессов.
+    """
+    pending: deque[dict] = deque()
+    for _, keys, error in process_records(
+        key_records(documents, mode, chunk_size, pending),
+        handler=key_handler(mode, op),
+        workers=workers,
+        chunk_size=chunk_size,
+    ):
+        # process_records отдает результаты в порядке входа
+        yield pending.popleft(), keys, error
+
+
+def security_update(document: dict, keys: dict) -> tuple[str, dict, dict]:
+    """
+    (IMSI, условия, $set) для SubscriberRepository.bulk_update: запись
+    проходит, только если k/op/opc в базе не менялись с момента чтения.
+    """
+    set_fields = {f'security.{field}': keys[field] for field in keys}
+    return (
+        document['imsi'],
+        expected_values(document, set_fields, []),
+        set_fields,
+    )
+
+
+def load_checkpoint(path: str, mode: str) -> Optional[ObjectId]:
+    """_id последнего записанного абонента из файла контрольной точки"""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as file:
+        checkpoint = json.load(file)
+    if checkpoint.get('mode') != mode:
+        raise ValueError(
+            f'Контрольная точка {path} создана для режима '
+            f'{checkpoint.get("mode")}'
+        )
+    return ObjectId(checkpoint['last_id'])
+
+
+def save_checkpoint(path: str, mode: str, last_id: ObjectId) -> None:
+    # Через временный файл, чтобы обрыв не оставил половину JSON:
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump({'mode': mode, 'last_id': str(last_id)}, file)
+    os.replace(tmp_path, path)
@@ -0,0 +1,309 @@
+"""
+Нагрузочный сценарий оператора для команды benchmark_http: каждый
+виртуальный пользователь входит в систему и по кругу открывает список,
+ищет, листает страницы, открывает карточку, сохраняет ее и удаляет
+абонента. Запросы идут по HTTP к запущенному серверу, как из браузера.
+"""
+import html
+import http.client
+import json
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from http.cookies import SimpleCookie
+from typing import Optional
+from urllib.parse import urlencode, urlsplit
+
+from .benchmark import latency_stats
+
+ENDPOINTS = ('login', 'list', 'search', 'paginate', 'edit', 'save', 'delete')
+
+LOGIN_PATH = '/login/'
+
+CURSOR_RE = re.compile(r'[?&;]cursor=([^"&]+)')
+
+REQUEST_TIMEOUT = 30
+
+
+class FormFieldsParser(HTMLParser):
+    """
+    Значения полей POST-форм страницы так, как их отправил бы браузер.
+    Поля django-jsonform пустые в HTML и заполняются скриптом из
+    data-jsonform-config, поэтому значение берется оттуда.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.forms: list[dict] = []
+        self._fields: Optional[dict] = None
+        self._select: Optional[str] = None
+        self._textarea: Optional[str] = None
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        attrs = dict(attrs)
+        if tag == 'form' and attrs.get('method', '').lower() == 'post':
+            self._fields = {}
+            self.forms.append(self._fields)
+        if self._fields is None or (
+            tag != 'option' and not attrs.get('name')
+        ):
+            return
+
+        if tag == 'input':
+            input_type = attrs.get('type', 'text').lower()
+            if input_type in ('submit', 'button', 'file'):
+                return
+            if input_type in ('checkbox', 'radio') and 'checked' not in attrs:
+                return
+            self._fields[attrs['name']] = attrs.get('value') or ''
+        elif tag == 'select':
+            self._select = attrs['name']
+        elif tag == 'option' and self._select is not None:
+            # Первая опция - значение по умолчанию, selected - выбранное:
+            if self._select not in self._fields or 'selected' in attrs:
+                self._fields[self._select] = attrs.get('value', '')
+        elif tag == 'textarea':
+            self._textarea = attrs['name']
+            config = attrs.get('data-jsonform-config')
+            value = json.loads(config)['data'] if config else ''
+            self._fields[self._textarea] = value
+
+    def handle_data(self, data: str) -> None:
+        if self._textarea is not None and self._fields is not None:
+            self._fields[self._textarea] += data
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == 'form':
+            self._fields = None
+        elif tag == 'select':
+            self._select = None
+        elif tag == 'textarea':
+            self._textarea = None
+
+
+def form_fields(page: str, required_field: str) -> Optional[dict]:
+    """Поля первой POST-формы страницы, в которой есть required_field"""
+    parser = FormFieldsParser()
+    parser.feed(page)
+    for fields in parser.forms:
+        if required_field in fields:
+            return fields
+    return None
+
+
+def next_cursor(page: str) -> Optional[str]:
+    """Курсор ссылки «Следующая» на странице списка"""
+    cursors = CURSOR_RE.findall(html.unescape(page))
+    return cursors[-1] if cursors else None
+
+
+class BrowserSession:
+    """
+    Одно keep-alive соединение с cookie сессии и CSRF, как у вкладки
+    браузера. Редиректы не выполняются: 302 - ответ самого запроса.
+    """
+
+    def __init__(self, base_url: str) -> None:
+        url = urlsplit(base_url)
+        self.base_url = base_url.rstrip('/')
+        self.host = url.netloc
+        self.connection_class = (
+            http.client.HTTPSConnection if url.scheme == 'https'
+            else http.client.HTTPConnection
+        )
+        self.cookies: dict[str, str] = {}
+        self.connection: Optional[http.client.HTTPConnection] = None
+
+    def request(
+        self, method: str, path: str, fields: Optional[dict] = None
+    ) -> tuple[int, str, float]:
+        """Статус, тело и время ответа (мс) от отправки до конца тела"""
+        headers = {'Referer': f'{self.base_url}{path}'}
+        body = None
+        if method == 'POST':
+            fields = {
+                **(fields or {}),
+                'csrfmiddlewaretoken': self.cookies.get('csrftoken', ''),
+            }
+            body = urlencode(fields)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if self.cookies:
+            headers['Cookie'] = '; '.join(
+                f'{name}={value}' for name, value in self.cookies.items())
+
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = self.connection_class(
+                    self.host, timeout=REQUEST_TIMEOUT)
+            start = time.perf_counter()
+            try:
+                self.connection.request(method, path, body, headers)
+                response = self.connection.getresponse()
+                content = response.read().decode('utf-8', 'replace')
+            except (http.client.HTTPException, OSError):
+                # Сервер закрыл keep-alive соединение - повтор с новым:
+                self.close()
+                if attempt:
+                    raise
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            break
+
+        for header in response.headers.get_all('Set-Cookie') or []:
+            cookie = SimpleCookie(header)
+            for name, morsel in cookie.items():
+                self.cookies[name] = morsel.value
+        if response.will_close:
+            self.close()
+        return response.status, content, elapsed
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def run_virtual_user(
+    base_url: str,
+    username: str,
+    password: str,
+    search_query: str,
+    browse_imsis: list[str],
+    delete_imsis: list[str],
+    seed: int,
+) -> tuple[dict, dict]:
+    """
+    Сценарий одного оператора: вход и len(delete_imsis) кругов
+    список -> поиск -> следующая страница -> карточка -> сохранение ->
+    удаление. Возвращает задержки успешных запросов и число ошибок по
+    каждому endpoint.
+    """
+    timings: dict[str, list[float]] = {name: [] for name in ENDPOINTS}
+    errors: dict[str, int] = dict.fromkeys(ENDPOINTS, 0)
+    session = BrowserSession(base_url)
+    chooser = random.Random(seed)
+
+    def call(
+        endpoint: str,
+        method: str,
+        path: str,
+        fields: Optional[dict] = None,
+        expected_status: int = 200,
+        marker: Optional[str] = None,
+    ) -> Optional[str]:
+        try:
+            status, content, elapsed = session.request(method, path, fields)
+        except (http.client.HTTPException, OSError):
+            errors[endpoint] += 1
+            return None
+        if status != expected_status or (marker and marker not in content):
+            errors[endpoint] += 1
+            return None
+        timings[endpoint].append(elapsed)
+        return content
+
+    try:
+        # Страница входа выдает cookie csrftoken:
+        try:
+            session.request('GET', LOGIN_PATH)
+        except (http.client.HTTPException, OSError):
+            errors['login'] += 1
+            return timings, errors
+        logged_in = call(
+            'login', 'POST', LOGIN_PATH,
+            {'username': username, 'password': password},
+            expected_status=302,
+        )
+        if logged_in is None:
+            return timings, errors
+
+        for delete_imsi in delete_imsis:
+            page = call('list', 'GET', '/')
+            call('search', 'GET', f'/?{urlencode({"q": search_query})}')
+            cursor = next_cursor(page) if page else None
+            if cursor:
+                call('paginate', 'GET', f'/?{urlencode({"cursor": cursor})}')
+
+            edit_path = f'/subscriber/{chooser.choice(browse_imsis)}/edit/'
+            page = call('edit', 'GET', edit_path)
+            fields = form_fields(page, 'imsi') if page else None
+            if fields is not None:
+                call(
+                    'save', 'POST', edit_path, fields,
+                    marker='alert-success',
+                )
+
+            call(
+                'delete', 'POST', f'/subscriber/{delete_imsi}/delete/',
+                expected_status=302,
+            )
+    finally:
+        session.close()
+    return timings, errors
+
+
+def run_load_test(
+    base_url: str,
+    username: str,
+    password: str,
+    users: int,
+    search_query: str,
+    browse_imsis: list[str],
+    delete_imsis: list[str],
+) -> dict:
+    """
+    users операторов одновременно; delete_imsis делятся между ними
+    поровну и задают число кругов. Отчет: задержки p50/p95/p99 и
+    пропускная способность (запросов/с) по каждому endpoint.
+    """
+    iterations = len(delete_imsis) // users
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        results = list(executor.map(
+            lambda number: run_virtual_user(
+                base_url,
+                username,
+                password,
+                search_query,
+                browse_imsis,
+                delete_imsis[
+                    number * iterations:(number + 1) * iterations],
+                seed=number,
+            ),
+            range(users),
+        ))
+    duration = time.perf_counter() - started
+
+    endpoints = {}
+    total = 0
+    for name in ENDPOINTS:
+        timings = [
+            value for user_timings, _ in results
+            for value in user_timings[name]
+        ]
+        errors = sum(user_errors[name] for _, user_errors in results)
+        total += len(timings)
+        report = {
+            'requests': len(timings),
+            'errors': errors,
+            'throughput_rps': round(len(timings) / duration, 2),
+        }
+        if timings:
+            stats = latency_stats(timings)
+            report.update({
+                'mean_ms': round(stats['mean'], 2),
+                'p50_ms': round(stats['median'], 2),
+                'p95_ms': round(stats['p95'], 2),
+                'p99_ms': round(stats['p99'], 2),
+            })
+        endpoints[name] = report
+
+    return {
+        'users': users,
+        'iterations': iterations,
+        'duration_s': round(duration, 2),
+        'throughput_rps': round(total / duration, 2),
+        'endpoints': endpoints,
+    }
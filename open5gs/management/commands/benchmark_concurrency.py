@@ -0,0 +1,131 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from open5gs.benchmark import format_stats, latency_stats
+from open5gs.mongo import MONGO_DATABASE_ALIAS, SUBSCRIBERS_COLLECTION
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность при медленной MongoDB: '
+        'синхронные запросы pymongo из ограниченного числа потоков (как '
+        'gthread-воркеры gunicorn) и асинхронные запросы motor (ASGI)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Количество запросов в каждом режиме',
+        )
+        parser.add_argument(
+            '--threads', type=int, default=4,
+            help=(
+                'Потоков для синхронного режима (GUNICORN_WORKERS * '
+                'GUNICORN_THREADS на один воркер)'
+            ),
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=100,
+            help='Одновременных запросов в асинхронном режиме',
+        )
+        parser.add_argument(
+            '--delay-ms', type=int, default=200,
+            help=(
+                'Задержка каждого запроса на сервере через $where + '
+                'sleep() (нужен server-side JavaScript), 0 - без задержки'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if min(
+            options['requests'], options['threads'], options['concurrency']
+        ) <= 0:
+            raise CommandError(
+                '--requests, --threads и --concurrency должны быть > 0')
+
+        database = settings.DATABASES[MONGO_DATABASE_ALIAS]
+        self.client_settings = database['CLIENT']
+        self.database_name = database['NAME']
+        self.filter = {}
+        if options['delay_ms'] > 0:
+            # Документ с limit=1 проверяется один раз, поэтому задержка
+            # одна на запрос:
+            self.filter = {'$where': f'sleep({options["delay_ms"]}) || true'}
+
+        self.stdout.write(
+            f'Запросов: {options["requests"]}, задержка Mongo: '
+            f'{options["delay_ms"]} мс, maxPoolSize: '
+            f'{self.client_settings.get("maxPoolSize")}'
+        )
+        try:
+            self.report(
+                f'sync, {options["threads"]} потоков',
+                *self.run_sync(options['requests'], options['threads']),
+            )
+            self.report(
+                f'async, {options["concurrency"]} одновременно',
+                *asyncio.run(self.run_async(
+                    options['requests'], options['concurrency'])),
+            )
+        except PyMongoError as e:
+            raise CommandError(f'Ошибка MongoDB: {e}')
+
+    def report(self, title: str, elapsed: float, timings: list) -> None:
+        self.stdout.write(
+            f'{title}: {len(timings) / elapsed:.1f} запросов/с, '
+            f'{format_stats(latency_stats(timings))}'
+        )
+
+    @staticmethod
+    def timed(call: Callable) -> float:
+        start = time.perf_counter()
+        call()
+        return (time.perf_counter() - start) * 1000
+
+    def run_sync(self, requests: int, threads: int) -> tuple[float, list]:
+        client = MongoClient(**self.client_settings)
+        collection = client[self.database_name][SUBSCRIBERS_COLLECTION]
+        try:
+            collection.find_one({})  # прогрев пула
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                timings = list(executor.map(
+                    lambda _: self.timed(
+                        lambda: collection.find_one(self.filter)),
+                    range(requests),
+                ))
+            return time.perf_counter() - started, timings
+        finally:
+            client.close()
+
+    async def run_async(
+        self, requests: int, concurrency: int
+    ) -> tuple[float, list]:
+        # motor нужен только в этом режиме:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        client = AsyncIOMotorClient(**self.client_settings)
+        collection = client[self.database_name][SUBSCRIBERS_COLLECTION]
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def request() -> float:
+            async with semaphore:
+                start = time.perf_counter()
+                await collection.find_one(self.filter)
+                return (time.perf_counter() - start) * 1000
+
+        try:
+            await collection.find_one({})
+            started = time.perf_counter()
+            timings = await asyncio.gather(
+                *(request() for _ in range(requests)))
+            return time.perf_counter() - started, list(timings)
+        finally:
+            client.close()
@@ -0,0 +1,310 @@
+import json
+import os
+import secrets
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from open5gs.benchmark import make_subscriber_document
+from open5gs.cache import invalidate_subscribers
+from open5gs.load_test import LOGIN_PATH, BrowserSession, run_load_test
+from open5gs.mongo import MONGO_DATABASE_ALIAS, SUBSCRIBERS_COLLECTION
+from open5gs.provisioning import imsi_range
+from open5gs.search import build_imsi_filter
+from users.models import Roles, User
+
+SERVER_START_TIMEOUT = 60
+
+LOADTEST_USERNAME = 'loadtest'
+
+ASGI_WORKER_CLASS = 'uvicorn.workers.UvicornWorker'
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def parse_server_config(spec: str) -> tuple[int, int, str]:
+    """'WORKERS:THREADS[:WORKER_CLASS]' -> (workers, threads, класс)"""
+    parts = spec.split(':', 2)
+    if len(parts) < 2 or not all(part.isdigit() for part in parts[:2]):
+        raise ValueError(
+            f'Конфигурация {spec!r}: ожидается WORKERS:THREADS[:CLASS]')
+    workers, threads = int(parts[0]), int(parts[1])
+    if workers <= 0 or threads <= 0:
+        raise ValueError(f'Конфигурация {spec!r}: значения должны быть > 0')
+    return workers, threads, parts[2] if len(parts) == 3 else 'gthread'
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест интерфейса оператора по HTTP: вход, список, '
+        'поиск, страницы, карточка, сохранение и удаление абонентов. '
+        'Запускает gunicorn с каждой из конфигураций --server (или '
+        'нагружает --url) и выводит p50/p95/p99 и запросов/с в JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--server', action='append', default=None,
+            metavar='WORKERS:THREADS[:CLASS]',
+            help=(
+                'Конфигурация gunicorn, можно несколько раз (по умолчанию '
+                f'2:4). Для {ASGI_WORKER_CLASS} включаются '
+                'async-представления'
+            ),
+        )
+        parser.add_argument(
+            '--url', type=str, default=None,
+            help=(
+                'Нагружать уже запущенный сервер вместо gunicorn (лимиты '
+                'запросов на нем должны быть отключены: '
+                'RATELIMIT_ENABLE=False)'
+            ),
+        )
+        parser.add_argument(
+            '--users', type=int, default=10,
+            help='Одновременных операторов',
+        )
+        parser.add_argument(
+            '--iterations', type=int, default=20,
+            help='Кругов сценария на оператора',
+        )
+        parser.add_argument(
+            '--subscribers', type=int, default=1000,
+            help='Абонентов для списка и карточек',
+        )
+        parser.add_argument(
+            '--prefix', type=str, default='99970',
+            help=(
+                'Префикс IMSI тестовых абонентов; абонентов с ним в базе '
+                'быть не должно, после теста они удаляются'
+            ),
+        )
+        parser.add_argument(
+            '--mongod', type=str, default=None,
+            help=(
+                'Путь к mongod: запустить временный локальный MongoDB '
+                'вместо указанного в настройках'
+            ),
+        )
+        parser.add_argument(
+            '--output', type=str, default=None,
+            help='Файл для JSON-отчета (по умолчанию - stdout)',
+        )
+
+    def handle(self, *args, **options):
+        users, iterations = options['users'], options['iterations']
+        if min(users, iterations, options['subscribers']) <= 0:
+            raise CommandError(
+                '--users, --iterations и --subscribers должны быть > 0')
+        if options['url'] and (options['server'] or options['mongod']):
+            raise CommandError(
+                '--url нельзя сочетать с --server и --mongod')
+        prefix = options['prefix']
+        if not prefix.isdigit() or len(prefix) > 10:
+            raise CommandError('--prefix: от 1 до 10 цифр')
+
+        try:
+            configs = [
+                parse_server_config(spec)
+                for spec in options['server'] or ['2:4']
+            ]
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        runs = 1 if options['url'] else len(configs)
+        deletes = users * iterations
+        imsis = imsi_range(
+            prefix.ljust(15, '0'), options['subscribers'] + deletes * runs)
+        browse_imsis = imsis[:options['subscribers']]
+        delete_imsis = imsis[options['subscribers']:]
+
+        username = LOADTEST_USERNAME
+        if User.objects.filter(username=username).exists():
+            raise CommandError(
+                f'Пользователь {username} уже существует (остался от '
+                'прерванного теста?), удалите его')
+        password = secrets.token_urlsafe(16)
+        user = User.objects.create_user(
+            username=username,
+            email=f'{username}@loadtest.invalid',
+            password=password,
+            role=Roles.USER,
+        )
+
+        report = {
+            'subscribers': options['subscribers'],
+            'users': users,
+            'iterations': iterations,
+            'runs': [],
+        }
+        try:
+            with self.mongo(options['mongod']) as (client_settings, env):
+                collection = MongoClient(**client_settings)[
+                    settings.DATABASES[MONGO_DATABASE_ALIAS]['NAME']
+                ][SUBSCRIBERS_COLLECTION]
+                search_filter = build_imsi_filter(prefix)
+                if collection.count_documents(search_filter, limit=1):
+                    raise CommandError(
+                        f'В базе уже есть абоненты с префиксом {prefix}')
+                try:
+                    collection.insert_many(
+                        make_subscriber_document(imsi) for imsi in imsis)
+                    invalidate_subscribers()
+
+                    for number in range(runs):
+                        run_deletes = delete_imsis[
+                            number * deletes:(number + 1) * deletes]
+                        if options['url']:
+                            result = run_load_test(
+                                options['url'], username, password, users,
+                                prefix, browse_imsis, run_deletes,
+                            )
+                            result['server'] = options['url']
+                        else:
+                            result = self.run_with_server(
+                                configs[number], env, username, password,
+                                users, prefix, browse_imsis, run_deletes,
+                            )
+                        report['runs'].append(result)
+                        self.stderr.write(
+                            f'{result["server"]}: '
+                            f'{result["throughput_rps"]} запросов/с')
+                finally:
+                    collection.delete_many(search_filter)
+                    collection.database.client.close()
+                    invalidate_subscribers()
+        except PyMongoError as e:
+            raise CommandError(f'Ошибка MongoDB: {e}')
+        finally:
+            user.delete()
+
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+    @contextmanager
+    def mongo(self, mongod: Optional[str]) -> Iterator[tuple[dict, dict]]:
+        """
+        Параметры MongoClient и переменные окружения для gunicorn: из
+        настроек или временного mongod, который удаляется после теста.
+        """
+        client_settings = dict(
+            settings.DATABASES[MONGO_DATABASE_ALIAS]['CLIENT'])
+        if mongod is None:
+            yield client_settings, {}
+            return
+
+        port = free_port()
+        dbpath = tempfile.mkdtemp(prefix='loadtest-mongod-')
+        process = subprocess.Popen(
+            [
+                mongod, '--dbpath', dbpath, '--port', str(port),
+                '--bind_ip', '127.0.0.1', '--quiet',
+            ],
+            stdout=subprocess.DEVNULL,
+        )
+        client_settings.update({'host': '127.0.0.1', 'port': port})
+        try:
+            with MongoClient(**client_settings) as client:
+                client.admin.command('ping')
+            yield client_settings, {
+                'MONGO_HOST': '127.0.0.1',
+                'MONGO_PORT': str(port),
+            }
+        finally:
+            process.terminate()
+            process.wait()
+            shutil.rmtree(dbpath, ignore_errors=True)
+
+    def run_with_server(
+        self,
+        config: tuple[int, int, str],
+        env: dict,
+        username: str,
+        password: str,
+        users: int,
+        search_query: str,
+        browse_imsis: list[str],
+        delete_imsis: list[str],
+    ) -> dict:
+        workers, threads, worker_class = config
+        asgi = worker_class == ASGI_WORKER_CLASS
+        port = free_port()
+        server_env = {
+            **os.environ,
+            **env,
+            'GUNICORN_BIND': f'127.0.0.1:{port}',
+            'GUNICORN_WORKERS': str(workers),
+            'GUNICORN_THREADS': str(threads),
+            'GUNICORN_WORKER_CLASS': worker_class,
+            'RATELIMIT_ENABLE': 'False',
+            'ASYNC_SUBSCRIBER_VIEWS': str(asgi),
+        }
+        application = (
+            'backend.asgi:application' if asgi
+            else 'backend.wsgi:application'
+        )
+        base_url = f'http://127.0.0.1:{port}'
+        with tempfile.TemporaryFile() as log:
+            process = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', application],
+                cwd=settings.BASE_DIR,
+                env=server_env,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+            )
+            try:
+                if not self.wait_until_ready(base_url, process):
+                    log.seek(0)
+                    raise CommandError(
+                        'gunicorn не запустился:\n'
+                        + log.read().decode('utf-8', 'replace')[-2000:])
+                result = run_load_test(
+                    base_url, username, password, users, search_query,
+                    browse_imsis, delete_imsis,
+                )
+            finally:
+                process.terminate()
+                process.wait()
+
+        result['server'] = f'{workers}:{threads}:{worker_class}'
+        result.update({
+            'workers': workers,
+            'threads': threads,
+            'worker_class': worker_class,
+        })
+        return result
+
+    @staticmethod
+    def wait_until_ready(base_url: str, process: subprocess.Popen) -> bool:
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        session = BrowserSession(base_url)
+        while time.monotonic() < deadline and process.poll() is None:
+            try:
+                status, _, _ = session.request('GET', LOGIN_PATH)
+            except OSError:
+                time.sleep(0.2)
+                continue
+            finally:
+                session.close()
+            if status == 200:
+                return True
+            time.sleep(0.2)
+        return False
@@ -0,0 +1,159 @@
+from typing import Callable, Iterable
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from pymongo import DESCENDING
+
+from open5gs.benchmark import format_stats, make_subscriber_document, measure
+from open5gs.constants import MAX_SUBSCRIBER_PER_PAGE
+from open5gs.models import Subscriber
+from open5gs.pipeline import error_text
+from open5gs.provisioning import imsi_range
+from open5gs.repository import SUBSCRIBER_FIELDS, subscriber_repository
+
+
+def each(imsis: Iterable[str], call: Callable[[str], object]) -> Callable:
+    """Вызов без аргументов, каждый раз со следующим IMSI"""
+    iterator = iter(imsis)
+    return lambda: call(next(iterator))
+
+
+def djongo_create(imsi: str) -> None:
+    document = make_subscriber_document(imsi)
+    Subscriber(
+        **{f: document[f] for f in SUBSCRIBER_FIELDS if f in document}
+    ).save()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время чтения и записи абонентов через djongo и через '
+        'SubscriberRepository (pymongo)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations', type=int, default=200,
+            help='Количество повторов каждого запроса',
+        )
+        parser.add_argument(
+            '--imsi', type=str, default=None,
+            help='IMSI для чтения одного абонента (по умолчанию - первый)',
+        )
+        parser.add_argument(
+            '--writes', action='store_true',
+            help=(
+                'Сравнить и запись: создание, обновление и удаление '
+                'временных абонентов'
+            ),
+        )
+        parser.add_argument(
+            '--imsi-start', type=str, default='999990000000000',
+            help='Первый IMSI временных абонентов для --writes',
+        )
+
+    def handle(self, *args, **options):
+        iterations: int = options['iterations']
+        if iterations <= 0:
+            raise CommandError('--iterations должен быть > 0')
+
+        imsi = options['imsi']
+        if imsi is None:
+            first = subscriber_repository.find(projection=['imsi'], limit=1)
+            if not first:
+                raise CommandError('Коллекция subscribers пуста')
+            imsi = first[0]['imsi']
+
+        # Запросы репозитория - без кэша списков и карточек, которым
+        # пользуются CursorPaginator и get_cached_by_imsi: иначе после
+        # первого повтора замерялись бы попадания в кэш.
+        page_size = MAX_SUBSCRIBER_PER_PAGE
+        self.compare(
+            'get по IMSI',
+            lambda: Subscriber.objects.get(imsi=imsi),
+            lambda: subscriber_repository.get_by_imsi(imsi),
+            iterations,
+        )
+        self.compare(
+            'первая страница списка',
+            lambda: list(
+                Subscriber.objects.values('pk', 'imsi')
+                .order_by('-pk')[:page_size + 1]
+            ),
+            lambda: subscriber_repository.find(
+                projection=['imsi'], sort=[('_id', DESCENDING)],
+                limit=page_size + 1,
+            ),
+            iterations,
+        )
+        if options['writes']:
+            self.compare_writes(options['imsi_start'], iterations)
+
+    def compare_writes(self, imsi_start: str, iterations: int) -> None:
+        # measure делает еще один, прогревочный вызов
+        count = iterations + 1
+        try:
+            imsis = imsi_range(imsi_start, 2 * count)
+        except ValidationError as e:
+            raise CommandError(f'Некорректный --imsi-start: {error_text(e)}')
+        if subscriber_repository.existing_imsis(imsis):
+            raise CommandError(
+                f'IMSI {imsis[0]}-{imsis[-1]} уже заняты, укажите другой '
+                '--imsi-start'
+            )
+        djongo_imsis, pymongo_imsis = imsis[:count], imsis[count:]
+
+        # Запись через репозиторий включает сброс кэша, как в представлениях
+        try:
+            self.compare(
+                'создание',
+                each(djongo_imsis, djongo_create),
+                each(
+                    pymongo_imsis,
+                    lambda imsi: subscriber_repository.create(
+                        make_subscriber_document(imsi)),
+                ),
+                iterations,
+            )
+            self.compare(
+                'частичное обновление',
+                each(
+                    djongo_imsis,
+                    lambda imsi: Subscriber.objects.filter(imsi=imsi)
+                    .update(subscriber_status=1),
+                ),
+                each(
+                    pymongo_imsis,
+                    lambda imsi: subscriber_repository.update(
+                        imsi, {'subscriber_status': 1}),
+                ),
+                iterations,
+            )
+            self.compare(
+                'удаление',
+                each(
+                    djongo_imsis,
+                    lambda imsi: Subscriber.objects.filter(imsi=imsi)
+                    .delete(),
+                ),
+                each(pymongo_imsis, subscriber_repository.delete),
+                iterations,
+            )
+        finally:
+            subscriber_repository.collection.delete_many(
+                {'imsi': {'$in': imsis}})
+
+    def compare(
+        self,
+        name: str,
+        djongo_call: Callable,
+        pymongo_call: Callable,
+        iterations: int,
+    ) -> None:
+        djongo_stats = measure(djongo_call, iterations)
+        pymongo_stats = measure(pymongo_call, iterations)
+        speedup = djongo_stats['mean'] / pymongo_stats['mean']
+        self.stdout.write(f'📊 {name} ({iterations} повторов):')
+        self.stdout.write(f'   djongo:  {format_stats(djongo_stats)}')
+        self.stdout.write(f'   pymongo: {format_stats(pymongo_stats)}')
+        self.stdout.write(f'   ускорение: x{speedup:.1f}')
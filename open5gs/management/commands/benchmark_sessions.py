@@ -0,0 +1,97 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from core import sessions
+
+DEFAULT_SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class WriteCounter:
+    """execute_wrapper: записи в django_session и во все таблицы"""
+
+    def __init__(self) -> None:
+        self.session_writes = 0
+        self.writes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith(WRITE_STATEMENTS):
+            self.writes += 1
+            if 'django_session' in sql:
+                self.session_writes += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает число записей в PostgreSQL на запрос для штатного '
+        'движка сессий и core.sessions при SESSION_SAVE_EVERY_REQUEST. '
+        'Все изменения откатываются'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=1000,
+            help='Запросов одного пользователя в каждом режиме',
+        )
+        parser.add_argument(
+            '--think-time', type=float, default=5,
+            help='Секунд между кликами пользователя (модельное время)',
+        )
+
+    def handle(self, *args, **options):
+        requests, think_time = options['requests'], options['think_time']
+        if requests <= 0 or think_time < 0:
+            raise CommandError(
+                '--requests должен быть > 0, --think-time - >= 0')
+
+        self.stdout.write(
+            f'📊 {requests} запросов, клик раз в {think_time:g} с, '
+            f'кэш {settings.CACHES[settings.SESSION_CACHE_ALIAS]["BACKEND"]}'
+        )
+        for engine in (DEFAULT_SESSION_ENGINE, 'core.sessions'):
+            counter = self.run(engine, requests, think_time)
+            self.stdout.write(
+                f'   {engine}: {counter.session_writes / requests:.3f} '
+                'записей django_session на запрос, '
+                f'{counter.writes / requests:.3f} записей всего '
+                '(с таблицей кэша)'
+            )
+
+    def run(
+        self, engine: str, requests: int, think_time: float
+    ) -> WriteCounter:
+        now = [sessions.SessionStore.clock()]
+        original_clock = sessions.SessionStore.clock
+        sessions.SessionStore.clock = staticmethod(lambda: now[0])
+        counter = WriteCounter()
+        try:
+            with override_settings(
+                SESSION_ENGINE=engine, SESSION_SAVE_EVERY_REQUEST=True
+            ), transaction.atomic():
+                store = import_module(engine).SessionStore()
+                store['_auth_user_id'] = '1'
+                store.create()
+                middleware = SessionMiddleware(lambda request: HttpResponse())
+                factory = RequestFactory()
+                factory.cookies[settings.SESSION_COOKIE_NAME] = (
+                    store.session_key)
+
+                with connection.execute_wrapper(counter):
+                    for _ in range(requests):
+                        request = factory.get('/')
+                        middleware(request)
+                        now[0] += think_time
+
+                store.delete()
+                transaction.set_rollback(True)
+        finally:
+            sessions.SessionStore.clock = original_clock
+        return counter
@@ -0,0 +1,82 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from open5gs.benchmark import format_stats
+from open5gs.benchmark_suite import (
+    DEFAULT_REGRESSION_THRESHOLD,
+    compare_results,
+    run_suite
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Микробенчмарки формы абонента, нормализаторов и validators.py на '
+        'документах до MAX_SLICE_COUNT x MAX_SST_VALUE x MAX_PCC_RULE_COUNT '
+        'с сохранением в JSON и сравнением с baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations', type=int, default=200,
+            help='Количество повторов каждого замера',
+        )
+        parser.add_argument(
+            '--filter', type=str, default=None,
+            help='Только бенчмарки, в имени которых есть эта строка',
+        )
+        parser.add_argument(
+            '--output', type=str, default=None,
+            help='Сохранить результаты в JSON-файл (новый baseline)',
+        )
+        parser.add_argument(
+            '--baseline', type=str, default=None,
+            help='JSON прошлого запуска для сравнения',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+            help=(
+                'Рост медианы относительно baseline, который считается '
+                'регрессией (0.2 = 20%%)'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        iterations: int = options['iterations']
+        if iterations <= 0:
+            raise CommandError('--iterations должен быть > 0')
+
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as file:
+                    baseline = json.load(file)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Не удалось прочитать baseline: {e}')
+
+        current = run_suite(iterations, options['filter'])
+        if not current['results']:
+            raise CommandError('Нет бенчмарков, подходящих под --filter')
+
+        changes = (
+            compare_results(baseline, current, options['threshold'])
+            if baseline else {}
+        )
+        for key, stats in current['results'].items():
+            line = f'{key}: {format_stats(stats)}'
+            if key in changes:
+                change, regression = changes[key]
+                line += f', {change:+.1%} к baseline'
+                if regression:
+                    line += ' ⚠️ регрессия'
+            self.stdout.write(line)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(current, file, ensure_ascii=False, indent=2)
+
+        regressions = [key for key, (_, bad) in changes.items() if bad]
+        if regressions:
+            raise CommandError(
+                f'Регрессии ({len(regressions)}): {", ".join(regressions)}')
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from open5gs.benchmark import (
+    format_stats,
+    make_subscriber_document,
+    measure,
+    validate_legacy
+)
+from open5gs.document_validator import validate_subscriber_document
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время проверки документа абонента прежними функциями '
+        'validators.py и скомпилированным validate_subscriber_document'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations', type=int, default=2000,
+            help='Количество повторов каждой проверки',
+        )
+
+    def handle(self, *args, **options):
+        iterations: int = options['iterations']
+        if iterations <= 0:
+            raise CommandError('--iterations должен быть > 0')
+
+        cases = [
+            ('1 slice, 1 сессия', make_subscriber_document()),
+            (
+                '8 slice, 4 сессии, 8 PCC Rules',
+                make_subscriber_document(slices=8, sessions=4, pcc_rules=8),
+            ),
+        ]
+        for name, document in cases:
+            legacy = measure(lambda: validate_legacy(document), iterations)
+            compiled = measure(
+                lambda: validate_subscriber_document(document), iterations)
+            speedup = legacy['mean'] / compiled['mean']
+            self.stdout.write(f'📊 {name} ({iterations} повторов):')
+            self.stdout.write(f'   validators.py: {format_stats(legacy)}')
+            self.stdout.write(f'   compiled:      {format_stats(compiled)}')
+            self.stdout.write(f'   ускорение: x{speedup:.1f}')
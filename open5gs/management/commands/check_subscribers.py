@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from pymongo.errors import PyMongoError
+
+from core.logger import mongo_logger
+from open5gs.pipeline import (
+    DEFAULT_CHUNK_SIZE,
+    default_workers,
+    process_records,
+    validate_record
+)
+from open5gs.repository import SUBSCRIBER_FIELDS, subscriber_repository
+from open5gs.search import build_imsi_filter
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет сохраненных абонентов по схеме документа и выводит '
+        'IMSI с ошибками (записи не изменяются)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--query', type=str, default='',
+            help='Фильтр по IMSI как в строке поиска (префикс или *подстрока)',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=default_workers(),
+            help='Количество процессов для проверки',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+            help='Количество документов, передаваемых процессу за раз',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size должен быть > 0')
+
+        projection = [field for field in SUBSCRIBER_FIELDS if field != '_id']
+        documents = subscriber_repository.iter_documents(
+            build_imsi_filter(options['query']), projection=projection)
+        started = time.monotonic()
+        checked = failed = 0
+        try:
+            for imsi, _, error in process_records(
+                ((document.get('imsi'), document) for document in documents),
+                handler=validate_record,
+                workers=options['workers'],
+                chunk_size=options['chunk_size'],
+            ):
+                checked += 1
+                if error is not None:
+                    failed += 1
+                    self.stderr.write(f'❌ {imsi}: {error}')
+        except PyMongoError as e:
+            mongo_logger.exception(e)
+            raise CommandError(f'Ошибка MongoDB: {e}')
+
+        self.stdout.write(
+            f'✅ Проверено {checked}, с ошибками {failed} '
+            f'за {time.monotonic() - started:.1f} с'
+        )
@@ -0,0 +1,62 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from pymongo.errors import PyMongoError
+
+from core.logger import mongo_logger
+from open5gs.export import (
+    EXPORT_BATCH_SIZE,
+    EXPORT_FORMAT_NDJSON,
+    EXPORT_FORMATS,
+    stream_subscribers
+)
+from open5gs.search import build_imsi_filter
+
+
+class Command(BaseCommand):
+    help = 'Потоковая выгрузка абонентов в NDJSON или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', choices=tuple(EXPORT_FORMATS),
+            default=EXPORT_FORMAT_NDJSON,
+            help='Формат выгрузки',
+        )
+        parser.add_argument(
+            '--output', type=str, default='-',
+            help='Файл для записи или "-" для stdout',
+        )
+        parser.add_argument(
+            '--query', type=str, default='',
+            help='Фильтр по IMSI как в строке поиска (префикс или *подстрока)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=EXPORT_BATCH_SIZE,
+            help='Размер пачки документов курсора MongoDB',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size должен быть > 0')
+
+        output = options['output']
+        target = (
+            sys.stdout if output == '-'
+            else open(output, 'w', encoding='utf-8', newline='')
+        )
+        try:
+            for chunk in stream_subscribers(
+                build_imsi_filter(options['query']),
+                options['format'],
+                batch_size=options['batch_size'],
+            ):
+                target.write(chunk)
+        except PyMongoError as e:
+            mongo_logger.exception(e)
+            raise CommandError(f'Ошибка MongoDB: {e}')
+        finally:
+            if target is not sys.stdout:
+                target.close()
+
+        if target is not sys.stdout:
+            self.stdout.write(f'✅ Абоненты выгружены в {output}')
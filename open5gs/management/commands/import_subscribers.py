@@ -0,0 +1,185 @@
+import csv
+import json
+import sys
+import time
+from contextlib import ExitStack
+from typing import Iterator, Optional, TextIO, Union
+
+from django.core.management.base import BaseCommand, CommandError
+from pymongo.errors import PyMongoError
+
+from core.logger import mongo_logger
+from open5gs.pipeline import (
+    DEFAULT_CHUNK_SIZE,
+    normalize_csv_row,
+    normalize_json_line,
+    process_records
+)
+from open5gs.repository import subscriber_repository
+
+FORMAT_CSV = 'csv'
+FORMAT_JSONL = 'jsonl'
+DEFAULT_BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковый импорт абонентов из CSV или JSONL (по строке на абонента) '
+        'с проверкой по правилам SubscriberForm и пакетной вставкой'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', type=str,
+            help='Путь к файлу или "-" для чтения из stdin',
+        )
+        parser.add_argument(
+            '--format', choices=(FORMAT_CSV, FORMAT_JSONL), default=None,
+            help='Формат файла (по умолчанию - по расширению)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='Количество документов в одной вставке',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Количество процессов для проверки записей',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+            help='Количество записей, передаваемых процессу за раз',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только проверить данные, ничего не записывая',
+        )
+        parser.add_argument(
+            '--errors-file', type=str, default=None,
+            help='Файл JSONL для записи ошибок (номер строки и текст)',
+        )
+
+    def handle(self, *args, **options):
+        path: str = options['path']
+        batch_size: int = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('--batch-size должен быть > 0')
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size должен быть > 0')
+
+        file_format = options['format'] or (
+            FORMAT_CSV if path.lower().endswith('.csv') else FORMAT_JSONL
+        )
+        self.dry_run: bool = options['dry_run']
+        self.processed = self.inserted = self.failed = 0
+        self.started = time.monotonic()
+
+        with ExitStack() as stack:
+            # Источник открывается первым: если его нет, файл ошибок не
+            # создается
+            try:
+                source = (
+                    sys.stdin if path == '-' else stack.enter_context(
+                        open(path, encoding='utf-8', newline=''))
+                )
+                self.errors_file = (
+                    stack.enter_context(
+                        open(options['errors_file'], 'w', encoding='utf-8'))
+                    if options['errors_file'] else None
+                )
+            except OSError as e:
+                raise CommandError(f'Не удалось открыть файл: {e}')
+
+            try:
+                self.import_records(
+                    process_records(
+                        self.read(source, file_format),
+                        handler=(
+                            normalize_csv_row if file_format == FORMAT_CSV
+                            else normalize_json_line
+                        ),
+                        workers=options['workers'],
+                        chunk_size=options['chunk_size'],
+                    ),
+                    batch_size,
+                )
+            except PyMongoError as e:
+                mongo_logger.exception(e)
+                raise CommandError(f'Ошибка MongoDB: {e}')
+
+        self.stdout.write(
+            f'✅ Готово: обработано {self.processed}, '
+            f'{"проверено" if self.dry_run else "добавлено"} {self.inserted}, '
+            f'ошибок {self.failed} за {time.monotonic() - self.started:.1f} с'
+        )
+
+    @staticmethod
+    def read(
+        source: TextIO, file_format: str
+    ) -> Iterator[tuple[int, Union[str, dict]]]:
+        """
+        Генератор (номер строки, строка JSONL или строка CSV) без чтения
+        всего файла. Разбор и проверка выполняются в process_records.
+        """
+        if file_format == FORMAT_CSV:
+            reader = csv.DictReader(source)
+            for row in reader:
+                yield reader.line_num, row
+            return
+
+        for line_num, line in enumerate(source, start=1):
+            line = line.strip()
+            if line:
+                yield line_num, line
+
+    def import_records(
+        self,
+        results: Iterator[tuple[int, Optional[dict], Optional[str]]],
+        batch_size: int,
+    ) -> None:
+        batch: list[dict] = []
+        line_nums: list[int] = []
+
+        for line_num, document, error in results:
+            self.processed += 1
+            if error is not None:
+                self.report_error(line_num, error)
+                continue
+
+            batch.append(document)
+            line_nums.append(line_num)
+            if len(batch) >= batch_size:
+                self.flush(batch, line_nums)
+                batch, line_nums = [], []
+
+        self.flush(batch, line_nums)
+
+    def flush(self, batch: list[dict], line_nums: list[int]) -> None:
+        if not batch:
+            return
+
+        if self.dry_run:
+            inserted, errors = len(batch), []
+        else:
+            inserted, errors = subscriber_repository.insert_many(batch)
+
+        self.inserted += inserted
+        for index, message in errors:
+            self.report_error(line_nums[index], message)
+
+        elapsed = time.monotonic() - self.started
+        rate = self.processed / elapsed if elapsed else 0
+        self.stdout.write(
+            f'⏳ Обработано {self.processed}, '
+            f'{"проверено" if self.dry_run else "добавлено"} {self.inserted}, '
+            f'ошибок {self.failed} ({rate:.0f} строк/с)'
+        )
+
+    def report_error(self, line_num: int, message: str) -> None:
+        self.failed += 1
+        self.stderr.write(f'❌ Строка {line_num}: {message}')
+        if self.errors_file:
+            self.errors_file.write(
+                json.dumps(
+                    {'line': line_num, 'error': message}, ensure_ascii=False
+                ) + '\n'
+            )
@@ -0,0 +1,110 @@
+import json
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from pymongo.errors import PyMongoError
+
+from core.logger import mongo_logger
+from open5gs import provisioning
+from open5gs.pipeline import error_text
+from open5gs.repository import subscriber_repository
+
+
+class Command(BaseCommand):
+    help = (
+        'Создает диапазон абонентов с последовательными IMSI по шаблону '
+        '(существующий абонент или JSON-файл) со случайными ключами'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start', type=str, required=True,
+            help='Начальный IMSI; ширина диапазона берется из него',
+        )
+        parser.add_argument(
+            '--count', type=int, required=True,
+            help='Количество абонентов',
+        )
+        template = parser.add_mutually_exclusive_group(required=True)
+        template.add_argument(
+            '--template-imsi', type=str,
+            help='IMSI абонента, настройки которого копируются',
+        )
+        template.add_argument(
+            '--template', type=str,
+            help='JSON-файл с документом абонента-шаблона',
+        )
+        parser.add_argument(
+            '--keep-k', action='store_true',
+            help='Копировать K шаблона вместо генерации случайного',
+        )
+        parser.add_argument(
+            '--random-opc', action='store_true',
+            help='Генерировать случайный OPc вместо OP/OPc шаблона',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int,
+            default=provisioning.DEFAULT_PROVISION_CHUNK_SIZE,
+            help='Количество IMSI в одной проверке и вставке',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только проверить шаблон и занятые IMSI, ничего не записывая',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size должен быть > 0')
+
+        dry_run: bool = options['dry_run']
+        inserted = existing = failed = 0
+        started = time.monotonic()
+        try:
+            results = provisioning.provision_subscribers(
+                self.load_template(options),
+                options['start'],
+                options['count'],
+                random_k=not options['keep_k'],
+                random_opc=options['random_opc'],
+                chunk_size=options['chunk_size'],
+                dry_run=dry_run,
+            )
+            for chunk_inserted, chunk_existing, errors in results:
+                inserted += chunk_inserted
+                existing += len(chunk_existing)
+                failed += len(errors)
+                for imsi in chunk_existing:
+                    self.stderr.write(f'⚠️ IMSI {imsi} уже существует')
+                for imsi, message in errors:
+                    self.stderr.write(f'❌ IMSI {imsi}: {message}')
+                self.stdout.write(
+                    f'⏳ {"Проверено" if dry_run else "Добавлено"} '
+                    f'{inserted}, занято {existing}, ошибок {failed}'
+                )
+        except ValidationError as e:
+            raise CommandError(f'Некорректные параметры: {error_text(e)}')
+        except PyMongoError as e:
+            mongo_logger.exception(e)
+            raise CommandError(f'Ошибка MongoDB: {e}')
+
+        self.stdout.write(
+            f'✅ Готово: {"проверено" if dry_run else "добавлено"} '
+            f'{inserted}, занято {existing}, ошибок {failed} за '
+            f'{time.monotonic() - started:.1f} с'
+        )
+
+    @staticmethod
+    def load_template(options: dict) -> dict:
+        if options['template']:
+            try:
+                with open(options['template'], encoding='utf-8') as file:
+                    return json.load(file)
+            except (OSError, json.JSONDecodeError) as e:
+                raise CommandError(f'Не удалось прочитать шаблон: {e}')
+
+        template = subscriber_repository.get_by_imsi(options['template_imsi'])
+        if template is None:
+            raise CommandError(
+                f'Абонент-шаблон {options["template_imsi"]} не найден')
+        return template
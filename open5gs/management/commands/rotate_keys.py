@@ -0,0 +1,163 @@
+import time
+from typing import Optional
+
+from bson import ObjectId
+from django.core.management.base import BaseCommand, CommandError
+from pymongo.errors import PyMongoError
+
+from core.logger import mongo_logger
+from open5gs.key_rotation import (
+    KEY_ROTATION_MODES,
+    MODE_CONVERT,
+    MODE_FILTERS,
+    key_updates,
+    load_checkpoint,
+    save_checkpoint,
+    security_update
+)
+from open5gs.milenage import KEY_BYTES
+from open5gs.pipeline import DEFAULT_CHUNK_SIZE
+from open5gs.repository import subscriber_repository
+from open5gs.search import build_imsi_filter
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Пакетная замена ключей абонентов: convert - перевод OP в OPc '
+        '(OPc = AES-128_K(OP) XOR OP), rotate - новый случайный K '
+        '(SIM-карты должны получить тот же K)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('mode', choices=KEY_ROTATION_MODES)
+        parser.add_argument(
+            '--op', type=str, default=None,
+            help='OP оператора для пересчета OPc при rotate',
+        )
+        parser.add_argument(
+            '--query', type=str, default='',
+            help='Фильтр по IMSI как в строке поиска (префикс или *подстрока)',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Количество процессов для расчета ключей',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+            help='Количество абонентов, передаваемых процессу за раз',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='Количество обновлений в одном bulk_write',
+        )
+        parser.add_argument(
+            '--checkpoint', type=str, default=None,
+            help=(
+                'Файл контрольной точки: после каждого пакета в него '
+                'пишется _id последнего абонента, повторный запуск '
+                'продолжает с него'
+            ),
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать ключи, ничего не записывая',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0 or options['batch_size'] <= 0:
+            raise CommandError('--chunk-size и --batch-size должны быть > 0')
+
+        self.mode: str = options['mode']
+        self.dry_run: bool = options['dry_run']
+        self.checkpoint: Optional[str] = (
+            None if self.dry_run else options['checkpoint'])
+        op = self.clean_op(options['op'])
+
+        search_filter = {
+            **build_imsi_filter(options['query']), **MODE_FILTERS[self.mode]}
+        last_id = self.resume_from()
+        if last_id is not None:
+            search_filter['_id'] = {'$gt': last_id}
+            self.stdout.write(f'↪️ Продолжение после _id {last_id}')
+
+        self.processed = self.updated = self.conflicts = self.failed = 0
+        self.started = time.monotonic()
+        batch: list[tuple[str, dict, dict]] = []
+        try:
+            documents = subscriber_repository.iter_documents(
+                search_filter,
+                projection=['imsi', 'security'],
+                sort=[('_id', 1)],
+            )
+            for document, keys, error in key_updates(
+                documents,
+                self.mode,
+                op=op,
+                workers=options['workers'],
+                chunk_size=options['chunk_size'],
+            ):
+                self.processed += 1
+                last_id = document['_id']
+                if error is not None:
+                    self.failed += 1
+                    self.stderr.write(f'❌ {document.get("imsi")}: {error}')
+                elif keys is not None:
+                    batch.append(security_update(document, keys))
+                if len(batch) >= options['batch_size']:
+                    self.flush(batch, last_id)
+                    batch = []
+            self.flush(batch, last_id)
+        except PyMongoError as e:
+            mongo_logger.exception(e)
+            raise CommandError(f'Ошибка MongoDB: {e}')
+
+        self.stdout.write(
+            f'✅ Готово: обработано {self.processed}, '
+            f'{"к изменению" if self.dry_run else "изменено"} '
+            f'{self.updated}, изменены другими {self.conflicts}, '
+            f'ошибок {self.failed} за {time.monotonic() - self.started:.1f} с'
+        )
+
+    def clean_op(self, op: Optional[str]) -> Optional[str]:
+        if op is None:
+            return None
+        if self.mode == MODE_CONVERT:
+            raise CommandError('--op используется только с rotate')
+        op = op.replace(' ', '').upper()
+        try:
+            valid = len(bytes.fromhex(op)) == KEY_BYTES
+        except ValueError:
+            valid = False
+        if not valid:
+            raise CommandError('--op должен быть 32 HEX-символа')
+        return op
+
+    def resume_from(self) -> Optional[ObjectId]:
+        if self.checkpoint is None:
+            return None
+        try:
+            return load_checkpoint(self.checkpoint, self.mode)
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'Некорректная контрольная точка: {e}')
+
+    def flush(
+        self, batch: list[tuple[str, dict, dict]], last_id: Optional[ObjectId]
+    ) -> None:
+        if self.dry_run:
+            self.updated += len(batch)
+        elif batch:
+            matched = subscriber_repository.bulk_update(batch)
+            self.updated += matched
+            self.conflicts += len(batch) - matched
+        if self.checkpoint is not None and last_id is not None:
+            save_checkpoint(self.checkpoint, self.mode, last_id)
+
+        elapsed = time.monotonic() - self.started
+        rate = self.processed / elapsed if elapsed else 0
+        self.stdout.write(
+            f'⏳ Обработано {self.processed}, '
+            f'{"к изменению" if self.dry_run else "изменено"} '
+            f'{self.updated}, ошибок {self.failed} ({rate:.0f} абонентов/с)'
+        )
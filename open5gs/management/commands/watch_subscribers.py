@@ -0,0 +1,125 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from pymongo.errors import OperationFailure, PyMongoError
+
+from core.logger import mongo_logger
+from open5gs.cache import invalidate_all
+from open5gs.change_stream import (
+    CHANGE_STREAM_HISTORY_LOST_CODES,
+    CHANGE_STREAM_NOT_SUPPORTED_CODE,
+    handle_change,
+    load_resume_token,
+    reset_resume_token,
+    save_resume_token
+)
+from open5gs.mongo import get_subscribers_collection
+
+
+class Command(BaseCommand):
+    help = (
+        'Следит за change stream коллекции subscribers и сбрасывает кэши '
+        'списков, количеств и карточек абонентов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset-token', action='store_true',
+            help='Начать с текущего момента, забыв сохраненный resume token',
+        )
+        parser.add_argument(
+            '--max-await-ms', type=int, default=1000,
+            help=(
+                'Ожидание новых событий на сервере (мс), должно быть '
+                'меньше socketTimeoutMS'
+            ),
+        )
+        parser.add_argument(
+            '--save-every', type=int, default=100,
+            help='Сохранять resume token не реже чем раз в N событий',
+        )
+        parser.add_argument(
+            '--idle-save-interval', type=float, default=60,
+            help='Сохранять resume token в простое не чаще раза в N секунд',
+        )
+        parser.add_argument(
+            '--retry-delay', type=float, default=5,
+            help='Пауза перед переподключением после ошибки (с)',
+        )
+
+    def handle(self, *args, **options):
+        if options['reset_token']:
+            reset_resume_token()
+
+        while True:
+            try:
+                self.watch(options)
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAM_NOT_SUPPORTED_CODE:
+                    raise CommandError(
+                        'Change stream доступен только для replica set '
+                        'или sharded cluster MongoDB'
+                    )
+                if e.code not in CHANGE_STREAM_HISTORY_LOST_CODES:
+                    raise
+                # Токен вышел за пределы oplog - пропущенные события
+                # не восстановить, поэтому сбрасываются все кэши.
+                mongo_logger.warning(
+                    f'Resume token устарел, поток открыт заново: {e}')
+                reset_resume_token()
+            except PyMongoError as e:
+                mongo_logger.exception(e)
+                time.sleep(options['retry_delay'])
+            except KeyboardInterrupt:
+                return
+
+    def watch(self, options: dict) -> None:
+        token = load_resume_token()
+        if token is None:
+            # Неизвестно, что менялось до запуска:
+            invalidate_all()
+
+        collection = get_subscribers_collection()
+        # Без full_document='updateLookup': документ нужен редко и
+        # дочитывается в handle_change, а не на каждое событие.
+        with collection.watch(
+            resume_after=token,
+            max_await_time_ms=options['max_await_ms'],
+        ) as stream:
+            self.stdout.write('👀 Отслеживание изменений subscribers')
+            # Токен последнего обработанного события. stream.resume_token
+            # уже указывает за событие, на котором handle_change упал, и
+            # после перезапуска оно было бы пропущено.
+            saved = handled = token
+            unsaved = 0
+            saved_at = time.monotonic()
+            while stream.alive:
+                change = stream.try_next()
+                if change is None:
+                    # Токен двигается и без событий. Его сохранение само
+                    # пишет в oplog и снова сдвигает токен, поэтому в
+                    # простое - не чаще раза в idle_save_interval:
+                    handled = stream.resume_token
+                    if (
+                        handled == saved
+                        or time.monotonic() - saved_at
+                        < options['idle_save_interval']
+                    ):
+                        continue
+                elif not handle_change(change):
+                    # После invalidate по старому токену не продолжить:
+                    reset_resume_token()
+                    return
+                else:
+                    handled = change['_id']
+                    unsaved += 1
+                    if unsaved < options['save_every']:
+                        continue
+                saved = handled
+                save_resume_token(saved)
+                unsaved = 0
+                saved_at = time.monotonic()
+            # При ошибке токен не сохраняется: события после последнего
+            # сохранения будут обработаны повторно
+            if handled != saved:
+                save_resume_token(handled)
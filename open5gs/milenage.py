@@ -0,0 +1,17 @@
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+KEY_BYTES = 16
+
+
+def derive_opc(k: str, op: str) -> str:
+    """
+    OPc = AES-128_K(OP) XOR OP (3GPP TS 35.206, MILENAGE). K и OP -
+    HEX-строки по 16 байт, результат - HEX в верхнем регистре.
+    """
+    k_bytes, op_bytes = bytes.fromhex(k), bytes.fromhex(op)
+    if len(k_bytes) != KEY_BYTES or len(op_bytes) != KEY_BYTES:
+        raise ValueError('K и OP должны быть длиной 128 бит (32 HEX-символа)')
+    encryptor = Cipher(algorithms.AES(k_bytes), modes.ECB()).encryptor()
+    encrypted = encryptor.update(op_bytes) + encryptor.finalize()
+    opc = int.from_bytes(encrypted, 'big') ^ int.from_bytes(op_bytes, 'big')
+    return opc.to_bytes(KEY_BYTES, 'big').hex().upper()
@@ -0,0 +1,190 @@
+import os
+import threading
+from typing import Optional
+
+from django.conf import settings
+from pymongo import MongoClient
+from pymongo.collection import Collection
+from pymongo.database import Database
+from pymongo.monitoring import CommandListener, ConnectionPoolListener
+
+from core import metrics
+from core.logger import mongo_logger
+
+MONGO_DATABASE_ALIAS = 'open5gs_db'
+SUBSCRIBERS_COLLECTION = 'subscribers'
+# Resume token команды watch_subscribers (документ на каждый поток):
+CHANGE_STREAM_TOKENS_COLLECTION = 'change_stream_tokens'
+
+
+class PoolStatsListener(ConnectionPoolListener):
+    """Счетчики событий пула соединений pymongo для текущего процесса"""
+
+    FIELDS = (
+        'created',
+        'closed',
+        'checked_out',
+        'checked_in',
+        'check_out_failed',
+        'pool_cleared',
+    )
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats = dict.fromkeys(self.FIELDS, 0)
+
+    def _inc(self, field: str) -> None:
+        with self._lock:
+            self._stats[field] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['open'] = stats['created'] - stats['closed']
+        stats['in_use'] = stats['checked_out'] - stats['checked_in']
+        return stats
+
+    def pool_created(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._inc('pool_cleared')
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._inc('created')
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._inc('closed')
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._inc('check_out_failed')
+
+    def connection_checked_out(self, event):
+        self._inc('checked_out')
+
+    def connection_checked_in(self, event):
+        self._inc('checked_in')
+
+
+class CommandMetricsListener(CommandListener):
+    """
+    Время и ошибки команд MongoDB (find, insert, update, count...) для
+    /metrics. Регистрируется глобально, поэтому учитывает и клиент
+    djongo, и motor.
+    """
+
+    def __init__(self) -> None:
+        self.duration = metrics.Histogram(
+            'mongo_command_duration_seconds',
+            'Время успешных команд MongoDB',
+            ('command',),
+        )
+        self.failures = metrics.Counter(
+            'mongo_command_failures_total',
+            'Команды MongoDB, завершившиеся ошибкой',
+            ('command',),
+        )
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.duration.observe(
+            event.duration_micros / 1_000_000, event.command_name)
+
+    def failed(self, event):
+        self.failures.inc(event.command_name)
+
+
+command_metrics_listener = CommandMetricsListener()
+
+
+class MongoClientManager:
+    """
+    Один пул MongoClient на процесс. После fork (воркеры gunicorn)
+    клиент родителя не используется: при смене pid создается новый.
+    Параметры пула берутся из DATABASES['open5gs_db']['CLIENT'].
+    """
+
+    def __init__(self) -> None:
+        self._client: Optional[MongoClient] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self.pool_listener = PoolStatsListener()
+
+    def get_client(self) -> MongoClient:
+        pid = os.getpid()
+        if self._client is not None and self._pid == pid:
+            return self._client
+
+        with self._lock:
+            if self._client is None or self._pid != pid:
+                # Клиент, унаследованный от родителя, не закрываем: его
+                # сокеты принадлежат родительскому процессу.
+                self.pool_listener.reset()
+                client_settings = settings.DATABASES[
+                    MONGO_DATABASE_ALIAS]['CLIENT']
+                self._client = MongoClient(
+                    connect=False,
+                    event_listeners=[self.pool_listener],
+                    **client_settings,
+                )
+                self._pid = pid
+        return self._client
+
+    def warm_up(self) -> None:
+        """Поднимает пул заранее (вызывается при старте воркера)"""
+        try:
+            self.get_client().admin.command('ping')
+        except Exception as e:
+            mongo_logger.exception(e)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = None
+            self._pid = None
+
+    def pool_stats(self) -> dict:
+        client_settings = settings.DATABASES[MONGO_DATABASE_ALIAS]['CLIENT']
+        return {
+            'pid': os.getpid(),
+            'connected': self._client is not None and self._pid == os.getpid(),
+            'max_pool_size': client_settings.get('maxPoolSize'),
+            'min_pool_size': client_settings.get('minPoolSize'),
+            **self.pool_listener.stats(),
+        }
+
+
+mongo_client_manager = MongoClientManager()
+
+
+def get_client() -> MongoClient:
+    return mongo_client_manager.get_client()
+
+
+def get_database() -> Database:
+    name = settings.DATABASES[MONGO_DATABASE_ALIAS]['NAME']
+    return get_client()[name]
+
+
+def get_subscribers_collection() -> Collection:
+    return get_database()[SUBSCRIBERS_COLLECTION]
+
+
+def get_change_stream_tokens_collection() -> Collection:
+    return get_database()[CHANGE_STREAM_TOKENS_COLLECTION]
@@ -0,0 +1,143 @@
+from bson import ObjectId
+from django.core.exceptions import ValidationError
+
+from .document_validator import validate_subscriber_document
+from .validators import is_valid_objectid
+
+HEX_SECURITY_FIELDS = ('k', 'amf', 'op', 'opc')
+
+
+def clean_slice(slice_items: list[dict]) -> list[dict]:
+    """Убирает пустые ue/smf из сессий уже проверенных слайсов"""
+    for slice_item in slice_items:
+        for session in slice_item['session']:
+            # Оставляем только непустые значения:
+            for field in ['ue', 'smf']:
+                ip_config = session.get(field)
+
+                if ip_config:
+                    ip_config = {k: v for k, v in ip_config.items() if v}
+                    if ip_config:
+                        session[field] = ip_config
+                    else:
+                        session.pop(field, None)
+
+    return slice_items
+
+
+def strip_security_hex(security_data: dict) -> dict:
+    """Удаляет пробелы из hex-полей security"""
+    cleaned_security = {}
+    for field, value in security_data.items():
+        if field in HEX_SECURITY_FIELDS and value and isinstance(value, str):
+            cleaned_security[field] = value.replace(' ', '')
+        else:
+            cleaned_security[field] = value
+    return cleaned_security
+
+
+def clean_security(security_data: dict) -> dict:
+    cleaned_security = strip_security_hex(security_data)
+
+    # Замена на None пустых значений
+    if not cleaned_security.get('op'):
+        cleaned_security['op'] = None
+    if not cleaned_security.get('opc'):
+        cleaned_security['opc'] = None
+
+    return cleaned_security
+
+
+def add_hide_objects_to_slice(slices: list[dict]) -> list[dict]:
+    """Добавлям скрытые поля, которые должны быть по умолчанию"""
+    for slice_item in slices:
+        used_ids = set()
+
+        def get_unique_objectid():
+            new_id = ObjectId()
+            while str(new_id) in used_ids:
+                new_id = ObjectId()
+            used_ids.add(str(new_id))
+            return new_id
+
+        if not is_valid_objectid(slice_item.get('_id')):
+            slice_item['_id'] = get_unique_objectid()
+        else:
+            oid_str = str(slice_item['_id'])
+            if oid_str in used_ids:
+                slice_item['_id'] = get_unique_objectid()
+            else:
+                used_ids.add(oid_str)
+
+        for session in slice_item.get('session', []):
+            if not is_valid_objectid(session.get('_id')):
+                session['_id'] = get_unique_objectid()
+            else:
+                oid_str = str(session['_id'])
+                if oid_str in used_ids:
+                    session['_id'] = get_unique_objectid()
+                else:
+                    used_ids.add(oid_str)
+
+            for pcc_rule in session.get('pcc_rule', []):
+                if not is_valid_objectid(pcc_rule.get('_id')):
+                    pcc_rule['_id'] = get_unique_objectid()
+                else:
+                    oid_str = str(pcc_rule['_id'])
+                    if oid_str in used_ids:
+                        pcc_rule['_id'] = get_unique_objectid()
+                    else:
+                        used_ids.add(oid_str)
+
+                if (
+                    'flow' not in pcc_rule
+                    or not isinstance(pcc_rule['flow'], list)
+                ):
+                    pcc_rule['flow'] = []
+
+    return slices
+
+
+def normalize_subscriber(record: dict) -> dict:
+    """
+    Проверяет документ абонента через validate_subscriber_document и
+    нормализует его так же, как SubscriberForm (clean_security, clean_slice
+    и add_hide_objects_to_slice). Возвращает документ для вставки в Mongo.
+    """
+    if not isinstance(record, dict):
+        raise ValidationError('Абонент должен быть объектом')
+
+    slices = record.get('slice')
+    # Пустые ue/smf/pcc_rule форма получает из схемы виджета, а в
+    # сохраненном документе их может не быть:
+    for slice_item in slices if isinstance(slices, list) else []:
+        if not isinstance(slice_item, dict):
+            continue
+        sessions = slice_item.get('session')
+        for session in sessions if isinstance(sessions, list) else []:
+            if not isinstance(session, dict):
+                continue
+            for field, default in (('ue', {}), ('smf', {}), ('pcc_rule', [])):
+                session.setdefault(field, default)
+
+    security = record.get('security')
+    document = {
+        'imsi': record.get('imsi'),
+        'msisdn': record.get('msisdn') or [],
+        'security': (
+            strip_security_hex(security)
+            if isinstance(security, dict) else security
+        ),
+        'ambr': record.get('ambr'),
+        'subscriber_status': record.get('subscriber_status', 0),
+        'operator_determined_barring': record.get(
+            'operator_determined_barring', 0),
+        'slice': slices,
+    }
+    validate_subscriber_document(document)
+
+    document['security'] = clean_security(document['security'])
+    document['security']['sqn'] = None
+    document['slice'] = add_hide_objects_to_slice(
+        clean_slice(document['slice']))
+    return document
@@ -0,0 +1,208 @@
+import base64
+import binascii
+import json
+from typing import Any, Optional
+
+from bson import ObjectId
+from django.conf import settings
+from pymongo import ASCENDING, DESCENDING
+
+from .cache import LIST_NAMESPACE, acached, cached, versioned_key
+from .repository import SubscriberRepository
+from .utils import MongoJSONEncoder
+from .validators import is_valid_objectid
+
+CURSOR_NEXT = 'n'
+CURSOR_PREV = 'p'
+
+SORT_BY_ID = 'id'
+SORT_BY_IMSI = 'imsi'
+
+# Поле документа и направление сортировки (True - по убыванию):
+SORT_KEYS = {
+    SORT_BY_ID: ('_id', True),
+    SORT_BY_IMSI: ('imsi', False),
+}
+
+
+def encode_cursor(direction: str, value: Any) -> str:
+    raw = f'{direction}:{value}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token: Optional[str]) -> tuple[Optional[str], Optional[str]]:
+    """Возвращает (направление, значение) или (None, None) для мусора"""
+    if not token:
+        return None, None
+
+    try:
+        padding = '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(token + padding).decode()
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None, None
+
+    direction, _, value = raw.partition(':')
+    if direction not in (CURSOR_NEXT, CURSOR_PREV) or not value:
+        return None, None
+
+    return direction, value
+
+
+class CursorPage:
+    def __init__(
+        self,
+        object_list: list,
+        has_next: bool,
+        has_previous: bool,
+        next_cursor: Optional[str],
+        previous_cursor: Optional[str],
+        count: Optional[int] = None,
+    ) -> None:
+        self.object_list = object_list
+        self.has_next_page = has_next
+        self.has_previous_page = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+    def __bool__(self) -> bool:
+        return bool(self.object_list)
+
+    def has_next(self) -> bool:
+        return self.has_next_page
+
+    def has_previous(self) -> bool:
+        return self.has_previous_page
+
+    def has_other_pages(self) -> bool:
+        return self.has_next_page or self.has_previous_page
+
+
+class CursorPaginator:
+    """
+    Keyset-пагинация: вместо skip/count каждая страница выбирается условием
+    по ключу сортировки (_id или imsi), поэтому стоимость запроса не зависит
+    от номера страницы.
+    """
+
+    def __init__(
+        self,
+        repository: SubscriberRepository,
+        filter: Optional[dict],
+        per_page: int,
+        sort: str = SORT_BY_ID,
+        projection: tuple[str, ...] = ('imsi',),
+    ) -> None:
+        if sort not in SORT_KEYS:
+            sort = SORT_BY_ID
+        self.repository = repository
+        self.filter = filter or {}
+        self.per_page = per_page
+        self.sort = sort
+        self.projection = projection
+        self.field, self.descending = SORT_KEYS[sort]
+
+    def _parse_value(self, value: str) -> Optional[Any]:
+        if self.sort == SORT_BY_ID:
+            return ObjectId(value) if is_valid_objectid(value) else None
+        return value if value.isdigit() else None
+
+    def _query(
+        self, value: Optional[Any], reverse: bool
+    ) -> tuple[dict, list[tuple[str, int]], int]:
+        descending = self.descending != reverse
+        filter = self.filter
+        if value is not None:
+            lookup = '$lt' if descending else '$gt'
+            condition = {self.field: {lookup: value}}
+            filter = {'$and': [filter, condition]} if filter else condition
+
+        sort = [(self.field, DESCENDING if descending else ASCENDING)]
+        return filter, sort, self.per_page + 1
+
+    def _cache_key(
+        self, filter: dict, sort: list[tuple[str, int]], limit: int
+    ) -> str:
+        source = json.dumps(
+            [filter, self.projection, sort, limit],
+            cls=MongoJSONEncoder,
+            sort_keys=True,
+        )
+        return versioned_key(LIST_NAMESPACE, source)
+
+    def _fetch(self, value: Optional[Any], reverse: bool) -> list[dict]:
+        filter, sort, limit = self._query(value, reverse)
+        return cached(
+            self._cache_key(filter, sort, limit),
+            lambda: self.repository.find(
+                filter, projection=self.projection, sort=sort, limit=limit),
+            settings.SUBSCRIBER_LIST_CACHE_TTL,
+        )
+
+    def _parse_token(
+        self, token: Optional[str]
+    ) -> tuple[Optional[str], Optional[Any]]:
+        direction, raw_value = decode_cursor(token)
+        value = self._parse_value(raw_value) if raw_value else None
+        if value is None:
+            direction = None
+        return direction, value
+
+    def _build_page(
+        self, items: list[dict], direction: Optional[str],
+        count: Optional[int],
+    ) -> CursorPage:
+        backward = direction == CURSOR_PREV
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+
+        if backward:
+            items.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, direction is not None
+
+        next_cursor = previous_cursor = None
+        if items:
+            next_cursor = encode_cursor(CURSOR_NEXT, items[-1][self.field])
+            previous_cursor = encode_cursor(CURSOR_PREV, items[0][self.field])
+
+        return CursorPage(
+            items,
+            has_next=has_next,
+            has_previous=has_previous,
+            next_cursor=next_cursor if has_next else None,
+            previous_cursor=previous_cursor if has_previous else None,
+            count=count,
+        )
+
+    def get_page(
+        self, token: Optional[str] = None, count: Optional[int] = None
+    ) -> CursorPage:
+        direction, value = self._parse_token(token)
+        items = self._fetch(value, reverse=direction == CURSOR_PREV)
+        return self._build_page(items, direction, count)
+
+
+class AsyncCursorPaginator(CursorPaginator):
+    """CursorPaginator для async-представлений и AsyncSubscriberRepository"""
+
+    async def aget_page(
+        self, token: Optional[str] = None, count: Optional[int] = None
+    ) -> CursorPage:
+        direction, value = self._parse_token(token)
+        filter, sort, limit = self._query(
+            value, reverse=direction == CURSOR_PREV)
+        items = await acached(
+            lambda: self._cache_key(filter, sort, limit),
+            lambda: self.repository.find(
+                filter, projection=self.projection, sort=sort, limit=limit),
+            settings.SUBSCRIBER_LIST_CACHE_TTL,
+        )
+        return self._build_page(items, direction, count)
@@ -0,0 +1,122 @@
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+import django
+from django.core.exceptions import ValidationError
+
+from .csv_format import unflatten_row
+from .document_validator import validate_subscriber_document
+from .normalizers import normalize_subscriber
+
+DEFAULT_CHUNK_SIZE = 500
+
+# (ключ записи, документ или None, текст ошибки или None):
+PipelineResult = tuple[Any, Optional[dict], Optional[str]]
+RecordHandler = Callable[[Any], tuple[Optional[dict], Optional[str]]]
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def error_text(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return '; '.join(error.messages)
+    if isinstance(error, (AttributeError, KeyError, TypeError)):
+        return f'Некорректная структура: {error!r}'
+    return str(error)
+
+
+def normalize_record(record: Any) -> tuple[Optional[dict], Optional[str]]:
+    """Импорт: проверка и нормализация как в SubscriberForm"""
+    if isinstance(record, Exception):
+        return None, str(record)
+    try:
+        return normalize_subscriber(record), None
+    except (
+        ValidationError, AttributeError, KeyError, TypeError, ValueError
+    ) as e:
+        return None, error_text(e)
+
+
+def normalize_json_line(line: str) -> tuple[Optional[dict], Optional[str]]:
+    """Импорт JSONL: разбор строки тоже выполняется в процессе пула"""
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as e:
+        return None, f'Некорректный JSON: {e}'
+    return normalize_record(record)
+
+
+def normalize_csv_row(row: dict) -> tuple[Optional[dict], Optional[str]]:
+    try:
+        record = unflatten_row(row)
+    except ValueError as e:
+        return None, str(e)
+    return normalize_record(record)
+
+
+def validate_record(record: Any) -> tuple[Optional[dict], Optional[str]]:
+    """
+    Проверка сохраненного документа (сверка, аудит). Документ обратно
+    не возвращается, чтобы не гонять его между процессами еще раз.
+    """
+    try:
+        validate_subscriber_document(record)
+    except ValidationError as e:
+        return None, error_text(e)
+    return None, None
+
+
+def run_chunk(
+    handler: RecordHandler, chunk: list[tuple[Any, Any]]
+) -> list[PipelineResult]:
+    return [(key, *handler(record)) for key, record in chunk]
+
+
+def init_worker() -> None:
+    # При запуске процессов через spawn Django в них еще не настроен:
+    django.setup()
+
+
+def chunked(
+    records: Iterable[tuple[Any, Any]], chunk_size: int
+) -> Iterator[list[tuple[Any, Any]]]:
+    iterator = iter(records)
+    while chunk := list(islice(iterator, chunk_size)):
+        yield chunk
+
+
+def process_records(
+    records: Iterable[tuple[Any, Any]],
+    handler: RecordHandler = normalize_record,
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[PipelineResult]:
+    """
+    Прогоняет пары (ключ, запись) через handler и отдает результаты в
+    порядке входа. При workers > 1 записи пачками по chunk_size уходят в
+    ProcessPoolExecutor; в работе держится не больше 2 * workers пачек,
+    поэтому вход читается потоково. handler должен быть функцией уровня
+    модуля, чтобы его можно было передать в другой процесс.
+    """
+    if workers <= 1:
+        for key, record in records:
+            yield (key, *handler(record))
+        return
+
+    max_pending = workers * 2
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=init_worker
+    ) as executor:
+        pending = deque()
+        for chunk in chunked(records, chunk_size):
+            pending.append(executor.submit(run_chunk, handler, chunk))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
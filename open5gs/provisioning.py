@@ -0,0 +1,158 @@
+import secrets
+from typing import Iterator
+
+from bson import ObjectId
+from django.core.exceptions import ValidationError
+
+from .constants import MAX_SUBSCRIBER_HEX_LEN, MAX_SUBSCRIBER_IMSI_LEN
+from .normalizers import normalize_subscriber
+from .repository import SubscriberRepository, subscriber_repository
+
+DEFAULT_PROVISION_CHUNK_SIZE = 1000
+MAX_PROVISION_COUNT = 100000
+
+# Заглушка ключа для проверки шаблона, настоящие ключи подставляются
+# в каждую копию:
+PLACEHOLDER_KEY = '0' * MAX_SUBSCRIBER_HEX_LEN
+
+# (добавлено, IMSI которые уже были в базе, [(IMSI, ошибка)]):
+ProvisionResult = tuple[int, list[str], list[tuple[str, str]]]
+
+
+def validate_imsi_range(start: str, count: int) -> None:
+    """Диапазон не должен выходить за ширину (число цифр) start"""
+    if not start.isdigit() or len(start) > MAX_SUBSCRIBER_IMSI_LEN:
+        raise ValidationError(
+            'Начальный IMSI должен состоять только из цифр, не более '
+            f'{MAX_SUBSCRIBER_IMSI_LEN} символов'
+        )
+    if count <= 0:
+        raise ValidationError('Количество абонентов должно быть > 0')
+    if len(str(int(start) + count - 1)) > len(start):
+        raise ValidationError(
+            f'Диапазон {start} + {count} выходит за {len(start)} цифр IMSI')
+
+
+def imsi_range(start: str, count: int) -> list[str]:
+    """Последовательные IMSI от start с ведущими нулями до его ширины"""
+    validate_imsi_range(start, count)
+    first, width = int(start), len(start)
+    return [str(number).zfill(width) for number in range(first, first + count)]
+
+
+def generate_hex_keys(
+    count: int, length: int = MAX_SUBSCRIBER_HEX_LEN
+) -> list[str]:
+    """
+    count случайных HEX-ключей из одного вызова secrets.token_bytes:
+    буфер переводится в hex один раз и режется на ключи, вместо
+    generate_hex_key на каждого абонента.
+    """
+    hex_keys = secrets.token_bytes(count * length // 2).hex().upper()
+    return [hex_keys[i:i + length] for i in range(0, count * length, length)]
+
+
+def clone_template(document: dict) -> dict:
+    """
+    Копия нормализованного шаблона для одного абонента. Копируются только
+    security (в него подставляются ключи) и объекты со своими _id:
+    слайсы, сессии и PCC-правила получают новые ObjectId. Остальные
+    вложенные объекты (qos, ambr, ue, smf, flow) общие для всех копий:
+    при вставке они только сериализуются, поэтому полный deepcopy на
+    каждого абонента не нужен.
+    """
+    subscriber = dict(document)
+    subscriber['security'] = dict(document['security'])
+    subscriber['slice'] = [
+        {
+            **slice_item,
+            '_id': ObjectId(),
+            'session': [
+                {
+                    **session,
+                    '_id': ObjectId(),
+                    'pcc_rule': [
+                        {**pcc_rule, '_id': ObjectId()}
+                        for pcc_rule in session['pcc_rule']
+                    ],
+                }
+                for session in slice_item['session']
+            ],
+        }
+        for slice_item in document['slice']
+    ]
+    return subscriber
+
+
+def prepare_template(
+    template: dict, start: str, random_k: bool = True,
+    random_opc: bool = False,
+) -> dict:
+    """
+    Проверяет и нормализует шаблон так же, как импорт. MSISDN у
+    абонентов свои, поэтому из шаблона не копируются; при random_opc
+    OP шаблона не используется.
+    """
+    record = {**template, 'imsi': start, 'msisdn': []}
+    security = record.get('security')
+    if isinstance(security, dict):
+        security = dict(security)
+        if random_k:
+            security['k'] = PLACEHOLDER_KEY
+        if random_opc:
+            security['op'] = None
+            security['opc'] = PLACEHOLDER_KEY
+        record['security'] = security
+    document = normalize_subscriber(record)
+    document.pop('_id', None)
+    return document
+
+
+def provision_subscribers(
+    template: dict,
+    start: str,
+    count: int,
+    random_k: bool = True,
+    random_opc: bool = False,
+    chunk_size: int = DEFAULT_PROVISION_CHUNK_SIZE,
+    dry_run: bool = False,
+    repository: SubscriberRepository = subscriber_repository,
+) -> Iterator[ProvisionResult]:
+    """
+    Создает count абонентов с IMSI от start по шаблону. Ключи K (и OPc)
+    генерируются одним вызовом для всего диапазона. По каждой пачке из
+    chunk_size IMSI занятые находятся одним запросом $in и пропускаются,
+    остальные вставляются неупорядоченным insert_many. Результат
+    отдается по пачкам для отображения прогресса.
+    """
+    if count > MAX_PROVISION_COUNT:
+        raise ValidationError(
+            f'За раз можно создать не более {MAX_PROVISION_COUNT} абонентов')
+    imsis = imsi_range(start, count)
+    document = prepare_template(template, start, random_k, random_opc)
+    keys = generate_hex_keys(count * (random_k + random_opc))
+    k_values = keys[:count] if random_k else None
+    opc_values = keys[-count:] if random_opc else None
+
+    for offset in range(0, count, chunk_size):
+        chunk = imsis[offset:offset + chunk_size]
+        existing = repository.existing_imsis(chunk)
+        batch = []
+        for index, imsi in enumerate(chunk, offset):
+            if imsi in existing:
+                continue
+            subscriber = clone_template(document)
+            subscriber['imsi'] = imsi
+            if k_values is not None:
+                subscriber['security']['k'] = k_values[index]
+            if opc_values is not None:
+                subscriber['security']['opc'] = opc_values[index]
+            batch.append(subscriber)
+
+        if dry_run:
+            yield len(batch), sorted(existing), []
+            continue
+        inserted, errors = repository.insert_many(batch)
+        yield inserted, sorted(existing), [
+            (batch[index]['imsi'], message) for index, message in errors
+        ]
@@ -0,0 +1,237 @@
+from typing import Any, Iterable, Iterator, Optional
+
+from django.conf import settings
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError
+
+from .cache import cached, detail_key, invalidate_subscribers, remember_imsi
+from .models import Subscriber
+from .mongo import MONGO_DATABASE_ALIAS, get_subscribers_collection
+from .updates import SQN_PATH
+
+DUPLICATE_KEY_ERROR_CODE = 11000
+
+# Поля документа, которыми управляет модель Subscriber:
+SUBSCRIBER_FIELDS = tuple(
+    field.attname for field in Subscriber._meta.concrete_fields
+)
+
+
+class SubscriberConflictError(Exception):
+    """Документ изменен или удален с момента загрузки"""
+
+
+def protect_sqn(
+    set_fields: dict, unset_fields: list[str]
+) -> tuple[dict, list[str]]:
+    """
+    Убирает security.sqn из обновления. Если security пишется целиком,
+    оно раскладывается на отдельные поля, чтобы не затереть SQN,
+    который HSS/UDR увеличивает при каждой аутентификации.
+    """
+    set_fields = dict(set_fields)
+    security = set_fields.pop('security', None)
+    if isinstance(security, dict):
+        for key, value in security.items():
+            set_fields[f'security.{key}'] = value
+    elif security is not None:
+        set_fields['security'] = security
+    set_fields.pop(SQN_PATH, None)
+
+    unset_fields = [
+        path for path in unset_fields if path not in ('security', SQN_PATH)
+    ]
+    return set_fields, unset_fields
+
+
+class SubscriberRepository:
+    """
+    Доступ к коллекции subscribers напрямую через pymongo, без трансляции
+    Django SQL -> sqlparse -> Mongo, которую делает djongo.
+    """
+
+    def __init__(self, collection: Optional[Collection] = None) -> None:
+        self._collection = collection
+
+    @property
+    def collection(self) -> Collection:
+        # Коллекция не кэшируется: клиент свой в каждом воркере после fork.
+        if self._collection is not None:
+            return self._collection
+        return get_subscribers_collection()
+
+    def find(
+        self,
+        filter: Optional[dict] = None,
+        projection: Optional[Iterable[str]] = None,
+        sort: Optional[list[tuple[str, int]]] = None,
+        limit: int = 0,
+    ) -> list[dict]:
+        cursor = self.collection.find(
+            filter or {}, projection=projection, sort=sort, limit=limit)
+        return list(cursor)
+
+    def iter_documents(
+        self,
+        filter: Optional[dict] = None,
+        projection: Optional[Iterable[str]] = None,
+        sort: Optional[list[tuple[str, int]]] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[dict]:
+        """
+        Итерирует серверный курсор пачками по batch_size, не собирая
+        результат в памяти. Курсор закрывается и при досрочном выходе.
+        """
+        cursor = self.collection.find(
+            filter or {}, projection=projection, sort=sort,
+            batch_size=batch_size,
+        )
+        try:
+            yield from cursor
+        finally:
+            cursor.close()
+
+    def get_by_imsi(
+        self, imsi: str, projection: Optional[Iterable[str]] = None
+    ) -> Optional[dict]:
+        return self.collection.find_one({'imsi': imsi}, projection=projection)
+
+    def existing_imsis(self, imsis: list[str]) -> set[str]:
+        """IMSI из списка, которые уже есть в коллекции (один запрос $in)"""
+        cursor = self.collection.find(
+            {'imsi': {'$in': imsis}}, projection={'_id': False, 'imsi': True})
+        return {document['imsi'] for document in cursor}
+
+    def get_cached_by_imsi(self, imsi: str) -> Optional[dict]:
+        """
+        Документ абонента через кэш карточек. Кэш сбрасывается записями
+        через репозиторий и командой watch_subscribers по change stream.
+        """
+        def load() -> Optional[dict]:
+            document = self.get_by_imsi(imsi)
+            if document is not None:
+                remember_imsi(document['_id'], imsi)
+            return document
+
+        timeout = settings.SUBSCRIBER_DETAIL_CACHE_TTL
+        if timeout == 0:
+            return self.get_by_imsi(imsi)
+        return cached(detail_key(imsi), load, timeout)
+
+    def create(self, document: dict) -> Any:
+        inserted_id = self.collection.insert_one(document).inserted_id
+        invalidate_subscribers()
+        return inserted_id
+
+    def insert_many(
+        self, documents: list[dict]
+    ) -> tuple[int, list[tuple[int, str]]]:
+        """
+        Неупорядоченная пакетная вставка. Возвращает количество вставленных
+        документов и ошибки в виде (индекс в пакете, сообщение).
+        """
+        if not documents:
+            return 0, []
+        try:
+            result = self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            invalidate_subscribers()
+            details = e.details
+            errors = [
+                (
+                    error['index'],
+                    'Абонент с таким IMSI уже существует'
+                    if error.get('code') == DUPLICATE_KEY_ERROR_CODE
+                    else error.get('errmsg', '')
+                )
+                for error in details.get('writeErrors', [])
+            ]
+            return details.get('nInserted', 0), errors
+        invalidate_subscribers()
+        return len(result.inserted_ids), []
+
+    def replace(self, imsi: str, document: dict) -> bool:
+        result = self.collection.replace_one({'imsi': imsi}, document)
+        invalidate_subscribers(imsi, document.get('imsi'))
+        return result.matched_count > 0
+
+    def update(
+        self,
+        imsi: str,
+        set_fields: Optional[dict] = None,
+        unset_fields: Optional[Iterable[str]] = None,
+        expected: Optional[dict] = None,
+        allow_sqn: bool = False,
+    ) -> Optional[dict]:
+        """
+        Атомарное частичное обновление ($set/$unset) одним
+        find_one_and_update. security.sqn не трогается без allow_sqn.
+        expected - условия на текущие значения полей (оптимистичная
+        блокировка); если документ не подошел, возвращается None.
+        """
+        set_fields = set_fields or {}
+        unset_fields = list(unset_fields or [])
+        if not allow_sqn:
+            set_fields, unset_fields = protect_sqn(set_fields, unset_fields)
+
+        update = {}
+        if set_fields:
+            update['$set'] = set_fields
+        if unset_fields:
+            update['$unset'] = {field: '' for field in unset_fields}
+        if not update:
+            return self.get_by_imsi(imsi)
+
+        document = self.collection.find_one_and_update(
+            {**(expected or {}), 'imsi': imsi},
+            update,
+            return_document=ReturnDocument.AFTER,
+        )
+        if document is not None:
+            invalidate_subscribers(imsi, document.get('imsi'))
+        return document
+
+    def bulk_update(self, updates: list[tuple[str, dict, dict]]) -> int:
+        """
+        Пакет обновлений (IMSI, условия, $set) одним неупорядоченным
+        bulk_write. Условия - как expected в update; возвращает
+        количество совпавших документов, остальные изменены кем-то еще.
+        """
+        if not updates:
+            return 0
+        result = self.collection.bulk_write(
+            [
+                UpdateOne({**expected, 'imsi': imsi}, {'$set': set_fields})
+                for imsi, expected, set_fields in updates
+            ],
+            ordered=False,
+        )
+        invalidate_subscribers(*(imsi for imsi, _, _ in updates))
+        return result.matched_count
+
+    def delete(self, imsi: str) -> bool:
+        deleted = self.collection.delete_one({'imsi': imsi}).deleted_count
+        if deleted:
+            invalidate_subscribers(imsi)
+        return deleted > 0
+
+    @staticmethod
+    def to_model(document: dict) -> Subscriber:
+        """Собирает несохраняемый через djongo экземпляр модели для форм"""
+        instance = Subscriber(
+            **{f: document[f] for f in SUBSCRIBER_FIELDS if f in document}
+        )
+        instance._state.adding = False
+        instance._state.db = MONGO_DATABASE_ALIAS
+        return instance
+
+    @staticmethod
+    def to_document(instance: Subscriber) -> dict:
+        document = {f: getattr(instance, f) for f in SUBSCRIBER_FIELDS}
+        if document.get('_id') is None:
+            document.pop('_id', None)
+        return document
+
+
+subscriber_repository = SubscriberRepository()
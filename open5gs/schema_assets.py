@@ -0,0 +1,28 @@
+import hashlib
+import json
+
+from django_jsonform.utils import normalize_schema
+
+from .schemas import AMBR_SCHEMA, MSISDN_SCHEMA, SECURITY_SCHEMA, SLICE_SCHEMA
+
+# Схемы виджетов редактора абонента. Сериализуются один раз при импорте и
+# отдаются одним файлом, адрес которого содержит отпечаток содержимого:
+# браузер кэширует его навсегда, а новая версия схем получает новый адрес.
+FORM_SCHEMAS = {
+    'msisdn': MSISDN_SCHEMA,
+    'security': SECURITY_SCHEMA,
+    'ambr': AMBR_SCHEMA,
+    'slice': SLICE_SCHEMA,
+}
+
+FORM_SCHEMAS_JSON = json.dumps(
+    {name: normalize_schema(schema) for name, schema in FORM_SCHEMAS.items()},
+    ensure_ascii=False,
+    separators=(',', ':'),
+    sort_keys=True,
+).encode()
+
+FORM_SCHEMAS_FINGERPRINT = hashlib.sha256(FORM_SCHEMAS_JSON).hexdigest()[:16]
+
+# Год - максимальный срок, который имеет смысл указывать в max-age:
+FORM_SCHEMAS_MAX_AGE = 365 * 24 * 60 * 60
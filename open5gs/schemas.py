@@ -8,15 +8,17 @@ from .constants import (
     MAX_SLICE_COUNT,
     MAX_SST_VALUE,
     MAX_SUBSCRIBER_HEX_LEN,
+    MAX_SUBSCRIBER_IMSI_LEN,
     MAX_SUBSCRIBER_MSISDN_LEN,
     MIN_PRIORITY_LEVEL_VALUE,
     MIN_SST_VALUE,
+    OPERATOR_DETERMINED_BARRING_CHOICES,
     QOS_INDEX_CHOICES,
     SD_LEN,
     SESSION_TYPE_CHOICES,
+    SUBSCRIBER_STATUS_CHOICES,
     UNIT_CHOICES
 )
-from .utils import generate_hex_key
 
 ID_FIELD = {
     'type': 'string',
@@ -46,14 +48,16 @@ SECURITY_SCHEMA = {
             'type': 'string',
             'pattern': '^[0-9a-fA-F]+$',
             'title': 'Subscriber Key (K)',
-            'default': generate_hex_key(MAX_SUBSCRIBER_HEX_LEN),
+            # Случайный K по умолчанию выдает open5gs:default_security_key
+            # при открытии формы, а не один на процесс при импорте:
+            'default': None,
             'maxLength': MAX_SUBSCRIBER_HEX_LEN,
             'placeholder': '128-битный ключ в hex',
         },
         'amf': {
             'type': 'string',
             'title': 'Authentication Management Field (AMF)',
-            'pattern': '^\\d+$',
+            'pattern': '^[0-9a-fA-F]+$',
             'default': '8000',
             'maxLength': MAX_SUBSCRIBER_HEX_LEN,
         },
@@ -166,6 +170,7 @@ SESSION_SCHEMA = {
                 },
                 'arp': {
                     'type': 'object',
+                    'title': 'ARP',
                     'properties': {
                         'priority_level': {
                             'type': 'integer',
@@ -192,7 +197,7 @@ SESSION_SCHEMA = {
             },
             'required': ['index', 'arp']
         },
-        'ambr': AMBR_SCHEMA,
+        'ambr': {**AMBR_SCHEMA, 'title': 'Session-AMBR'},
         'ue': {
             **IP_CONFIG_SCHEMA,
             'title': 'UE IP Configuration',
@@ -220,6 +225,7 @@ SESSION_SCHEMA = {
                             },
                             'arp': {
                                 'type': 'object',
+                                'title': 'ARP',
                                 'properties': {
                                     'priority_level': {
                                         'type': 'integer',
@@ -244,10 +250,10 @@ SESSION_SCHEMA = {
                                 },
                                 'required': ['priority_level', 'pre_emption_capability', 'pre_emption_vulnerability']
                             },
-                            'mbr': AMBR_SCHEMA,
-                            'gbr': AMBR_SCHEMA,
+                            'mbr': {**AMBR_SCHEMA, 'title': 'MBR'},
+                            'gbr': {**AMBR_SCHEMA, 'title': 'GBR'},
                         },
-                        'required': ['index', 'arp']
+                        'required': ['index', 'arp', 'mbr', 'gbr']
                     },
                     '_id': ID_FIELD,
                     'flow': {
@@ -285,7 +291,7 @@ SLICE_SCHEMA = {
             'sd': {
                 'type': 'string',
                 'title': 'SD',
-                'pattern': '^[0-9a-fA-F]*$',
+                'pattern': f'^([0-9a-fA-F]{{{SD_LEN}}})?$',
                 'maxLength': SD_LEN,
                 'default': None
             },
@@ -303,8 +309,38 @@ SLICE_SCHEMA = {
             },
             '_id': ID_FIELD,
         },
-        'required': ['sst', 'session'],
+        'required': ['sst', 'default_indicator', 'session'],
     },
     'minItems': 1,
     'maxItems': MAX_SLICE_COUNT
-}
\ No newline at end of file
+}
+
+# Документ абонента целиком (для проверки на сервере, не для виджетов):
+SUBSCRIBER_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'imsi': {
+            'type': 'string',
+            'title': 'IMSI',
+            'pattern': '^\\d+$',
+            'maxLength': MAX_SUBSCRIBER_IMSI_LEN,
+        },
+        'msisdn': {**MSISDN_SCHEMA, 'title': 'MSISDN'},
+        'security': {**SECURITY_SCHEMA, 'title': 'Security'},
+        'ambr': {**AMBR_SCHEMA, 'title': 'UE-AMBR'},
+        'subscriber_status': {
+            'type': 'integer',
+            'title': 'Subscriber Status',
+            'enum': [choice[0] for choice in SUBSCRIBER_STATUS_CHOICES],
+        },
+        'operator_determined_barring': {
+            'type': 'integer',
+            'title': 'Operator Determined Barring',
+            'enum': [
+                choice[0] for choice in OPERATOR_DETERMINED_BARRING_CHOICES
+            ],
+        },
+        'slice': {**SLICE_SCHEMA, 'title': 'Slice'},
+    },
+    'required': ['imsi', 'security', 'ambr', 'slice'],
+}
@@ -0,0 +1,40 @@
+import re
+from typing import Optional
+
+# Запрос вида "*123" - явный (медленный) поиск по вхождению подстроки:
+SUBSTRING_SEARCH_PREFIX = '*'
+
+
+def imsi_prefix_bounds(prefix: str) -> tuple[str, str]:
+    """
+    Границы диапазона [prefix, prefix+1) для поиска по префиксу IMSI.
+    Такой диапазон обслуживается уникальным индексом по imsi.
+    """
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return prefix, upper
+
+
+def parse_search_query(query: str) -> tuple[Optional[str], bool]:
+    """Возвращает (строка поиска, поиск по подстроке)"""
+    query = query.strip()
+    if query.startswith(SUBSTRING_SEARCH_PREFIX):
+        query = query[len(SUBSTRING_SEARCH_PREFIX):].strip()
+        return query or None, True
+    return query or None, False
+
+
+def build_imsi_filter(query: str) -> dict:
+    """Mongo-фильтр коллекции subscribers для строки поиска"""
+    search, substring = parse_search_query(query)
+    if search is None:
+        return {}
+
+    if substring:
+        return {'imsi': {'$regex': re.escape(search)}}
+
+    if not search.isdigit():
+        # IMSI состоит только из цифр, префикс с буквами ничего не найдет:
+        return {'imsi': {'$in': []}}
+
+    lower, upper = imsi_prefix_bounds(search)
+    return {'imsi': {'$gte': lower, '$lt': upper}}
@@ -0,0 +1,252 @@
+"""
+Журнал медленных команд MongoDB: команды дольше MONGO_SLOW_COMMAND_MS
+пишутся в mongo_logger с формой команды (без значений), временем и
+представлением, из которого вызваны, и суммируются по форме в
+SlowMongoCommand. Для доли MONGO_EXPLAIN_SAMPLE_RATE из них сохраняется
+план запроса explain(). Запись в PostgreSQL и explain() выполняет
+фоновый поток, поэтому ответ на запрос они не задерживают. Очередь потока
+ограничена MONGO_SLOW_COMMAND_QUEUE_SIZE: при переполнении команда
+остается только в журнале.
+"""
+import hashlib
+import json
+import os
+import queue
+import random
+import threading
+from typing import Any, Mapping, Optional
+
+from bson import json_util
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from pymongo.monitoring import CommandListener
+
+from core import metrics
+from core.logger import mongo_logger
+from core.middleware import current_request, view_name
+from core.models import SlowMongoCommand
+
+from . import mongo
+
+# Служебные поля, которые не влияют на план и не нужны для explain():
+IGNORED_FIELDS = frozenset({
+    'lsid',
+    'txnNumber',
+    'autocommit',
+    'startTransaction',
+    'readConcern',
+    'writeConcern',
+    '$db',
+    '$clusterTime',
+    '$readPreference',
+})
+
+EXPLAINABLE_COMMANDS = frozenset({
+    'find',
+    'aggregate',
+    'count',
+    'distinct',
+    'findAndModify',
+    'update',
+    'delete',
+})
+
+# Команды рукопожатия и аутентификации не бывают интересны:
+SKIPPED_COMMANDS = frozenset({
+    'isMaster', 'ismaster', 'hello', 'saslStart', 'saslContinue',
+    'getnonce', 'authenticate', 'endSessions',
+})
+
+PLACEHOLDER = '?'
+
+
+def value_shape(value: Any) -> Any:
+    """Структура значения без самих значений; у списка - по 1 элементу"""
+    if isinstance(value, Mapping):
+        return {key: value_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [value_shape(value[0])] if value else []
+    return PLACEHOLDER
+
+
+def command_shape(command: Mapping) -> dict:
+    """
+    Нормализованная форма команды: имя команды и коллекция сохраняются,
+    все значения фильтров, сортировок и документов заменяются на '?'.
+    Команды одной формы дают один отпечаток.
+    """
+    items = iter(command.items())
+    name, target = next(items)
+    shape = {name: target if isinstance(target, str) else PLACEHOLDER}
+    for key, value in items:
+        if key not in IGNORED_FIELDS:
+            shape[key] = value_shape(value)
+    return shape
+
+
+def shape_fingerprint(shape_text: str) -> str:
+    return hashlib.sha1(shape_text.encode()).hexdigest()
+
+
+def run_explain(database: str, command: dict) -> dict:
+    """План запроса без выполнения (verbosity=queryPlanner)"""
+    result = mongo.get_client()[database].command(
+        {'explain': command, 'verbosity': 'queryPlanner'})
+    for field in ('$clusterTime', 'operationTime'):
+        result.pop(field, None)
+    return json.loads(json_util.dumps(result))
+
+
+def save_slow_command(
+    shape_text: str,
+    command_name: str,
+    collection: str,
+    duration_ms: float,
+    view: str,
+    database: str,
+    explain_command: Optional[dict],
+) -> None:
+    fingerprint = shape_fingerprint(shape_text)
+    now = timezone.now()
+    stats = SlowMongoCommand.objects.filter(fingerprint=fingerprint)
+    update = {
+        'count': F('count') + 1,
+        'total_ms': F('total_ms') + duration_ms,
+        'max_ms': Greatest(
+            'max_ms', Value(duration_ms, output_field=FloatField())),
+        'last_view': view,
+        'last_seen': now,
+    }
+    if not stats.update(**update):
+        try:
+            SlowMongoCommand.objects.create(
+                fingerprint=fingerprint,
+                command=command_name,
+                collection=collection,
+                shape=shape_text,
+                count=1,
+                total_ms=duration_ms,
+                max_ms=duration_ms,
+                last_view=view,
+                last_seen=now,
+            )
+        except IntegrityError:
+            # Ту же форму одновременно записал другой воркер:
+            stats.update(**update)
+
+    if explain_command is not None:
+        stats.update(
+            explain=run_explain(database, explain_command),
+            explained_at=now,
+        )
+
+
+SLOW_COMMANDS_DROPPED = metrics.Counter(
+    'mongo_slow_commands_dropped_total',
+    'Медленные команды MongoDB, не записанные в SlowMongoCommand из-за '
+    'переполнения очереди',
+    ('command',),
+)
+
+
+class SlowCommandListener(CommandListener):
+    """
+    Запоминает команду в started (в succeeded/failed ее уже нет) и по
+    завершении отправляет медленные в очередь фонового потока.
+    """
+
+    def __init__(self) -> None:
+        self._commands: dict[tuple, tuple[Mapping, str]] = {}
+        self._queue: queue.Queue = queue.Queue(
+            maxsize=settings.MONGO_SLOW_COMMAND_QUEUE_SIZE)
+        self._worker_pid: Optional[int] = None
+        self._worker_lock = threading.Lock()
+
+    def started(self, event):
+        if (
+            settings.MONGO_SLOW_COMMAND_MS > 0
+            and event.command_name not in SKIPPED_COMMANDS
+        ):
+            self._commands[(event.connection_id, event.request_id)] = (
+                event.command, event.database_name)
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+    def _finish(self, event) -> None:
+        started = self._commands.pop(
+            (event.connection_id, event.request_id), None)
+        if started is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms >= settings.MONGO_SLOW_COMMAND_MS:
+            command, database = started
+            self.record(
+                command, database, duration_ms,
+                view_name(current_request.get()),
+            )
+
+    def record(
+        self, command: Mapping, database: str, duration_ms: float, view: str
+    ) -> None:
+        shape = command_shape(command)
+        shape_text = json.dumps(shape, sort_keys=True, ensure_ascii=False)
+        mongo_logger.warning(
+            f'Медленная команда MongoDB: {duration_ms:.1f} мс, '
+            f'view={view or "-"}, {shape_text}'
+        )
+
+        command_name, collection = next(iter(shape.items()))
+        explain_command = None
+        if (
+            command_name in EXPLAINABLE_COMMANDS
+            and random.random() < settings.MONGO_EXPLAIN_SAMPLE_RATE
+        ):
+            explain_command = {
+                key: value for key, value in command.items()
+                if key not in IGNORED_FIELDS
+            }
+        try:
+            self._queue.put_nowait((
+                shape_text,
+                command_name,
+                collection if collection != PLACEHOLDER else '',
+                duration_ms,
+                view,
+                database,
+                explain_command,
+            ))
+        except queue.Full:
+            # Поток не успевает за PostgreSQL: запрос не ждет, команда
+            # остается только в журнале
+            SLOW_COMMANDS_DROPPED.inc(command_name)
+        self._ensure_worker()
+
+    def _ensure_worker(self) -> None:
+        if self._worker_pid == os.getpid():
+            return
+        with self._worker_lock:
+            if self._worker_pid != os.getpid():
+                self._worker_pid = os.getpid()
+                threading.Thread(
+                    target=self._run, name='slow-mongo-commands', daemon=True
+                ).start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            close_old_connections()
+            try:
+                save_slow_command(*item)
+            except Exception as e:
+                # Поток должен пережить ошибку БД или explain():
+                mongo_logger.exception(e)
+
+
+slow_command_listener = SlowCommandListener()
@@ -0,0 +1,917 @@
+import html
+import io
+import json
+import os
+import tempfile
+from collections import deque
+from unittest import mock, skipIf
+
+from asgiref.sync import async_to_sync
+from bson import ObjectId
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError
+from django.http import Http404
+from django.template.loader import render_to_string
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from pymongo.errors import DuplicateKeyError
+
+from users.models import Roles, User
+
+from . import slow_commands
+from .benchmark import make_subscriber_document
+from .benchmark_suite import compare_results
+from .cache import (
+    LIST_NAMESPACE,
+    detail_key,
+    get_version,
+    invalidate_subscribers,
+    remember_imsi
+)
+from .change_stream import changed_imsis, handle_change
+from .counts import count_subscribers
+from .document_validator import validate_subscriber_document
+from .forms import SubscriberForm
+from .key_rotation import (
+    MODE_ROTATE,
+    convert_op_to_opc,
+    key_records,
+    key_updates,
+    rotate_k
+)
+from .load_test import form_fields, next_cursor
+from .management.commands import watch_subscribers
+from .milenage import derive_opc
+from .mongo import MongoClientManager
+from .normalizers import normalize_subscriber
+from .pagination import (
+    CURSOR_NEXT,
+    CURSOR_PREV,
+    SORT_BY_ID,
+    SORT_BY_IMSI,
+    CursorPage,
+    CursorPaginator,
+    decode_cursor,
+    encode_cursor
+)
+from .pipeline import process_records
+from .provisioning import imsi_range, provision_subscribers
+from .repository import protect_sqn, subscriber_repository
+from .schema_assets import FORM_SCHEMAS_FINGERPRINT
+from .search import imsi_prefix_bounds, parse_search_query
+from .slow_commands import command_shape
+from .updates import diff_documents, document_etag, expected_values
+from .views import export_subscribers, form_schemas
+
+
+class CursorTokenTests(SimpleTestCase):
+
+    def test_roundtrip(self):
+        """Токен курсора декодируется в исходные направление и значение."""
+        for direction in (CURSOR_NEXT, CURSOR_PREV):
+            token = encode_cursor(direction, '250990000000001')
+            self.assertEqual(
+                decode_cursor(token), (direction, '250990000000001'))
+
+    def test_garbage_token(self):
+        """Испорченный токен трактуется как первая страница."""
+        for token in (None, '', '!!!', encode_cursor('x', '1')):
+            self.assertEqual(decode_cursor(token), (None, None))
+
+    def test_imsi_cursor_rejects_non_digits(self):
+        """Значение курсора по IMSI должно состоять из цифр."""
+        paginator = CursorPaginator(None, None, 10, sort=SORT_BY_IMSI)
+        self.assertIsNone(paginator._parse_value('25099abc'))
+        self.assertEqual(paginator._parse_value('25099'), '25099')
+
+
+class ImsiSearchTests(SimpleTestCase):
+
+    def test_prefix_bounds(self):
+        """Префикс превращается в полуоткрытый диапазон строк."""
+        self.assertEqual(imsi_prefix_bounds('25099'), ('25099', '2509:'))
+        self.assertTrue('25099' <= '250999999999999' < '2509:')
+        self.assertFalse('25100' < '2509:')
+
+    def test_substring_mode(self):
+        """Звездочка в начале запроса включает поиск по подстроке."""
+        self.assertEqual(parse_search_query(' *123 '), ('123', True))
+        self.assertEqual(parse_search_query('123'), ('123', False))
+        self.assertEqual(parse_search_query('*'), (None, True))
+
+
+def make_subscriber_record(imsi: str = '001010000000001') -> dict:
+    br = {
+        'downlink': {'value': 1, 'unit': 3},
+        'uplink': {'value': 1, 'unit': 3},
+    }
+    return {
+        'imsi': imsi,
+        'security': {'k': '465B5CE8 B199B49F', 'amf': '8000', 'opc': ''},
+        'ambr': br,
+        'slice': [{
+            'sst': 1,
+            'default_indicator': True,
+            'session': [{
+                'name': 'internet',
+                'type': 3,
+                'qos': {
+                    'index': 9,
+                    'arp': {
+                        'priority_level': 8,
+                        'pre_emption_capability': 1,
+                        'pre_emption_vulnerability': 1,
+                    },
+                },
+                'ambr': br,
+                'ue': {'ipv4': '', 'ipv6': ''},
+                'pcc_rule': [{'qos': {
+                    'index': 1,
+                    'arp': {
+                        'priority_level': 2,
+                        'pre_emption_capability': 1,
+                        'pre_emption_vulnerability': 1,
+                    },
+                    'mbr': br,
+                    'gbr': br,
+                }}],
+            }],
+        }],
+    }
+
+
+class NormalizeSubscriberTests(SimpleTestCase):
+
+    def test_applies_form_rules(self):
+        """Документ проходит те же преобразования, что и в SubscriberForm."""
+        document = normalize_subscriber(make_subscriber_record())
+        self.assertEqual(document['security']['k'], '465B5CE8B199B49F')
+        self.assertIsNone(document['security']['opc'])
+        self.assertIsNone(document['security']['sqn'])
+        self.assertEqual(document['msisdn'], [])
+        session = document['slice'][0]['session'][0]
+        self.assertNotIn('ue', session)
+        self.assertEqual(session['pcc_rule'][0]['flow'], [])
+        self.assertIn('_id', session['pcc_rule'][0])
+
+    def test_rejects_invalid_imsi(self):
+        """IMSI проверяется так же, как в модели (только цифры)."""
+        with self.assertRaises(ValidationError):
+            normalize_subscriber(make_subscriber_record('00101x'))
+
+
+class SubscriberFormCreateTests(SimpleTestCase):
+
+    def test_concurrent_insert_becomes_imsi_error(self):
+        """DuplicateKeyError при вставке - ошибка поля imsi, а не 500."""
+        record = make_subscriber_record()
+        data = {
+            'imsi': record['imsi'],
+            'subscriber_status': 0,
+            'operator_determined_barring': 0,
+            **{
+                field: json.dumps(record.get(field, []))
+                for field in ('msisdn', 'security', 'ambr', 'slice')
+            },
+        }
+        with mock.patch.object(
+            subscriber_repository, 'get_by_imsi', return_value=None
+        ), mock.patch.object(
+            subscriber_repository, 'create',
+            side_effect=DuplicateKeyError('E11000'),
+        ):
+            form = SubscriberForm(data)
+            self.assertTrue(form.is_valid(), form.errors)
+            with self.assertRaises(ValidationError):
+                form.save()
+        self.assertIn('imsi', form.errors)
+
+
+class DocumentValidatorTests(SimpleTestCase):
+
+    def test_accepts_valid_document(self):
+        validate_subscriber_document(
+            make_subscriber_document(slices=2, sessions=2, pcc_rules=2))
+
+    def test_errors_are_keyed_by_field_with_item_numbers(self):
+        """Ошибка привязана к полю и указывает номера элементов."""
+        document = make_subscriber_document(slices=2)
+        document['slice'][1]['session'][0]['qos']['arp'][
+            'priority_level'] = 99
+        document['security']['opc'] = 'XYZ'
+        with self.assertRaises(ValidationError) as context:
+            validate_subscriber_document(document)
+        errors = context.exception.message_dict
+        self.assertEqual(set(errors), {'slice', 'security'})
+        self.assertTrue(errors['slice'][0].startswith(
+            'Slice №2 → Session Configurations №1'))
+
+    def test_partial_skips_missing_required_fields(self):
+        validate_subscriber_document({'msisdn': ['79000000001']}, partial=True)
+        with self.assertRaises(ValidationError):
+            validate_subscriber_document({'msisdn': ['79000000001']})
+
+
+class DiffDocumentsTests(SimpleTestCase):
+
+    def test_only_changed_paths(self):
+        """В $set попадают только изменившиеся листья, в $unset - удаленные."""
+        slice_id = ObjectId()
+        old = {
+            'subscriber_status': 0,
+            'security': {'k': 'AA', 'sqn': 42},
+            'slice': [{'_id': slice_id, 'sst': 1, 'session': [{'ue': {}}]}],
+        }
+        new = {
+            'subscriber_status': 1,
+            'security': {'k': 'AA', 'sqn': 42},
+            'slice': [{'_id': str(slice_id), 'sst': 1, 'session': [{}]}],
+        }
+        self.assertEqual(
+            diff_documents(old, new),
+            ({'subscriber_status': 1}, ['slice.0.session.0.ue'])
+        )
+
+    def test_resized_list_written_whole(self):
+        """Список другой длины заменяется целиком."""
+        self.assertEqual(
+            diff_documents({'msisdn': ['1']}, {'msisdn': ['1', '2']}),
+            ({'msisdn': ['1', '2']}, [])
+        )
+
+
+class SqnProtectionTests(SimpleTestCase):
+
+    def test_sqn_never_written(self):
+        """security.sqn не попадает в обновление, security раскладывается."""
+        set_fields, unset_fields = protect_sqn(
+            {'security': {'k': 'AA', 'sqn': 1}, 'security.sqn': 2},
+            ['security.sqn'],
+        )
+        self.assertEqual(set_fields, {'security.k': 'AA'})
+        self.assertEqual(unset_fields, [])
+
+    def test_etag_ignores_sqn(self):
+        """ETag не меняется, когда HSS увеличивает SQN."""
+        old = {'imsi': '1', 'security': {'k': 'AA', 'sqn': 1}}
+        new = {'imsi': '1', 'security': {'k': 'AA', 'sqn': 2}}
+        self.assertEqual(document_etag(old), document_etag(new))
+
+    def test_expected_values(self):
+        """Условия фильтра берутся из загруженного документа."""
+        old = {'ambr': {'downlink': {'value': 1}}, 'slice': [{'sst': 1}]}
+        self.assertEqual(
+            expected_values(old, {'ambr.downlink.value': 2}, ['slice.0.sd']),
+            {'ambr.downlink.value': 1, 'slice.0.sd': {'$exists': False}}
+        )
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+})
+class ChangeStreamInvalidationTests(SimpleTestCase):
+    def test_invalidation_changes_only_touched_detail_keys(self):
+        key, other_key = detail_key('1'), detail_key('2')
+        invalidate_subscribers('1')
+        self.assertNotEqual(detail_key('1'), key)
+        self.assertEqual(detail_key('2'), other_key)
+
+    def test_delete_event_resolves_imsi_by_remembered_id(self):
+        object_id = ObjectId()
+        remember_imsi(object_id, '001010000000001')
+        change = {'operationType': 'delete', 'documentKey': {'_id': object_id}}
+        self.assertEqual(changed_imsis(change), {'001010000000001'})
+
+        key = detail_key('001010000000001')
+        self.assertTrue(handle_change(change))
+        self.assertNotEqual(detail_key('001010000000001'), key)
+
+    def test_invalidate_event_closes_stream(self):
+        self.assertFalse(handle_change({'operationType': 'invalidate'}))
+
+    def update_event(self, object_id: ObjectId, fields: dict) -> dict:
+        return {
+            'operationType': 'update',
+            'documentKey': {'_id': object_id},
+            'updateDescription': {
+                'updatedFields': fields, 'removedFields': []},
+        }
+
+    def test_sqn_update_keeps_all_caches(self):
+        """Обновление SQN при аутентификации ничего не сбрасывает."""
+        object_id = ObjectId()
+        remember_imsi(object_id, '001010000000001')
+        keys = detail_key('001010000000001'), get_version(LIST_NAMESPACE)
+        with mock.patch('open5gs.change_stream.fetch_imsi') as fetch_imsi:
+            handle_change(
+                self.update_event(object_id, {'security.sqn': 97}))
+        fetch_imsi.assert_not_called()
+        self.assertEqual(
+            (detail_key('001010000000001'), get_version(LIST_NAMESPACE)),
+            keys,
+        )
+
+    def test_field_update_resets_only_detail(self):
+        object_id = ObjectId()
+        remember_imsi(object_id, '001010000000001')
+        key, list_version = (
+            detail_key('001010000000001'), get_version(LIST_NAMESPACE))
+        handle_change(self.update_event(
+            object_id, {'security.sqn': 98, 'subscriber_status': 1}))
+        self.assertNotEqual(detail_key('001010000000001'), key)
+        self.assertEqual(get_version(LIST_NAMESPACE), list_version)
+
+    def test_unknown_id_is_fetched_for_field_update(self):
+        key = detail_key('001010000000002')
+        with mock.patch(
+            'open5gs.change_stream.fetch_imsi',
+            return_value='001010000000002',
+        ):
+            handle_change(
+                self.update_event(ObjectId(), {'subscriber_status': 1}))
+        self.assertNotEqual(detail_key('001010000000002'), key)
+
+    def test_imsi_update_resets_lists(self):
+        list_version = get_version(LIST_NAMESPACE)
+        change = self.update_event(ObjectId(), {'imsi': '001010000000003'})
+        self.assertEqual(changed_imsis(change), {'001010000000003'})
+        handle_change(change)
+        self.assertNotEqual(get_version(LIST_NAMESPACE), list_version)
+
+
+class FakeChangeStream:
+    """Поток одной порцией: resume_token сразу указывает за порцию"""
+
+    def __init__(self, changes: list) -> None:
+        self.changes = list(changes)
+        self.resume_token = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    @property
+    def alive(self) -> bool:
+        return bool(self.changes)
+
+    def try_next(self):
+        change = self.changes.pop(0)
+        self.resume_token = {'_data': f'batch-{len(self.changes)}'}
+        return change
+
+
+class FakeWatchCollection:
+    def __init__(self, changes: list) -> None:
+        self.changes = changes
+
+    def watch(self, resume_after=None, max_await_time_ms=None):
+        start = 0
+        for position, change in enumerate(self.changes):
+            if change and change['_id'] == resume_after:
+                start = position + 1
+        return FakeChangeStream(self.changes[start:])
+
+
+class WatchSubscribersTests(SimpleTestCase):
+
+    def setUp(self):
+        self.saved_tokens: list[dict] = []
+        self.handled: list[dict] = []
+        self.failing = None
+
+    def handle_change(self, change: dict) -> bool:
+        if change is self.failing:
+            self.failing = None
+            raise DatabaseError('cache table is locked')
+        self.handled.append(change['_id'])
+        return True
+
+    def watch(self, changes: list, **options) -> None:
+        options = {
+            'max_await_ms': 1000, 'save_every': 100,
+            'idle_save_interval': 60, **options,
+        }
+        module = 'open5gs.management.commands.watch_subscribers'
+        with mock.patch(
+            f'{module}.get_subscribers_collection',
+            return_value=FakeWatchCollection(changes),
+        ), mock.patch(
+            f'{module}.load_resume_token',
+            side_effect=lambda: (
+                self.saved_tokens[-1] if self.saved_tokens else None),
+        ), mock.patch(
+            f'{module}.save_resume_token',
+            side_effect=self.saved_tokens.append,
+        ), mock.patch(
+            f'{module}.handle_change', side_effect=self.handle_change,
+        ), mock.patch(f'{module}.invalidate_all'):
+            watch_subscribers.Command(stdout=io.StringIO()).watch(options)
+
+    def test_failed_event_is_replayed_after_restart(self):
+        changes = [
+            {'_id': {'_data': str(number)}, 'operationType': 'insert'}
+            for number in range(3)
+        ]
+        self.failing = changes[1]
+        with self.assertRaises(DatabaseError):
+            self.watch(changes, save_every=1)
+        self.assertEqual(self.saved_tokens, [changes[0]['_id']])
+
+        self.watch(changes, save_every=1)
+        self.assertEqual(
+            self.handled, [change['_id'] for change in changes])
+        self.assertEqual(self.saved_tokens[-1], changes[2]['_id'])
+
+    def test_idle_token_is_saved_once_per_interval(self):
+        """Сохранение в простое само сдвигает токен и не должно зациклиться."""
+        self.watch([None] * 5)
+        self.assertEqual(len(self.saved_tokens), 1)
+
+        with mock.patch(
+            'open5gs.management.commands.watch_subscribers.time.monotonic',
+            side_effect=range(0, 1000, 30),
+        ):
+            self.saved_tokens.clear()
+            self.watch([None] * 5)
+        # Каждый вызов часов - плюс 30 с: два сохранения в простое и
+        # одно при выходе
+        self.assertEqual(len(self.saved_tokens), 3)
+
+
+class FakeCountCollection:
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+
+    def estimated_document_count(self) -> int:
+        self.calls.append('estimated')
+        return 1000
+
+    def count_documents(self, filter: dict) -> int:
+        self.calls.append('exact')
+        return 10
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+})
+class CountSubscribersTests(SimpleTestCase):
+
+    def setUp(self):
+        self.collection = FakeCountCollection()
+        patcher = mock.patch(
+            'open5gs.counts.get_subscribers_collection',
+            return_value=self.collection,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_full_list_uses_estimate(self):
+        self.assertEqual(count_subscribers(), 1000)
+        self.assertEqual(count_subscribers(exact=True), 10)
+        self.assertEqual(self.collection.calls, ['estimated', 'exact'])
+
+    def test_filtered_count_is_cached_until_invalidation(self):
+        search_filter = {'imsi': {'$gte': '00101', '$lt': '00102'}}
+        self.assertEqual(count_subscribers(search_filter), 10)
+        self.assertEqual(count_subscribers(search_filter), 10)
+        self.assertEqual(self.collection.calls, ['exact'])
+
+        invalidate_subscribers()
+        count_subscribers(search_filter)
+        self.assertEqual(self.collection.calls, ['exact', 'exact'])
+
+
+class MongoClientManagerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.manager = MongoClientManager()
+        self.addCleanup(self.manager.close)
+
+    def test_client_is_recreated_in_forked_worker(self):
+        """После fork (другой pid) клиент родителя не используется."""
+        client = self.manager.get_client()
+        self.assertIs(self.manager.get_client(), client)
+
+        self.manager.pool_listener.connection_created(None)
+        with mock.patch('open5gs.mongo.os.getpid', return_value=-1):
+            self.assertFalse(self.manager.pool_stats()['connected'])
+            worker_client = self.manager.get_client()
+            self.assertIsNot(worker_client, client)
+            # Счетчики родителя не переходят в воркер:
+            self.assertEqual(self.manager.pool_stats()['created'], 0)
+        client.close()
+        worker_client.close()
+
+    def test_pool_stats_counts_open_and_in_use(self):
+        listener = self.manager.pool_listener
+        for event in ('created', 'created', 'closed', 'checked_out'):
+            getattr(listener, f'connection_{event}')(None)
+
+        stats = self.manager.pool_stats()
+        self.assertFalse(stats['connected'])
+        self.assertEqual(stats['pid'], os.getpid())
+        self.assertEqual((stats['open'], stats['in_use']), (1, 1))
+
+
+class ProcessRecordsTests(SimpleTestCase):
+
+    def test_results_keep_input_order_across_workers(self):
+        records = [
+            (line, make_subscriber_document(imsi=f'00101000000{line:04d}'))
+            for line in range(10)
+        ]
+        records[3] = (3, {'imsi': 'x'})
+        results = list(process_records(records, workers=2, chunk_size=3))
+
+        self.assertEqual([key for key, _, _ in results], list(range(10)))
+        self.assertIsNone(results[3][1])
+        self.assertIn('IMSI', results[3][2])
+        self.assertEqual(results[9][1]['imsi'], '001010000000009')
+
+
+class FormSchemasViewTests(SimpleTestCase):
+
+    def test_current_fingerprint_is_cached_forever(self):
+        request = RequestFactory().get('/')
+        response = form_schemas(request, FORM_SCHEMAS_FINGERPRINT)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_stale_fingerprint_redirects_to_current(self):
+        response = form_schemas(RequestFactory().get('/'), 'outdated')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(FORM_SCHEMAS_FINGERPRINT, response['Location'])
+
+
+class FakeExportRepository:
+    def __init__(self, documents: list[dict]) -> None:
+        self.documents = documents
+        self.calls: list[tuple] = []
+
+    def iter_documents(self, filter=None, projection=None, sort=None,
+                       batch_size=1000):
+        self.calls.append((filter, sort, batch_size))
+        return iter(self.documents)
+
+
+@override_settings(RATELIMIT_ENABLE=False)
+class ExportViewTests(SimpleTestCase):
+
+    def export(self, query: str) -> tuple:
+        repository = FakeExportRepository([
+            make_subscriber_document('001010000000001'),
+            make_subscriber_document('001010000000002'),
+        ])
+        request = RequestFactory().get(
+            '/export/', {'q': query, 'format': 'csv'})
+        request.user = User(role=Roles.USER)
+        with mock.patch('open5gs.export.subscriber_repository', repository):
+            response = export_subscribers(request)
+            content = b''.join(response.streaming_content).decode()
+        return response, content, repository.calls
+
+    def test_csv_is_streamed_in_imsi_order_with_search_filter(self):
+        response, content, calls = self.export('00101')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('subscribers.csv', response['Content-Disposition'])
+
+        lines = content.splitlines()
+        self.assertTrue(lines[0].startswith('imsi,msisdn,security.k'))
+        self.assertEqual(
+            [line.split(',')[0] for line in lines[1:]],
+            ['001010000000001', '001010000000002'],
+        )
+        search_filter, sort, _ = calls[0]
+        self.assertIn('imsi', search_filter)
+        self.assertEqual(sort, [('imsi', 1)])
+
+
+class FakeAsyncRepository:
+    def __init__(self, documents: list[dict]) -> None:
+        self.documents = {document['imsi']: document for document in documents}
+        self.deleted: list[str] = []
+
+    async def get_by_imsi(self, imsi: str, projection=None):
+        return self.documents.get(imsi)
+
+    async def get_cached_by_imsi(self, imsi: str):
+        return self.documents.get(imsi)
+
+    async def delete(self, imsi: str) -> bool:
+        self.deleted.append(imsi)
+        return self.documents.pop(imsi, None) is not None
+
+
+try:
+    from . import async_views
+except ImportError:
+    # motor 2.x не импортируется на Python 3.11+ (нет asyncio.coroutine)
+    async_views = None
+
+
+@skipIf(async_views is None, 'motor недоступен')
+@override_settings(RATELIMIT_ENABLE=False)
+class AsyncViewsTests(SimpleTestCase):
+
+    def setUp(self):
+        self.repository = FakeAsyncRepository(
+            [make_subscriber_document('999700000000001')])
+        patcher = mock.patch.object(
+            async_views, 'async_subscriber_repository', self.repository)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def request(self, method: str, user: User):
+        request = getattr(RequestFactory(), method)('/')
+        request.user = user
+        return request
+
+    def test_delete_through_async_repository(self):
+        request = self.request('post', User(role=Roles.USER))
+        response = async_to_sync(async_views.delete_subscriber)(
+            request, 999700000000001)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.repository.deleted, ['999700000000001'])
+
+    def test_missing_subscriber_is_404(self):
+        with self.assertRaises(Http404):
+            async_to_sync(async_views.get_subscriber_or_404)(
+                '999700000000002', cached=False)
+
+    def test_anonymous_is_redirected_to_login(self):
+        response = async_to_sync(async_views.delete_subscriber)(
+            self.request('post', AnonymousUser()), 999700000000001)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('login', response['Location'])
+        self.assertEqual(self.repository.deleted, [])
+
+
+class FakeProvisioningRepository:
+    def __init__(self, existing: set[str]) -> None:
+        self.existing = existing
+        self.inserted: list[dict] = []
+
+    def existing_imsis(self, imsis: list[str]) -> set[str]:
+        return self.existing.intersection(imsis)
+
+    def insert_many(self, documents: list[dict]) -> tuple[int, list]:
+        self.inserted += documents
+        return len(documents), []
+
+
+class ProvisioningTests(SimpleTestCase):
+    def test_imsi_range_keeps_width(self):
+        self.assertEqual(
+            imsi_range('00101000000009', 2),
+            ['00101000000009', '00101000000010'],
+        )
+        with self.assertRaises(ValidationError):
+            imsi_range('99', 2)
+
+    def test_skips_existing_and_generates_keys(self):
+        repository = FakeProvisioningRepository({'001010000000002'})
+        results = list(provision_subscribers(
+            make_subscriber_record(), '001010000000001', 5,
+            random_opc=True, chunk_size=2, repository=repository,
+        ))
+
+        self.assertEqual(sum(result[0] for result in results), 4)
+        self.assertEqual(results[0][1], ['001010000000002'])
+        documents = repository.inserted
+        self.assertEqual(
+            [document['imsi'] for document in documents],
+            [
+                '001010000000001', '001010000000003',
+                '001010000000004', '001010000000005',
+            ],
+        )
+        keys = {document['security']['k'] for document in documents}
+        self.assertEqual(len(keys), 4)
+        self.assertTrue(all(len(key) == 32 for key in keys))
+        self.assertIsNone(documents[0]['security']['op'])
+        self.assertNotEqual(
+            documents[0]['security']['opc'], documents[1]['security']['opc'])
+        self.assertNotEqual(
+            documents[0]['slice'][0]['_id'], documents[1]['slice'][0]['_id'])
+
+
+# 3GPP TS 35.208, тестовые наборы 1-6: (K, OP, OPc)
+OPC_TEST_VECTORS = (
+    (
+        '465b5ce8b199b49faa5f0a2ee238a6bc',
+        'cdc202d5123e20f62b6d676ac72cb318',
+        'cd63cb71954a9f4e48a5994e37a02baf',
+    ),
+    (
+        'fec86ba6eb707ed08905757b1bb44b8f',
+        'dbc59adcb6f9a0ef735477b7fadf8374',
+        '1006020f0a478bf6b699f15c062e42b3',
+    ),
+    (
+        '9e5944aea94b81165c82fbf9f32db751',
+        '223014c5806694c007ca1eeef57f004f',
+        'a64a507ae1a2a98bb88eb4210135dc87',
+    ),
+    (
+        '4ab1deb05ca6ceb051fc98e77d026a84',
+        '2d16c5cd1fdf6b22383584e3bef2a8d8',
+        'dcf07cbd51855290b92a07a9891e523e',
+    ),
+    (
+        '6c38a116ac280c454f59332ee35c8c4f',
+        '1ba00a1a7c6700ac8c3ff3e96ad08725',
+        '3803ef5363b947c6aaa225e58fae3934',
+    ),
+    (
+        '2d609d4db0ac5bf0d2c0de267014de0d',
+        '460a48385427aa39264aac8efc9e73e8',
+        'c35a0ab0bcbfc9252caff15f24efbde0',
+    ),
+)
+
+
+class KeyRotationTests(SimpleTestCase):
+    def test_opc_test_vectors(self):
+        for k, op, opc in OPC_TEST_VECTORS:
+            with self.subTest(k=k):
+                self.assertEqual(derive_opc(k, op), opc.upper())
+
+    def test_convert_op_to_opc(self):
+        k, op, opc = OPC_TEST_VECTORS[0]
+        keys, error = convert_op_to_opc(
+            {'k': k[:8] + ' ' + k[8:], 'op': op, 'opc': None, 'sqn': 5})
+        self.assertIsNone(error)
+        self.assertEqual(
+            keys, {'k': k, 'op': None, 'opc': opc.upper()})
+        self.assertEqual(convert_op_to_opc({'k': k, 'opc': opc}), (None, None))
+
+    def test_rotate_k_recomputes_opc(self):
+        k, op, opc = OPC_TEST_VECTORS[1]
+        new_k = OPC_TEST_VECTORS[0][0].upper()
+        keys, error = rotate_k(
+            {'k': k, 'op': None, 'opc': opc}, new_k, op=op)
+        self.assertIsNone(error)
+        self.assertEqual(keys['k'], new_k)
+        self.assertEqual(keys['opc'], derive_opc(new_k, op))
+
+        _, error = rotate_k(
+            {'k': k, 'op': None, 'opc': opc}, new_k,
+            op=OPC_TEST_VECTORS[0][1],
+        )
+        self.assertIsNotNone(error)
+
+    def test_key_updates_keep_documents_out_of_records(self):
+        """В обработчик уходят только ключи, документы - в порядке курсора."""
+        k, op, _ = OPC_TEST_VECTORS[0]
+        documents = [
+            {
+                '_id': number, 'imsi': f'00101000000000{number}',
+                'security': {'k': k, 'op': op, 'opc': None, 'sqn': 97},
+            }
+            for number in range(5)
+        ]
+        imsi, (keys, new_k) = next(
+            key_records(documents, MODE_ROTATE, 2, deque()))
+        self.assertEqual(imsi, documents[0]['imsi'])
+        self.assertEqual(set(keys), {'k', 'op', 'opc'})
+        self.assertEqual(len(new_k), 32)
+
+        results = list(key_updates(documents, MODE_ROTATE, chunk_size=2))
+
+        self.assertEqual(
+            [document['_id'] for document, _, _ in results], list(range(5)))
+        new_keys = {keys['k'] for _, keys, _ in results}
+        self.assertEqual(len(new_keys), 5)
+        self.assertNotIn(k.upper(), new_keys)
+
+
+class ImportSubscribersCommandTests(SimpleTestCase):
+
+    def test_missing_source_leaves_no_errors_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            errors_path = os.path.join(directory, 'errors.txt')
+            with self.assertRaises(CommandError):
+                call_command(
+                    'import_subscribers',
+                    os.path.join(directory, 'missing.jsonl'),
+                    errors_file=errors_path,
+                )
+            self.assertFalse(os.path.exists(errors_path))
+
+
+class IndexTemplateTests(SimpleTestCase):
+
+    def test_single_page_shows_count_and_sort_controls(self):
+        """Отфильтрованный список из одной страницы тоже можно уточнить."""
+        request = RequestFactory().get('/', {'q': '00101'})
+        request.user = User(username='operator', role=Roles.USER)
+        page = CursorPage(
+            [{'imsi': '001010000000001'}], False, False, None, None, count=1)
+        content = render_to_string(
+            'open5gs/index.html',
+            {
+                'page_obj': page,
+                'search_query': '00101',
+                'sort': SORT_BY_ID,
+                'exact_count': False,
+                'page_url_base': '?q=00101&',
+            },
+            request=request,
+        )
+        self.assertIn('count=exact', content)
+        self.assertIn('?q=00101&sort=imsi', content)
+        self.assertNotIn('Следующая', content)
+
+
+class LoadTestPageParsingTests(SimpleTestCase):
+    def test_form_fields_as_browser_submits_them(self):
+        page = (
+            '<form method="get"><input name="q" value="1"></form>'
+            '<form method="post">'
+            '<input type="hidden" name="etag" value="abc">'
+            '<input name="imsi" value="001010000000001">'
+            '<input type="checkbox" name="flag">'
+            '<select name="status"><option value="0">a</option>'
+            '<option value="1" selected>b</option></select>'
+            '<textarea name="slice" data-jsonform-config="'
+            + html.escape(json.dumps({'data': '[{"sst": 1}]'}))
+            + '"></textarea>'
+            '<button type="submit">Сохранить</button>'
+            '</form>'
+        )
+        self.assertEqual(form_fields(page, 'imsi'), {
+            'etag': 'abc',
+            'imsi': '001010000000001',
+            'status': '1',
+            'slice': '[{"sst": 1}]',
+        })
+        self.assertIsNone(form_fields(page, 'username'))
+
+    def test_next_cursor_is_last_link(self):
+        page = (
+            '<a href="?q=1&amp;cursor=prev">Предыдущая</a>'
+            '<a href="?q=1&amp;cursor=next-token">Следующая</a>'
+        )
+        self.assertEqual(next_cursor(page), 'next-token')
+        self.assertIsNone(next_cursor('<a href="?q=1">Первая</a>'))
+
+
+class BenchmarkBaselineTests(SimpleTestCase):
+    def test_regression_is_median_growth_over_threshold(self):
+        baseline = {'results': {
+            'a [1x1x1]': {'median': 1.0},
+            'b [1x1x1]': {'median': 1.0},
+        }}
+        current = {'results': {
+            'a [1x1x1]': {'median': 1.5},
+            'b [1x1x1]': {'median': 1.1},
+            'c [1x1x1]': {'median': 9.0},
+        }}
+        changes = compare_results(baseline, current, 0.2)
+        self.assertEqual(
+            {key: regression for key, (_, regression) in changes.items()},
+            {'a [1x1x1]': True, 'b [1x1x1]': False},
+        )
+        self.assertAlmostEqual(changes['a [1x1x1]'][0], 0.5)
+
+
+class SlowCommandShapeTests(SimpleTestCase):
+
+    def test_values_and_session_fields_are_dropped(self):
+        def find(imsis, limit):
+            return {
+                'find': 'subscribers',
+                'filter': {'imsi': {'$in': imsis}},
+                'limit': limit,
+                'lsid': {'id': ObjectId()},
+                '$db': 'open5gs',
+            }
+
+        shape = command_shape(find(['001010000000001'], 1))
+        self.assertEqual(shape, {
+            'find': 'subscribers',
+            'filter': {'imsi': {'$in': ['?']}},
+            'limit': '?',
+        })
+        self.assertEqual(
+            command_shape(find(['001010000000002'] * 3, 20)), shape)
+
+    @override_settings(
+        MONGO_SLOW_COMMAND_QUEUE_SIZE=1, MONGO_EXPLAIN_SAMPLE_RATE=0)
+    def test_full_queue_drops_and_counts(self):
+        """Переполненная очередь не блокирует запрос."""
+        counter = slow_commands.SLOW_COMMANDS_DROPPED
+        listener = slow_commands.SlowCommandListener()
+        listener._ensure_worker = lambda: None
+        dropped = counter.snapshot().get(('count',), 0)
+        with mock.patch.object(slow_commands, 'mongo_logger') as logger:
+            for _ in range(3):
+                listener.record(
+                    {'count': 'subscribers'}, 'open5gs', 150, 'index')
+        # В журнал попадают все три:
+        self.assertEqual(logger.warning.call_count, 3)
+        self.assertEqual(listener._queue.qsize(), 1)
+        self.assertEqual(counter.snapshot()[('count',)], dropped + 2)
@@ -0,0 +1,107 @@
+import hashlib
+import json
+from typing import Any
+
+from bson import ObjectId
+
+from .utils import MongoJSONEncoder
+
+SQN_PATH = 'security.sqn'
+MISSING = object()
+
+
+def values_equal(old: Any, new: Any) -> bool:
+    # Из формы ObjectId приходят строками, в базе лежат ObjectId:
+    if isinstance(old, ObjectId) or isinstance(new, ObjectId):
+        return str(old) == str(new)
+    if type(old) is not type(new) and bool in (type(old), type(new)):
+        return False
+    return old == new
+
+
+def diff_documents(
+    old: Any, new: Any, path: str = ''
+) -> tuple[dict, list[str]]:
+    """
+    Сравнивает старую и новую версии документа и возвращает минимальные
+    ($set, $unset) по путям через точку. Словари сравниваются по ключам,
+    списки одинаковой длины - поэлементно, иначе список пишется целиком.
+    """
+    set_fields: dict = {}
+    unset_fields: list[str] = []
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key, new_value in new.items():
+            key_path = f'{path}.{key}' if path else str(key)
+            if key not in old:
+                set_fields[key_path] = new_value
+                continue
+            child_set, child_unset = diff_documents(
+                old[key], new_value, key_path)
+            set_fields.update(child_set)
+            unset_fields.extend(child_unset)
+        for key in old:
+            if key not in new:
+                unset_fields.append(f'{path}.{key}' if path else str(key))
+        return set_fields, unset_fields
+
+    if (
+        isinstance(old, list)
+        and isinstance(new, list)
+        and len(old) == len(new)
+    ):
+        for index, (old_item, new_item) in enumerate(zip(old, new)):
+            child_set, child_unset = diff_documents(
+                old_item, new_item, f'{path}.{index}')
+            set_fields.update(child_set)
+            unset_fields.extend(child_unset)
+        return set_fields, unset_fields
+
+    if not values_equal(old, new):
+        set_fields[path] = new
+    return set_fields, unset_fields
+
+
+def get_path(document: Any, path: str) -> Any:
+    """Значение по пути через точку (индексы списков - числа) или MISSING"""
+    value = document
+    for key in path.split('.'):
+        if isinstance(value, dict) and key in value:
+            value = value[key]
+        elif (
+            isinstance(value, list)
+            and key.isdigit()
+            and int(key) < len(value)
+        ):
+            value = value[int(key)]
+        else:
+            return MISSING
+    return value
+
+
+def expected_values(
+    old: dict, set_fields: dict, unset_fields: list[str]
+) -> dict:
+    """
+    Условия фильтра для атомарного обновления: каждый изменяемый путь
+    должен иметь в базе то же значение, что и при загрузке формы.
+    """
+    expected = {}
+    for path in [*set_fields, *unset_fields]:
+        value = get_path(old, path)
+        expected[path] = {'$exists': False} if value is MISSING else value
+    return expected
+
+
+def document_etag(document: dict) -> str:
+    """
+    ETag управляемых формой полей абонента. security.sqn не учитывается:
+    его меняет HSS/UDR при каждой аутентификации.
+    """
+    payload = {k: v for k, v in document.items() if k != '_id'}
+    if isinstance(payload.get('security'), dict):
+        payload['security'] = {
+            k: v for k, v in payload['security'].items() if k != 'sqn'
+        }
+    raw = json.dumps(payload, cls=MongoJSONEncoder, sort_keys=True)
+    return hashlib.sha1(raw.encode()).hexdigest()
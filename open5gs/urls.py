@@ -1,14 +1,42 @@
+from django.conf import settings
 from django.urls import path
 
 from . import views
 
+if settings.ASYNC_SUBSCRIBER_VIEWS:
+    # motor импортируется только в этом режиме:
+    from . import async_views as subscriber_views
+else:
+    subscriber_views = views
+
 app_name = 'open5gs'
 
 urlpatterns = [
-    path('', views.index, name='index'),
-    path('subscriber/', views.subscriber, name='create'),
-    path('subscriber/<int:imsi>/edit/', views.subscriber, name='edit'),
+    path('', subscriber_views.index, name='index'),
+    path('subscriber/', subscriber_views.subscriber, name='create'),
+    path(
+        'subscriber/export/', views.export_subscribers, name='export'
+    ),
+    path(
+        'subscriber/provision/', views.provision, name='provision'
+    ),
+    path(
+        'subscriber/<int:imsi>/edit/', subscriber_views.subscriber,
+        name='edit',
+    ),
+    path(
+        'subscriber/<int:imsi>/delete/', subscriber_views.delete_subscriber,
+        name='delete',
+    ),
+    path(
+        'subscriber/schemas/<str:fingerprint>.json',
+        views.form_schemas,
+        name='form_schemas',
+    ),
     path(
-        'subscriber/<int:imsi>/delete/', views.delete_subscriber, name='delete'
+        'subscriber/security/default-key/',
+        views.default_security_key,
+        name='default_security_key',
     ),
+    path('mongo/pool/', views.mongo_pool_stats, name='mongo_pool_stats'),
 ]
@@ -60,6 +60,9 @@ def validate_hex_value(
             f'{name} должен быть не менее {min_value_len} символов')
 
 
+# Прежние ручные проверки документа. Формы и импорт используют
+# document_validator.validate_subscriber_document; функции ниже оставлены
+# для сравнения в команде benchmark_validation.
 def validate_ip_config(ip_config: dict, field_name: str):
     if not isinstance(ip_config, dict):
         raise ValidationError(f'{field_name} должен быть объектом (dict)')
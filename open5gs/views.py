@@ -1,53 +1,99 @@
+import json
 from typing import Optional, Union
 
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.db import DatabaseError
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
-from django.shortcuts import get_object_or_404, redirect, render
+from django.core.exceptions import ValidationError
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse
+)
+from django.http.response import Http404
+from django.shortcuts import redirect, render
+from django.utils.cache import add_never_cache_headers, patch_cache_control
+from django.views.decorators.http import require_POST
 from django_ratelimit.decorators import ratelimit
+from pymongo.errors import PyMongoError
 
 from core.logger import mongo_logger
+from core.ratelimit import role_rate
 from users.utils import role_required
 
-from .constants import MAX_SUBSCRIBER_PER_PAGE
-from .forms import SubscriberForm
+from .constants import MAX_SUBSCRIBER_HEX_LEN, MAX_SUBSCRIBER_PER_PAGE
+from .counts import count_subscribers
+from .export import EXPORT_FORMAT_NDJSON, EXPORT_FORMATS, stream_subscribers
+from .forms import ProvisioningForm, SubscriberForm
 from .models import Subscriber
+from .mongo import mongo_client_manager
+from .pagination import SORT_BY_ID, CursorPaginator
+from .pipeline import error_text
+from .provisioning import provision_subscribers
+from .repository import SubscriberConflictError, subscriber_repository
+from .schema_assets import (
+    FORM_SCHEMAS_FINGERPRINT,
+    FORM_SCHEMAS_JSON,
+    FORM_SCHEMAS_MAX_AGE
+)
+from .search import build_imsi_filter
+from .utils import generate_hex_key
+
+
+def get_subscriber_or_404(imsi: int, cached: bool = True) -> Subscriber:
+    """
+    cached=False - чтение мимо кэша карточек. Форма редактирования и ее
+    ETag строятся по текущему документу: устаревшая карточка (например,
+    без watch_subscribers) отклоняла бы каждое сохранение как конфликт.
+    """
+    try:
+        if cached:
+            document = subscriber_repository.get_cached_by_imsi(str(imsi))
+        else:
+            document = subscriber_repository.get_by_imsi(str(imsi))
+    except PyMongoError as e:
+        mongo_logger.exception(e)
+        raise
+    if document is None:
+        raise Http404('Абонент не найден')
+    return subscriber_repository.to_model(document)
 
 
 @login_required
 @role_required()
-@ratelimit(key='user_or_ip', rate='20/m', block=True)
+@ratelimit(key='user_or_ip', rate=role_rate('20/m'), block=True)
 def index(request: HttpRequest) -> HttpResponse:
     template_name = 'open5gs/index.html'
 
     query = request.GET.get('q', '').strip()
+    sort = request.GET.get('sort', SORT_BY_ID)
+    exact_count = request.GET.get('count') == 'exact'
     try:
-        if query:
-            subscribers = (
-                Subscriber.objects.values('pk', 'imsi')
-                .filter(imsi__icontains=query).order_by('-pk')
-            )
-        else:
-            subscribers = (
-                Subscriber.objects.values('pk', 'imsi').order_by('-pk')
-            )
-
-        paginator = Paginator(subscribers, MAX_SUBSCRIBER_PER_PAGE)
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
-    except DatabaseError as e:
+        search_filter = build_imsi_filter(query)
+        count = count_subscribers(search_filter, exact=exact_count)
+        paginator = CursorPaginator(
+            subscriber_repository,
+            search_filter,
+            MAX_SUBSCRIBER_PER_PAGE,
+            sort=sort,
+        )
+        page_obj = paginator.get_page(request.GET.get('cursor'), count=count)
+    except PyMongoError as e:
         mongo_logger.exception(e)
         raise
 
     query_params = request.GET.copy()
+    query_params.pop('cursor', None)
     query_params.pop('page', None)
     page_url_base = f'?{query_params.urlencode()}&' if query_params else '?'
 
     context = {
         'page_obj': page_obj,
         'search_query': query,
+        'sort': paginator.sort,
+        'exact_count': exact_count,
         'page_url_base': page_url_base,
     }
     return render(request, template_name, context)
@@ -55,21 +101,37 @@ def index(request: HttpRequest) -> HttpResponse:
 
 @login_required
 @role_required()
-@ratelimit(key='user_or_ip', rate='20/m', block=True)
+@ratelimit(key='user_or_ip', rate=role_rate('20/m'), block=True)
 def subscriber(
     request: HttpRequest, imsi: Optional[int] = None
 ) -> Union[HttpResponse, HttpResponseRedirect]:
     template_name = 'open5gs/subscriber_form.html'
-    instance = get_object_or_404(Subscriber, imsi=str(imsi)) if imsi else None
+    instance = get_subscriber_or_404(imsi, cached=False) if imsi else None
 
     if request.method == 'POST':
         form = SubscriberForm(request.POST, instance=instance)
         if form.is_valid():
-            form.save()
-            messages.success(
-                request,
-                f'Абонент ({form.cleaned_data["imsi"]}) сохранен'
-            )
+            try:
+                saved = form.save()
+            except SubscriberConflictError:
+                messages.error(
+                    request,
+                    'Абонент был изменен или удален другим пользователем. '
+                    'Обновите страницу'
+                )
+            except ValidationError:
+                messages.error(request, 'Проверьте данные')
+            except PyMongoError as e:
+                mongo_logger.exception(e)
+                raise
+            else:
+                messages.success(
+                    request,
+                    f'Абонент ({form.cleaned_data["imsi"]}) сохранен'
+                )
+                if instance is not None:
+                    # Новый ETag для следующего сохранения с этой страницы:
+                    form = SubscriberForm(instance=saved)
         else:
             messages.error(request, 'Проверьте данные')
     else:
@@ -81,13 +143,125 @@ def subscriber(
 
 @login_required
 @role_required()
-@ratelimit(key='user_or_ip', rate='20/m', block=True)
+@ratelimit(key='user_or_ip', rate=role_rate('20/m'), block=True)
 def delete_subscriber(
     request: HttpRequest, imsi: int
 ) -> Union[HttpResponse, HttpResponseRedirect]:
-    instance = get_object_or_404(Subscriber, imsi=str(imsi))
+    instance = get_subscriber_or_404(imsi)
     if request.method == 'POST':
-        instance.delete()
+        try:
+            subscriber_repository.delete(instance.imsi)
+        except PyMongoError as e:
+            mongo_logger.exception(e)
+            raise
         return redirect('open5gs:index')
     context = {'subscriber': instance}
     return render(request, 'open5gs/subscriber_delete.html', context)
+
+
+@login_required
+@role_required()
+@ratelimit(key='user_or_ip', rate=role_rate('5/m'), block=True)
+def export_subscribers(request: HttpRequest) -> StreamingHttpResponse:
+    export_format = request.GET.get('format', EXPORT_FORMAT_NDJSON)
+    if export_format not in EXPORT_FORMATS:
+        export_format = EXPORT_FORMAT_NDJSON
+
+    search_filter = build_imsi_filter(request.GET.get('q', ''))
+    response = StreamingHttpResponse(
+        stream_subscribers(search_filter, export_format),
+        content_type=EXPORT_FORMATS[export_format],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="subscribers.{export_format}"'
+    )
+    return response
+
+
+@staff_member_required
+def mongo_pool_stats(request: HttpRequest) -> JsonResponse:
+    """Статистика пула MongoClient процесса, обработавшего запрос"""
+    return JsonResponse(mongo_client_manager.pool_stats())
+
+
+def form_schemas(request: HttpRequest, fingerprint: str) -> HttpResponse:
+    """
+    JSON-схемы виджетов формы абонента. Содержимое неизменно для своего
+    отпечатка, поэтому кэшируется без срока; старый отпечаток
+    перенаправляется на актуальный.
+    """
+    if fingerprint != FORM_SCHEMAS_FINGERPRINT:
+        return redirect(
+            'open5gs:form_schemas', fingerprint=FORM_SCHEMAS_FINGERPRINT)
+    response = HttpResponse(
+        FORM_SCHEMAS_JSON, content_type='application/json; charset=utf-8')
+    patch_cache_control(
+        response, public=True, max_age=FORM_SCHEMAS_MAX_AGE, immutable=True)
+    return response
+
+
+@login_required
+@role_required()
+@ratelimit(key='user_or_ip', rate=role_rate('30/m'), block=True)
+def default_security_key(request: HttpRequest) -> JsonResponse:
+    """Случайный K для нового абонента (свой на каждый запрос)"""
+    response = JsonResponse({'k': generate_hex_key(MAX_SUBSCRIBER_HEX_LEN)})
+    add_never_cache_headers(response)
+    return response
+
+
+@require_POST
+@login_required
+@role_required()
+@ratelimit(key='user_or_ip', rate=role_rate('5/m'), block=True)
+def provision(request: HttpRequest) -> JsonResponse:
+    """
+    Массовое создание абонентов по шаблону. Тело - JSON с полями
+    ProvisioningForm и шаблоном: template_imsi (существующий абонент)
+    или template (документ абонента).
+    """
+    try:
+        payload = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Некорректный JSON'}, status=400)
+    if not isinstance(payload, dict):
+        return JsonResponse({'error': 'Ожидается JSON-объект'}, status=400)
+
+    form = ProvisioningForm({'random_k': True, **payload})
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+
+    inserted, existing, errors = 0, [], []
+    try:
+        template = payload.get('template')
+        if template is None:
+            template = subscriber_repository.get_by_imsi(
+                str(payload.get('template_imsi', '')))
+            if template is None:
+                return JsonResponse(
+                    {'error': 'Абонент-шаблон не найден'}, status=404)
+        for chunk_inserted, chunk_existing, chunk_errors in (
+            provision_subscribers(
+                template,
+                form.cleaned_data['start'],
+                form.cleaned_data['count'],
+                random_k=form.cleaned_data['random_k'],
+                random_opc=form.cleaned_data['random_opc'],
+            )
+        ):
+            inserted += chunk_inserted
+            existing += chunk_existing
+            errors += chunk_errors
+    except ValidationError as e:
+        return JsonResponse({'error': error_text(e)}, status=400)
+    except PyMongoError as e:
+        mongo_logger.exception(e)
+        raise
+
+    return JsonResponse({
+        'inserted': inserted,
+        'existing': existing,
+        'errors': [
+            {'imsi': imsi, 'error': message} for imsi, message in errors
+        ],
+    })
@@ -0,0 +1,51 @@
+from typing import Optional
+
+from django import forms
+from django.urls import reverse
+from django_jsonform.widgets import JSONFormWidget
+
+from .schema_assets import FORM_SCHEMAS, FORM_SCHEMAS_FINGERPRINT
+
+
+class CachedSchemaJSONFormWidget(JSONFormWidget):
+    """
+    JSONFormWidget, который не встраивает схему в каждую страницу:
+    schema_loader.js берет ее из общего файла схем с долгим кэшем.
+    """
+
+    template_name = 'open5gs/widgets/jsonform.html'
+
+    def __init__(
+        self, schema_name: str, default_key_url: Optional[str] = None, **kwargs
+    ) -> None:
+        if schema_name not in FORM_SCHEMAS:
+            raise ValueError(f'Неизвестная схема формы: {schema_name}')
+        super().__init__(schema={}, **kwargs)
+        self.schema_name = schema_name
+        # Имя URL, с которого берется свежий ключ по умолчанию (для K):
+        self.default_key_url = default_key_url
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget'].update({
+            'schema_name': self.schema_name,
+            'schema_url': reverse(
+                'open5gs:form_schemas',
+                kwargs={'fingerprint': FORM_SCHEMAS_FINGERPRINT},
+            ),
+            'default_key_url': (
+                reverse(self.default_key_url) if self.default_key_url
+                else ''
+            ),
+        })
+        return context
+
+    @property
+    def media(self):
+        media = super().media
+        js = [
+            path for path in media._js
+            if path != 'django_jsonform/index.js'
+        ]
+        js.append('js/open5gs/schema_loader.js')
+        return forms.Media(css=media._css, js=js)
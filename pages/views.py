@@ -2,9 +2,12 @@ from django.utils.decorators import method_decorator
 from django.views.generic import TemplateView
 from django_ratelimit.decorators import ratelimit
 
+from core.ratelimit import role_rate
+
 
 @method_decorator(
-    ratelimit(key='user_or_ip', rate='20/m', block=True), name='dispatch'
+    ratelimit(key='user_or_ip', rate=role_rate('20/m'), block=True),
+    name='dispatch',
 )
 class AboutTemplateView(TemplateView):
     template_name = 'pages/about.html'
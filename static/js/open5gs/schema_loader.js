@@ -0,0 +1,91 @@
+// Инициализация виджетов django-jsonform, схемы которых не встроены в
+// страницу, а лежат в общем файле (data-jsonform-schema-url). Файл
+// схем кэшируется браузером надолго: его адрес меняется вместе с
+// содержимым. Заменяет django_jsonform/index.js для таких виджетов.
+(function() {
+  var schemaRequests = {};
+  var initialized = [];
+
+  function loadSchemas(url) {
+    if (!schemaRequests[url]) {
+      schemaRequests[url] = fetch(url, { credentials: 'same-origin' })
+        .then(function(response) {
+          if (!response.ok) {
+            throw new Error('Не удалось загрузить схемы формы: ' + response.status);
+          }
+          return response.json();
+        });
+    }
+    return schemaRequests[url];
+  }
+
+  function loadDefaultKey(url) {
+    return fetch(url, { credentials: 'same-origin', cache: 'no-store' })
+      .then(function(response) {
+        return response.ok ? response.json() : {};
+      })
+      .then(function(payload) { return payload.k || null; })
+      .catch(function() { return null; });
+  }
+
+  function isEmptyData(data) {
+    return data === '' || data === null ||
+      (typeof data === 'object' && Object.keys(data).length === 0);
+  }
+
+  function initJSONForm(element, schemas) {
+    var config = JSON.parse(element.dataset.jsonformConfig);
+    config.data = JSON.parse(config.data);
+    // Копия схемы: она общая для всех виджетов страницы.
+    config.schema = JSON.parse(JSON.stringify(schemas[element.dataset.jsonformSchema]));
+
+    var container = element.previousElementSibling;
+    container.setAttribute('id', element.id + '_jsonform');
+    config.containerId = element.id + '_jsonform';
+    config.dataInputId = element.id;
+
+    var defaultKeyUrl = element.dataset.jsonformDefaultKeyUrl;
+    var ready = (defaultKeyUrl && isEmptyData(config.data))
+      ? loadDefaultKey(defaultKeyUrl).then(function(key) {
+          var properties = config.schema.properties || config.schema.keys;
+          if (key && properties && properties.k) {
+            properties.k.default = key;
+          }
+        })
+      : Promise.resolve();
+
+    return ready.then(function() {
+      reactJsonForm.createForm(config).render();
+    });
+  }
+
+  function initializeAll(root) {
+    if (root.querySelectorAll === undefined) {
+      return;
+    }
+    root.querySelectorAll('[data-jsonform-schema-url]').forEach(function(element) {
+      if (initialized.indexOf(element) !== -1 || element.id.indexOf('__prefix__') > -1) {
+        return;
+      }
+      initialized.push(element);
+      loadSchemas(element.dataset.jsonformSchemaUrl)
+        .then(function(schemas) { return initJSONForm(element, schemas); })
+        .catch(function(error) { console.error(error); });
+    });
+  }
+
+  function init() {
+    initializeAll(document);
+    new MutationObserver(function(mutations) {
+      mutations.forEach(function(mutation) {
+        mutation.addedNodes.forEach(initializeAll);
+      });
+    }).observe(document.documentElement, { childList: true, subtree: true });
+  }
+
+  if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', init);
+  } else {
+    init();
+  }
+})();
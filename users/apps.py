@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+
+        from .middleware import invalidate_user_snapshots
+        from .models import User
+
+        post_save.connect(invalidate_user_snapshots, sender=User)
+        post_delete.connect(invalidate_user_snapshots, sender=User)
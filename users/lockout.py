@@ -0,0 +1,86 @@
+"""
+Блокировка входа django-axes со счетчиками неудачных попыток в кэше
+(AXES_CACHE). В PostgreSQL (AccessAttempt) пишется только сам факт
+блокировки - одна запись на блокировку, для аудита.
+"""
+import math
+import time
+
+from axes import helpers
+from axes.handlers.cache import AxesCacheHandler
+from axes.models import AccessAttempt
+from django.http import HttpRequest
+
+# Ключ времени последней неудачи во время блокировки (unix time, целое -
+# таблица счетчиков хранит только целые)
+LOCKED_AT_KEY_SUFFIX = ':locked_at'
+
+
+class AuditedAxesCacheHandler(AxesCacheHandler):
+
+    def user_login_failed(
+        self,
+        sender,
+        credentials: dict,
+        request: HttpRequest = None,
+        **kwargs,
+    ):
+        super().user_login_failed(sender, credentials, request, **kwargs)
+        if request is None or not getattr(request, 'axes_locked_out', False):
+            return
+
+        # Каждая неудача продлевает блокировку на cache_timeout:
+        locked_at = int(time.time())
+        for cache_key in helpers.get_client_cache_key(request, credentials):
+            self.cache.set(
+                cache_key + LOCKED_AT_KEY_SUFFIX, locked_at,
+                self.cache_timeout,
+            )
+
+        # Попытки во время блокировки продлевают ее, но не пишутся:
+        failures = self.get_failures(request, credentials)
+        if failures != helpers.get_failure_limit(request, credentials):
+            return
+        AccessAttempt.objects.create(
+            username=helpers.get_client_username(request, credentials),
+            ip_address=request.axes_ip_address,
+            user_agent=request.axes_user_agent,
+            http_accept=request.axes_http_accept,
+            path_info=request.axes_path_info,
+            get_data=helpers.get_query_str(request.GET),
+            post_data=helpers.get_query_str(request.POST),
+            failures_since_start=failures,
+        )
+
+    def get_lockout_seconds_left(
+        self, request: HttpRequest, credentials: dict = None
+    ) -> int:
+        """Секунд до снятия блокировки по времени последней неудачи"""
+        locked_at = max(
+            self.cache.get(cache_key + LOCKED_AT_KEY_SUFFIX, default=0)
+            for cache_key in helpers.get_client_cache_key(
+                request, credentials)
+        )
+        if self.cache_timeout is None:
+            return 0
+        if not locked_at:
+            # Блокировка началась до того, как время стало сохраняться
+            return self.cache_timeout
+        return max(
+            math.ceil(locked_at + self.cache_timeout - time.time()), 0)
+
+    def post_save_access_attempt(self, instance: AccessAttempt, **kwargs):
+        pass
+
+    def post_delete_access_attempt(self, instance: AccessAttempt, **kwargs):
+        """Удаление записи о блокировке в админке снимает блокировку"""
+        self.reset_attempts(
+            ip_address=instance.ip_address, username=instance.username)
+
+    def reset_attempts(self, *, ip_address=None, username=None, **kwargs):
+        for cache_key in helpers.get_client_cache_key(
+            AccessAttempt(username=username, ip_address=ip_address)
+        ):
+            self.cache.delete(cache_key + LOCKED_AT_KEY_SUFFIX)
+        return super().reset_attempts(
+            ip_address=ip_address, username=username, **kwargs)
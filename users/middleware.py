@@ -0,0 +1,141 @@
+"""
+Пользователь запроса без обращения к PostgreSQL.
+
+Штатный AuthenticationMiddleware читает строку User на каждый запрос,
+хотя role_required нужны только роль и is_superuser. Здесь снимок
+нескольких полей пользователя хранится в сессии вместе с номером версии,
+а текущая версия - в общем кэше USER_VERSION_CACHE. Любое сохранение или
+удаление User (в том числе смена пароля) увеличивает версию, и
+пользователь перечитывается из БД штатным auth.get_user с проверкой
+хеша сессии.
+"""
+import random
+from typing import Optional
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpRequest
+from django.utils.functional import SimpleLazyObject
+
+from .models import User
+
+SNAPSHOT_SESSION_KEY = '_user_snapshot'
+# Только поля для проверки доступа и шапки страниц (аватар). Хеш пароля
+# и персональные данные в сессию (PostgreSQL и кэш) не попадают;
+# остальные поля при обращении догружаются из БД как отложенные.
+SNAPSHOT_FIELDS = (
+    'id',
+    'username',
+    'role',
+    'is_superuser',
+    'is_staff',
+    'is_active',
+    'avatar',
+)
+
+
+def version_key(user_id) -> str:
+    return f'users:version:{user_id}'
+
+
+def initial_version() -> int:
+    # Случайное начало: после вытеснения ключа из кэша версия не
+    # совпадет с номером из старых снимков
+    return random.getrandbits(62)
+
+
+def get_user_version(user_id) -> int:
+    cache = caches[settings.USER_VERSION_CACHE]
+    version = cache.get(version_key(user_id))
+    if version is None:
+        cache.add(version_key(user_id), initial_version(), None)
+        version = cache.get(version_key(user_id))
+    return version
+
+
+def bump_user_version(user_id) -> None:
+    cache = caches[settings.USER_VERSION_CACHE]
+    try:
+        cache.incr(version_key(user_id))
+    except ValueError:
+        cache.add(version_key(user_id), initial_version(), None)
+
+
+def invalidate_user_snapshots(sender, instance: User, **kwargs) -> None:
+    """
+    post_save/post_delete User. Версия растет после коммита, иначе
+    параллельный запрос мог бы сохранить снимок со старыми данными и
+    новой версией.
+    """
+    user_id = instance.pk
+    transaction.on_commit(lambda: bump_user_version(user_id))
+
+
+def dump_user(user: User) -> dict:
+    return {
+        name: User._meta.get_field(name).get_prep_value(getattr(user, name))
+        for name in SNAPSHOT_FIELDS
+    }
+
+
+def load_user(snapshot: dict) -> User:
+    """
+    Экземпляр как из БД с отложенными полями вне снимка: save() обновит
+    строку, а не вставит, и не затрет незагруженные поля.
+    """
+    field_names = [
+        field.attname for field in User._meta.concrete_fields
+        if field.attname in snapshot
+    ]
+    return User.from_db(
+        'default', field_names, [snapshot[name] for name in field_names])
+
+
+def get_snapshot_user(request: HttpRequest) -> Optional[User]:
+    """Пользователь из снимка в сессии, если версия актуальна"""
+    session = request.session
+    try:
+        user_id = User._meta.pk.to_python(session[auth.SESSION_KEY])
+        backend_path = session[auth.BACKEND_SESSION_KEY]
+        version, snapshot = session[SNAPSHOT_SESSION_KEY]
+    except (KeyError, ValueError, TypeError):
+        return None
+    if (
+        # Снимки прежнего формата (строка JSON) просто перечитываются
+        not isinstance(snapshot, dict)
+        or backend_path not in settings.AUTHENTICATION_BACKENDS
+        or version != get_user_version(user_id)
+    ):
+        return None
+
+    user = load_user(snapshot)
+    if user.pk != user_id:
+        return None
+    return user
+
+
+def get_user(request: HttpRequest):
+    if not hasattr(request, '_cached_user'):
+        user = get_snapshot_user(request)
+        if user is None:
+            # Версию берем до чтения из БД: если пользователя сохранят
+            # между ними, снимок просто устареет
+            user_id = request.session.get(auth.SESSION_KEY)
+            version = get_user_version(user_id) if user_id else None
+            user = auth.get_user(request)
+            if user.is_authenticated:
+                request.session[SNAPSHOT_SESSION_KEY] = (
+                    version, dump_user(user))
+        request._cached_user = user
+    return request._cached_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware с пользователем из снимка в сессии"""
+
+    def process_request(self, request: HttpRequest) -> None:
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_user(request))
@@ -0,0 +1,191 @@
+import time
+from unittest import mock
+
+from axes.handlers.proxy import AxesProxyHandler
+from axes.models import AccessAttempt
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings
+)
+from django.urls import reverse
+
+from . import middleware
+from .models import Roles, User
+
+LOCMEM_CACHES = {
+    alias: {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': f'users-tests-{alias}',
+    }
+    for alias in ('default', 'ratelimit', 'sessions')
+}
+PASSWORD = 'Rt7-secret-pass'
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    AXES_ENABLED=True,
+    AXES_FAILURE_LIMIT=3,
+    RATELIMIT_ENABLE=False,
+)
+class AuditedLockoutTests(TestCase):
+
+    def setUp(self):
+        for alias in LOCMEM_CACHES:
+            caches[alias].clear()
+        # Обработчик axes держит кэш, взятый при создании:
+        AxesProxyHandler.get_implementation(force=True)
+        self.user = User.objects.create_user(
+            username='operator', email='operator@example.com',
+            password=PASSWORD,
+        )
+
+    def login(self, password: str = 'wrong-password'):
+        return self.client.post(
+            reverse('login'),
+            {'username': self.user.email, 'password': password},
+        )
+
+    @staticmethod
+    def messages(response) -> list[str]:
+        return [
+            str(message) for message in get_messages(response.wsgi_request)]
+
+    def test_one_audit_row_per_lockout(self):
+        """В AccessAttempt пишется только достижение лимита."""
+        for _ in range(2):
+            self.login()
+        self.assertFalse(AccessAttempt.objects.exists())
+
+        for _ in range(3):
+            self.login()
+        attempt = AccessAttempt.objects.get()
+        self.assertEqual(attempt.username, self.user.email)
+        self.assertEqual(attempt.failures_since_start, 3)
+
+    def test_deleting_audit_row_resets_lockout(self):
+        """Удаление записи о блокировке сбрасывает счетчик в кэше."""
+        for _ in range(3):
+            self.login()
+        self.assertEqual(
+            self.login(PASSWORD).status_code, settings.AXES_HTTP_RESPONSE_CODE)
+
+        AccessAttempt.objects.get().delete()
+        response = self.login(PASSWORD)
+        self.assertRedirects(
+            response, reverse('open5gs:index'), fetch_redirect_response=False)
+
+    def test_messages_show_attempts_and_time_left(self):
+        """Время до снятия блокировки считается от последней неудачи."""
+        self.assertIn('Осталось попыток входа: 2', self.messages(self.login()))
+
+        locked_at = time.time()
+        with mock.patch('users.lockout.time.time', return_value=locked_at):
+            self.login()
+            self.login()
+        # Форма без пароля отклоняется без новой неудачи:
+        with mock.patch(
+            'users.lockout.time.time', return_value=locked_at + 20
+        ):
+            response = self.login('')
+        self.assertIn(
+            'Повторите попытку через 40 секунд. '
+            'Каждая новая попытка продлевает таймер!',
+            self.messages(response),
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES, USER_VERSION_CACHE='default')
+class UserSnapshotTests(SimpleTestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_snapshot_keeps_role_and_superuser(self):
+        user = User(
+            pk=7, username='operator', email='operator@example.com',
+            role=Roles.USER, is_superuser=True, password='hash',
+        )
+        loaded = middleware.load_user(middleware.dump_user(user))
+        self.assertEqual(
+            (loaded.pk, loaded.role, loaded.is_superuser),
+            (7, Roles.USER, True),
+        )
+        self.assertFalse(loaded._state.adding)
+
+    def test_snapshot_has_no_password(self):
+        """В сессию попадают только поля SNAPSHOT_FIELDS."""
+        user = User(
+            pk=7, username='operator', email='operator@example.com',
+            password='hash',
+        )
+        snapshot = middleware.dump_user(user)
+        self.assertEqual(tuple(snapshot), middleware.SNAPSHOT_FIELDS)
+        self.assertNotIn('hash', snapshot.values())
+        self.assertNotIn('operator@example.com', snapshot.values())
+        self.assertTrue(
+            {'password', 'email'}
+            <= middleware.load_user(snapshot).get_deferred_fields()
+        )
+
+    def test_bump_changes_version(self):
+        version = middleware.get_user_version(7)
+        self.assertEqual(middleware.get_user_version(7), version)
+        middleware.bump_user_version(7)
+        self.assertNotEqual(middleware.get_user_version(7), version)
+
+
+# Версия растет в on_commit, поэтому без обертки TestCase в транзакцию
+@override_settings(CACHES=LOCMEM_CACHES, USER_VERSION_CACHE='default')
+class CachedUserTests(TransactionTestCase):
+
+    def setUp(self):
+        for alias in LOCMEM_CACHES:
+            caches[alias].clear()
+        self.user = User.objects.create_user(
+            username='operator', email='operator@example.com',
+            password=PASSWORD, role=Roles.USER,
+        )
+        self.client.force_login(self.user)
+
+    def get_user(self):
+        request = RequestFactory().get('/')
+        request.session = self.client.session
+        user = middleware.get_user(request)
+        request.session.save()
+        return user
+
+    def test_snapshot_user_without_queries(self):
+        self.get_user()
+        session = self.client.session
+        self.assertNotIn(
+            self.user.password,
+            session[middleware.SNAPSHOT_SESSION_KEY][1].values(),
+        )
+        with self.assertNumQueries(0):
+            user = self.get_user()
+            self.assertEqual(
+                (user.pk, user.role, user.is_active),
+                (self.user.pk, Roles.USER, True),
+            )
+
+    def test_save_reloads_user(self):
+        self.get_user()
+        self.user.role = Roles.GUEST
+        self.user.save()
+        self.assertEqual(self.get_user().role, Roles.GUEST)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_user().role, Roles.GUEST)
+
+    def test_password_change_logs_out_other_sessions(self):
+        """Смена пароля сбрасывает снимок, и хеш сессии не совпадает."""
+        self.get_user()
+        self.user.set_password('Rt7-new-secret')
+        self.user.save()
+        self.assertFalse(self.get_user().is_authenticated)
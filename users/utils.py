@@ -1,12 +1,14 @@
 from datetime import timedelta
 from functools import wraps
-from typing import Callable
+from typing import Callable, Optional
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.tokens import default_token_generator
+from django.contrib.auth.views import redirect_to_login
 from django.core.mail import send_mail
-from django.http import HttpRequest
+from django.http import HttpRequest, HttpResponse
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.utils.encoding import force_bytes
@@ -17,6 +19,23 @@ from core.logger import email_logger
 from .models import PendingUser, Roles, User
 
 
+def role_denied_response(
+    request: HttpRequest, allowed_roles: list[str]
+) -> Optional[HttpResponse]:
+    """Ответ для пользователя без нужной роли или None, если доступ есть"""
+    user: User = request.user
+    if user.role not in allowed_roles and not user.is_superuser:
+        messages.success(
+            request,
+            (
+                'Вы успешно прошли регистрацию, теперь дождитесь пока '
+                'вашу учетную запись подтвердит администратор'
+            )
+        )
+        return redirect(reverse(settings.LOGIN_URL))
+    return None
+
+
 def role_required(allowed_roles: list[str] = [str(Roles.USER)]):
     """
     Декоратор который предоставляет доступ админу или у кого есть определенная
@@ -25,21 +44,36 @@ def role_required(allowed_roles: list[str] = [str(Roles.USER)]):
     def decorator(view_func: Callable):
         @wraps(view_func)
         def wrapped_view(request: HttpRequest, *args, **kwargs):
-            user: User = request.user
-            if user.role not in allowed_roles and not user.is_superuser:
-                messages.success(
-                    request,
-                    (
-                        'Вы успешно прошли регистрацию, теперь дождитесь пока '
-                        'вашу учетную запись подтвердит администратор'
-                    )
-                )
-                return redirect(reverse(settings.LOGIN_URL))
+            response = role_denied_response(request, allowed_roles)
+            if response is not None:
+                return response
             return view_func(request, *args, **kwargs)
         return wrapped_view
     return decorator
 
 
+def async_role_required(allowed_roles: list[str] = [str(Roles.USER)]):
+    """
+    login_required + role_required для async-представлений. Сессия и
+    пользователь загружаются из БД синхронно, поэтому проверка
+    выполняется в потоке через sync_to_async.
+    """
+    def check_access(request: HttpRequest) -> Optional[HttpResponse]:
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return role_denied_response(request, allowed_roles)
+
+    def decorator(view_func: Callable):
+        @wraps(view_func)
+        async def wrapped_view(request: HttpRequest, *args, **kwargs):
+            response = await sync_to_async(check_access)(request)
+            if response is not None:
+                return response
+            return await view_func(request, *args, **kwargs)
+        return wrapped_view
+    return decorator
+
+
 def timedelta_to_human_time(time_delta: timedelta) -> str:
     seconds = int(time_delta.total_seconds())
     if seconds <= 0:
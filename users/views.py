@@ -1,22 +1,19 @@
-from datetime import timedelta
-
-from axes.helpers import get_client_ip_address
-from axes.models import AccessAttempt
+from axes.handlers.proxy import AxesProxyHandler
+from axes.helpers import get_credentials
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.tokens import default_token_generator
 from django.contrib.auth.views import LoginView, PasswordResetView
-from django.db.models import Q
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import redirect, render
 from django.utils.decorators import method_decorator
 from django.utils.encoding import force_str
 from django.utils.http import urlsafe_base64_decode
-from django.utils.timezone import now
 from django_ratelimit.decorators import ratelimit
 
 from core.logger import email_logger
+from core.ratelimit import role_rate
 
 from .forms import ChangeEmailForm, UserForm, UserRegisterForm
 from .models import PendingUser, User
@@ -86,7 +83,8 @@ def activate(request: HttpRequest, uidb64: str, token: str) -> HttpResponse:
 
 @login_required
 @role_required()
-@ratelimit(key='user_or_ip', rate='10/m', block=True, method='POST')
+@ratelimit(
+    key='user_or_ip', rate=role_rate('10/m'), block=True, method='POST')
 def change_email(request: HttpRequest) -> HttpResponse:
     if request.method == 'POST':
         form = ChangeEmailForm(request.POST, instance=request.user)
@@ -114,7 +112,7 @@ def change_email(request: HttpRequest) -> HttpResponse:
 
 @login_required
 @role_required()
-@ratelimit(key='user_or_ip', rate='10/m', block=True)
+@ratelimit(key='user_or_ip', rate=role_rate('10/m'), block=True)
 def confirm_email_change(
     request: HttpRequest, uidb64: str, token: str
 ) -> HttpResponse:
@@ -153,7 +151,8 @@ def confirm_email_change(
 
 @login_required
 @role_required()
-@ratelimit(key='user_or_ip', rate='20/m', block=True, method='POST')
+@ratelimit(
+    key='user_or_ip', rate=role_rate('20/m'), block=True, method='POST')
 def profile(request: HttpRequest) -> HttpResponse:
     if request.method == 'POST':
         form = UserForm(request.POST, request.FILES, instance=request.user)
@@ -177,25 +176,11 @@ class CustomLoginView(LoginView):
     def form_invalid(self, form):
         response = super().form_invalid(form)
 
-        username = self.request.POST.get('username', '')
-        user = User.objects.filter(
-            Q(username=username) | Q(email=username)
-        ).first()
-        username_real = user.email if user else username
-
-        ip_address = get_client_ip_address(self.request)
-        failure_limit = getattr(settings, 'AXES_FAILURE_LIMIT', 3)
-        cool_off = getattr(settings, 'AXES_COOLOFF_TIME', timedelta(minutes=5))
-
-        recent_attempt = AccessAttempt.objects.filter(
-            username=username_real,
-            ip_address=ip_address,
-            failures_since_start__gt=0,
-        ).order_by('-attempt_time').first()
-
-        if recent_attempt:
-            failures = recent_attempt.failures_since_start
-            remaining = max(failure_limit - failures, 0)
+        # Счетчик неудач уже обновлен axes в кэше; запросов к БД нет
+        credentials = get_credentials(self.request.POST.get('username', ''))
+        failures = AxesProxyHandler.get_failures(self.request, credentials)
+        if failures:
+            remaining = max(settings.AXES_FAILURE_LIMIT - failures, 0)
 
             if remaining > 0:
                 messages.warning(
@@ -203,16 +188,14 @@ class CustomLoginView(LoginView):
                     f'Осталось попыток входа: {remaining}'
                 )
             else:
-                lock_start_time = recent_attempt.attempt_time
-                cooldown_end = lock_start_time + cool_off
-                time_remaining = cooldown_end - now()
-
-                seconds_left = int(time_remaining.total_seconds())
-                if seconds_left > 0:
-                    messages.error(
-                        self.request,
-                        f'Повторите попытку через {seconds_left} секунд. '
-                        'Каждая новая попытка продлевает таймер!'
-                    )
+                seconds_left = (
+                    AxesProxyHandler.get_implementation()
+                    .get_lockout_seconds_left(self.request, credentials)
+                )
+                messages.error(
+                    self.request,
+                    f'Повторите попытку через {seconds_left} секунд. '
+                    'Каждая новая попытка продлевает таймер!'
+                )
 
         return response